@@ -1,27 +1,93 @@
-import random
+import numpy as np
+import pandas as pd
+from django.core.cache import cache
+from .model_registry import readiness_registry
+
+# Column order of the feature matrix accepted by PredictiveEngine.predict_batch
+FEATURE_COLUMNS = ['years_in_operation', 'is_registered', 'employee_count', 'sector_code']
+
+# Integer encoding of sectors for the feature matrix (unknown sectors map to General)
+SECTOR_CODES = {'General': 0, 'Agriculture': 1, 'Mining': 2, 'Technology': 3, 'Retail': 4}
+
+# Django cache key prefix for per-profile readiness predictions
+PREDICTION_CACHE_PREFIX = 'readiness_prediction'
 
 class PredictiveEngine:
     """
     Simulates ML models for SME funding success and gap clustering.
     In production, this would load trained models (e.g., joblib/pickle).
+
+    With deterministic=True the simulated model variance is seeded from a stable
+    hash of each feature row, so identical profiles always get the same score.
+    When a LoadedModel from core.model_registry is given, it replaces the simulated rules.
     """
 
+    def __init__(self, deterministic=False, model=None):
+        self.deterministic = deterministic
+        self.model = model
+
+    @property
+    def model_version(self):
+        return self.model.version if self.model is not None else None
+
     def predict_readiness_probability(self, profile_data, assessment_answers=None):
         # Simulated Predictive Model
         # Features: years_in_operation, employee_count, sector_encoded, etc.
-        base_prob = 0.4
-        years = profile_data.get('years_in_operation', 0)
-        if years > 5:
-            base_prob += 0.3
-        elif years > 2:
-            base_prob += 0.15
+        features = self.build_feature_matrix([profile_data])
+        return float(self.predict_batch(features)[0])
+
+    def build_feature_matrix(self, profiles):
+        """
+        Encodes a list of profile dicts into an (n, 4) float matrix ordered as FEATURE_COLUMNS.
+        Registration is taken from 'is_registered' or the presence of 'registration_number'.
+        """
+        matrix = np.zeros((len(profiles), len(FEATURE_COLUMNS)), dtype=np.float64)
+        for i, p in enumerate(profiles):
+            registered = p.get('is_registered', bool(p.get('registration_number')))
+            matrix[i] = (
+                float(p.get('years_in_operation') or 0),
+                1.0 if registered else 0.0,
+                float(p.get('employee_count') or 0),
+                SECTOR_CODES.get(p.get('sector'), SECTOR_CODES['General']),
+            )
+        return matrix
 
-        if profile_data.get('registration_number'):
-            base_prob += 0.2
+    def predict_batch(self, features):
+        """
+        Scores many SMEs in one vectorized pass.
+        Accepts an (n, 4) NumPy array ordered as FEATURE_COLUMNS or a DataFrame with those columns.
+        Returns a float array of n probabilities in [0, 1].
+        """
+        if isinstance(features, pd.DataFrame):
+            features = features.reindex(columns=FEATURE_COLUMNS, fill_value=0).to_numpy(dtype=np.float64)
+        features = np.atleast_2d(np.asarray(features, dtype=np.float64))
+
+        if self.model is not None:
+            return np.clip(self.model.predict_proba(features), 0.0, 1.0)
+
+        years = features[:, 0]
+        registered = features[:, 1] > 0
+
+        base_prob = np.full(len(features), 0.4)
+        base_prob += np.where(years > 5, 0.3, np.where(years > 2, 0.15, 0.0))
+        base_prob += np.where(registered, 0.2, 0.0)
 
         # Simulate model variance
-        prediction = base_prob + random.uniform(-0.05, 0.05)
-        return min(max(prediction, 0.0), 1.0)
+        if self.deterministic:
+            noise = -0.05 + 0.1 * self._feature_hash_uniform(features)
+        else:
+            noise = np.random.uniform(-0.05, 0.05, size=len(features))
+        return np.clip(base_prob + noise, 0.0, 1.0)
+
+    def _feature_hash_uniform(self, features):
+        # SplitMix64-style mix of each (rounded) feature row into a stable uniform in [0, 1)
+        values = np.round(features * 1000).astype(np.int64).view(np.uint64)
+        h = np.full(len(features), 0x9E3779B97F4A7C15, dtype=np.uint64)
+        for col in range(values.shape[1]):
+            h ^= values[:, col]
+            h *= np.uint64(0xBF58476D1CE4E5B9)
+            h ^= h >> np.uint64(31)
+        return (h >> np.uint64(11)).astype(np.float64) / float(1 << 53)
 
     def identify_gap_clusters(self, sector):
         # Simulated Unsupervised Learning (K-Means)
@@ -45,3 +111,53 @@ class PredictiveEngine:
                 'top_positive': ['Industry Sector Growth'],
                 'top_negative': ['Inconsistent Financial Records', 'Short Operational History']
             }
+
+_engine = None
+
+def get_engine():
+    """
+    Returns the process-wide deterministic engine bound to the active readiness model.
+    A new engine is only built when the registry hot-swaps to another artifact version.
+    """
+    global _engine
+    model = readiness_registry.current()
+    if _engine is None or _engine.model is not model:
+        _engine = PredictiveEngine(deterministic=True, model=model)
+    return _engine
+
+def profile_prediction_data(profile):
+    """
+    Extracts the model features from an SMEProfile (or None for users without one).
+    """
+    if profile is None:
+        return {'years_in_operation': 0, 'registration_number': ''}
+    return {
+        'years_in_operation': profile.years_in_operation,
+        'registration_number': profile.registration_number,
+        'employee_count': profile.employee_count,
+        'sector': profile.sector,
+    }
+
+def get_cached_prediction(profile, engine=None):
+    """
+    Returns the deterministic readiness probability for a profile, memoized per profile.
+    The cached entry stores the model version and feature tuple, so a stale entry is
+    never served after a model hot-swap or a missed invalidation signal.
+    """
+    engine = engine or get_engine()
+    profile_data = profile_prediction_data(profile)
+    features = (engine.model_version,) + tuple(engine.build_feature_matrix([profile_data])[0])
+    if profile is None:
+        return engine.predict_readiness_probability(profile_data)
+
+    key = f'{PREDICTION_CACHE_PREFIX}:{profile.pk}'
+    cached = cache.get(key)
+    if cached is not None and cached[0] == features:
+        return cached[1]
+
+    prediction = engine.predict_readiness_probability(profile_data)
+    cache.set(key, (features, prediction), None)
+    return prediction
+
+def invalidate_cached_prediction(profile_id):
+    cache.delete(f'{PREDICTION_CACHE_PREFIX}:{profile_id}')
@@ -0,0 +1,188 @@
+import atexit
+import hashlib
+import logging
+import queue
+import threading
+from collections import Counter
+
+from cachetools import LRUCache
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import AuditAction, UsageDailyRollup, UsageLog, UserAgent
+
+logger = logging.getLogger(__name__)
+
+# Entries per process-wide interning cache (action name -> AuditAction id, user-agent hash -> UserAgent id)
+INTERN_CACHE_SIZE = 1024
+
+# User agents are stored and deduplicated on this many leading characters
+USER_AGENT_MAX_LENGTH = 512
+
+DETAIL_MAX_LENGTH = UsageLog._meta.get_field('detail').max_length
+
+_action_ids = LRUCache(INTERN_CACHE_SIZE)
+_user_agent_ids = LRUCache(INTERN_CACHE_SIZE)
+# LRUCache reorders entries on every read, so lookups from the writer thread need the lock too
+_intern_lock = threading.Lock()
+
+def _remember(cache, key, pk):
+    with _intern_lock:
+        cache[key] = pk
+
+def _intern(model, cache, key, **lookup):
+    with _intern_lock:
+        pk = cache.get(key)
+    if pk is not None:
+        return pk
+    try:
+        with transaction.atomic():
+            obj, _ = model.objects.get_or_create(**lookup)
+    except IntegrityError:
+        # Another worker interned the same value concurrently
+        obj = model.objects.get(**{k: v for k, v in lookup.items() if k != 'defaults'})
+    # Only cache ids that are committed, so a rolled-back transaction cannot leave a dangling key
+    transaction.on_commit(lambda: _remember(cache, key, obj.pk))
+    return obj.pk
+
+def action_id(name):
+    return _intern(AuditAction, _action_ids, name, name=name)
+
+def user_agent_id(value):
+    if not value:
+        return None
+    value = value[:USER_AGENT_MAX_LENGTH]
+    value_hash = hashlib.sha256(value.encode()).hexdigest()
+    return _intern(UserAgent, _user_agent_ids, value_hash, value_hash=value_hash, defaults={'value': value})
+
+def write_events(events):
+    """
+    Inserts a batch of audit events and folds them into the daily rollups.
+    """
+    rows = [
+        UsageLog(user_id=user_id, action_id=action_id(action), detail=detail, timestamp=timestamp,
+                 ip_address=ip_address, user_agent_id=user_agent_id(user_agent))
+        for user_id, action, detail, timestamp, ip_address, user_agent in events
+    ]
+    daily = Counter((row.timestamp.date(), row.user_id, row.action_id) for row in rows)
+    with transaction.atomic():
+        UsageLog.objects.bulk_create(rows)
+        for (day, user_id, action_pk), count in daily.items():
+            _increment_rollup(day, user_id, action_pk, count)
+
+def _increment_rollup(day, user_id, action_pk, count):
+    rollup = UsageDailyRollup.objects.filter(day=day, user_id=user_id, action_id=action_pk)
+    if rollup.update(count=F('count') + count):
+        return
+    try:
+        with transaction.atomic():
+            UsageDailyRollup.objects.create(day=day, user_id=user_id, action_id=action_pk, count=count)
+    except IntegrityError:
+        rollup.update(count=F('count') + count)
+
+class AuditLogWriter:
+    """
+    Buffers UsageLog events in-process and writes them with bulk_create from a
+    background thread, so requests no longer pay for the audit INSERT.
+    A flush happens when batch_size events are pending, every flush_interval
+    seconds, and on interpreter shutdown. A batch that fails to write goes back on
+    the queue for up to max_attempts flushes, after which its events are written
+    one at a time and any that still fail are logged in full. Events are (user_id, action, detail,
+    timestamp, ip_address, user_agent) tuples until written. Actions come from a
+    fixed vocabulary ("Claimed Verification Task"); what varies per event, such as
+    "Task #12", belongs in detail.
+    """
+
+    def __init__(self, batch_size=200, flush_interval=2.0, max_attempts=5):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self._queue = queue.SimpleQueue()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+
+    def log(self, user, action, ip_address=None, user_agent='', detail=''):
+        event = (user.pk if user and user.is_authenticated else None, action, str(detail)[:DETAIL_MAX_LENGTH],
+                 timezone.now(), ip_address, user_agent or '')
+        if not getattr(settings, 'AUDIT_LOG_ASYNC', True):
+            write_events([event])
+            return
+
+        self._queue.put((0, event))
+        self._ensure_worker()
+        if self._queue.qsize() >= self.batch_size:
+            self._wakeup.set()
+
+    def log_request(self, request, action, detail=''):
+        self.log(request.user, action,
+                 ip_address=request.META.get('REMOTE_ADDR'),
+                 user_agent=request.META.get('HTTP_USER_AGENT'), detail=detail)
+
+    def flush(self):
+        """
+        Writes every pending event. Returns the number of rows inserted.
+        """
+        with self._flush_lock:
+            written = 0
+            while True:
+                batch = []
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if not batch:
+                    return written
+                try:
+                    write_events([event for _, event in batch])
+                except Exception:
+                    written += self._retry_later(batch)
+                    raise
+                written += len(batch)
+
+    def _retry_later(self, batch):
+        """Requeues a failed batch; events out of attempts are written singly. Returns rows written."""
+        written = 0
+        for attempts, event in batch:
+            if attempts + 1 < self.max_attempts:
+                self._queue.put((attempts + 1, event))
+                continue
+            try:
+                write_events([event])
+                written += 1
+            except Exception:
+                logger.exception("Dropping audit event after %d attempts: %r", self.max_attempts, event)
+        return written
+
+    def stop(self):
+        self._stopped.set()
+        self._wakeup.set()
+        if self._worker is not None:
+            self._worker.join(timeout=self.flush_interval * 2)
+        self.flush()
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name='audit-log-writer', daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Failed to flush audit log batch")
+            finally:
+                close_old_connections()
+
+audit_log = AuditLogWriter()
+atexit.register(audit_log.stop)
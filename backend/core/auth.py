@@ -0,0 +1,15 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+class ProfileModelBackend(ModelBackend):
+    """
+    ModelBackend that loads the session user together with their SMEProfile, so
+    request.user.smeprofile (or its absence) is known without a query of its own.
+    """
+    def get_user(self, user_id):
+        UserModel = get_user_model()
+        try:
+            user = UserModel._default_manager.select_related('smeprofile').get(pk=user_id)
+        except UserModel.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,113 @@
+import csv
+import json
+from pathlib import Path
+
+import pyarrow.parquet as pq
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from .matching import invalidate_funding_index
+from .models import FundingSource, Question
+from .scoring import invalidate_question_weights
+
+IMPORT_BATCH_SIZE = 2000
+
+# catalogue name -> (model, natural key fields, fields refreshed when the key already exists)
+CATALOGUES = {
+    'funding-sources': (FundingSource, ('organization', 'name'), (
+        'description', 'amount_min', 'amount_max', 'funding_type', 'sector', 'requirements', 'website_url')),
+    'questions': (Question, ('text',), ('category', 'weight')),
+}
+
+def read_records(path, fmt=None):
+    """
+    Yields one dict per catalogue row from a CSV, JSON (array or JSON lines) or
+    Parquet file. The format defaults to the file extension.
+    """
+    path = Path(path)
+    fmt = (fmt or path.suffix.lstrip('.')).lower()
+    if fmt == 'csv':
+        with open(path, newline='', encoding='utf-8-sig') as handle:
+            yield from csv.DictReader(handle)
+    elif fmt in ('json', 'jsonl', 'ndjson'):
+        with open(path, encoding='utf-8') as handle:
+            first = handle.read(1)
+            while first.isspace():
+                first = handle.read(1)
+            handle.seek(0)
+            if first == '[':
+                yield from json.load(handle)
+            else:
+                for line in handle:
+                    if line.strip():
+                        yield json.loads(line)
+    elif fmt == 'parquet':
+        for batch in pq.ParquetFile(path).iter_batches():
+            yield from batch.to_pylist()
+    else:
+        raise ValueError(f"Unsupported catalogue format '{fmt}'. Use csv, json, jsonl or parquet.")
+
+def _clean(fields, record):
+    values = {}
+    for name, field in fields:
+        raw = record.get(name)
+        if isinstance(raw, str):
+            raw = raw.strip()
+        if raw in (None, ''):
+            if field.has_default():
+                values[name] = field.get_default()
+                continue
+            if field.blank:
+                values[name] = ''
+                continue
+            raise ValidationError(f"'{name}' is required")
+        value = field.to_python(raw)
+        field.run_validators(value)
+        values[name] = value
+    return values
+
+def import_catalogue(catalogue, records, batch_size=IMPORT_BATCH_SIZE, dry_run=False):
+    """
+    Upserts catalogue rows. Records are cleaned and de-duplicated in memory on the
+    natural key (the last occurrence wins), then written with
+    bulk_create(update_conflicts=True) in batches inside one transaction.
+    Returns counts of rows read, duplicates, invalid rows, created and updated.
+    """
+    if catalogue not in CATALOGUES:
+        raise ValueError(f"Unknown catalogue '{catalogue}'. Choose from: {', '.join(CATALOGUES)}")
+    model, key_fields, update_fields = CATALOGUES[catalogue]
+    fields = [(name, model._meta.get_field(name)) for name in key_fields + update_fields]
+
+    rows = {}
+    stats = {'read': 0, 'duplicates': 0, 'invalid': 0, 'created': 0, 'updated': 0, 'errors': []}
+    for line, record in enumerate(records, start=1):
+        stats['read'] += 1
+        try:
+            values = _clean(fields, record)
+        except ValidationError as exc:
+            stats['invalid'] += 1
+            if len(stats['errors']) < 20:
+                stats['errors'].append(f"row {line}: {'; '.join(exc.messages)}")
+            continue
+        key = tuple(values[name] for name in key_fields)
+        if key in rows:
+            stats['duplicates'] += 1
+        rows[key] = values
+
+    if dry_run or not rows:
+        stats['created'] = len(rows)
+        return stats
+
+    with transaction.atomic():
+        before = model.objects.count()
+        model.objects.bulk_create(
+            (model(**values) for values in rows.values()), batch_size=batch_size,
+            update_conflicts=True, unique_fields=key_fields, update_fields=update_fields)
+        stats['created'] = model.objects.count() - before
+        stats['updated'] = len(rows) - stats['created']
+        # bulk_create skips the post_save signals that normally drop these caches; the
+        # shared version is bumped on commit, so every process reloads the new rows
+        if model is FundingSource:
+            invalidate_funding_index()
+        else:
+            invalidate_question_weights()
+    return stats
@@ -1,33 +1,464 @@
+import csv
+import io
+import itertools
+import mmap
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+try:
+    import pytesseract
+    from PIL import Image
+except ImportError:  # OCR is optional; without it image scans get the simulated certificate result
+    pytesseract = None
+
+# Bump when extraction output changes so cached results (core.result_cache) are not reused
+DECIPHERER_VERSION = 5
+
+# Bytes read from the start of a file to pick an extractor
+SNIFF_BYTES = 4096
+
+# A PDF page object (but not the /Pages tree node)
+PDF_PAGE_MARKER = re.compile(rb'/Type\s*/Page(?![A-Za-z])')
+PDF_OBJECT = re.compile(rb'(?<![0-9])(\d+)\s+(\d+)\s+obj\b')
+PDF_REF = re.compile(rb'(\d+)\s+\d+\s+R\b')
+PDF_CONTENTS = re.compile(rb'/Contents\s*(\[[^\]]*\]|\d+\s+\d+\s+R)')
+PDF_KIDS = re.compile(rb'/Kids\s*\[([^\]]*)\]')
+PDF_STARTXREF = re.compile(rb'startxref\s+(\d+)')
+PDF_XREF_SUBSECTION = re.compile(rb'\s*(\d+)\s+(\d+)[ \t]*\r?\n')
+PDF_XREF_ENTRY = re.compile(rb'(\d{10})\s(\d{5})\s([nf])')
+PDF_STREAM = re.compile(rb'stream\r?\n(.*?)\r?\nendstream', re.DOTALL)
+PDF_STRING = re.compile(rb'\(((?:\\.|[^\\)])*)\)')
+
+# Terms picked up from document text, page by page
+DOCUMENT_KEYWORDS = ('Revenue', 'Registration', 'Namibia', 'Compliance', 'BIPA', 'Bank Statement',
+                     'Net Profit', 'Tax', 'Balance Sheet', 'Income Statement')
+
+AMOUNT = r'\s*[:\-]?\s*(?:N\$|NAD)?\s*(-?[\d,]+(?:\.\d+)?)'
+METRIC_PATTERNS = {
+    'total_revenue': re.compile(r'(?:total\s+)?(?:revenue|turnover)' + AMOUNT, re.IGNORECASE),
+    'total_expenses': re.compile(r'(?:total\s+)?(?:operating\s+)?expenses' + AMOUNT, re.IGNORECASE),
+    'net_profit': re.compile(r'net\s+(?:profit|income)' + AMOUNT, re.IGNORECASE),
+}
+
+# Most bytes the FlateDecode streams of one PDF page may inflate to (guards against
+# decompression bombs: a few KB of zeros can expand to gigabytes)
+MAX_INFLATED_PAGE_BYTES = 32 * 1024 * 1024
+
+# Size of the "pages" a non-PDF file is read in; consecutive chunks overlap by
+# CHUNK_OVERLAP bytes so no DOCUMENT_KEYWORDS term is split across a boundary
+CHUNK_BYTES = 1024 * 1024
+CHUNK_OVERLAP = max(len(keyword) for keyword in DOCUMENT_KEYWORDS) - 1
+
+# Rows per "page" when a CSV bank statement is split for parallel processing
+CSV_ROWS_PER_PAGE = 5000
+
+def _xref_table(mm):
+    """
+    Object number -> offset and the trailer bytes from the classic xref tables,
+    following /Prev so incremental updates override older entries. Returns
+    (None, None) for cross-reference streams or a damaged table.
+    """
+    match = PDF_STARTXREF.search(mm, max(0, len(mm) - 1024))
+    if match is None:
+        return None, None
+    offsets, trailer, position, seen = {}, None, int(match.group(1)), set()
+    while position not in seen:
+        seen.add(position)
+        if mm[position:position + 4] != b'xref':
+            return None, None
+        position += 4
+        while (header := PDF_XREF_SUBSECTION.match(mm, position)) is not None:
+            first, count = int(header.group(1)), int(header.group(2))
+            position = header.end()
+            for number, entry in enumerate(PDF_XREF_ENTRY.finditer(mm[position:position + 20 * count]), first):
+                if entry.group(3) == b'n':
+                    offsets.setdefault(number, int(entry.group(1)))
+            position += 20 * count
+        end = mm.find(b'startxref', position)
+        section = mm[position:end if end != -1 else len(mm)]
+        trailer = trailer or section
+        previous = re.search(rb'/Prev\s+(\d+)', section)
+        if previous is None:
+            return offsets, trailer
+        position = int(previous.group(1))
+    return offsets, trailer
+
+def _scan_objects(mm):
+    # No usable xref table: find every "N G obj" header; later definitions win, as with incremental updates
+    offsets = {int(match.group(1)): match.start() for match in PDF_OBJECT.finditer(mm)}
+    trailer_start = mm.rfind(b'trailer')
+    return offsets, mm[trailer_start:] if trailer_start != -1 else b''
+
+def _pdf_objects(mm):
+    offsets, trailer = _xref_table(mm)
+    if offsets is not None and all(
+            (match := PDF_OBJECT.match(mm, offset)) and int(match.group(1)) == number
+            for number, offset in offsets.items()):
+        return offsets, trailer
+    return _scan_objects(mm)
+
+def _object_bytes(mm, offset):
+    end = mm.find(b'endobj', offset)
+    stream = mm.find(b'stream', offset, end if end != -1 else len(mm))
+    if stream != -1:
+        # Binary stream data may itself contain "endobj"; skip past the stream first
+        endstream = mm.find(b'endstream', stream)
+        end = mm.find(b'endobj', endstream) if endstream != -1 else end
+    return mm[offset:end + len(b'endobj')] if end != -1 else mm[offset:]
+
+def _object_dict(data):
+    stream = data.find(b'stream')
+    return data if stream == -1 else data[:stream]
+
+def _page_order(mm, offsets, trailer):
+    """Page object numbers in reading order, by walking /Root -> /Pages -> /Kids."""
+    root = re.search(rb'/Root\s+(\d+)\s+\d+\s+R', trailer or b'')
+    if root is None or int(root.group(1)) not in offsets:
+        return []
+    pages = re.search(rb'/Pages\s+(\d+)\s+\d+\s+R', _object_dict(_object_bytes(mm, offsets[int(root.group(1))])))
+    order, seen = [], set()
+    stack = [int(pages.group(1))] if pages else []
+    while stack:
+        number = stack.pop()
+        if number in seen or number not in offsets:
+            continue
+        seen.add(number)
+        node = _object_dict(_object_bytes(mm, offsets[number]))
+        kids = PDF_KIDS.search(node)
+        if kids is not None:
+            stack.extend(reversed([int(kid) for kid in PDF_REF.findall(kids.group(1))]))
+        elif PDF_PAGE_MARKER.search(node):
+            order.append(number)
+    return order
+
+def _pdf_pages(mm):
+    offsets, trailer = _pdf_objects(mm)
+    order = _page_order(mm, offsets, trailer)
+    if not order:
+        # No readable page tree: take page objects in file order
+        order = [number for number, offset in sorted(offsets.items(), key=lambda item: item[1])
+                 if PDF_PAGE_MARKER.search(_object_dict(_object_bytes(mm, offset)))]
+    for number in order:
+        page = _object_bytes(mm, offsets[number])
+        contents = PDF_CONTENTS.search(_object_dict(page))
+        if contents is None:
+            yield page
+            continue
+        streams = [int(ref) for ref in PDF_REF.findall(contents.group(1))]
+        yield b'\n'.join(_object_bytes(mm, offsets[ref]) for ref in streams if ref in offsets)
+
+def _chunks(mm):
+    start = 0
+    for number in itertools.count(1):
+        yield number, mm[start:start + CHUNK_BYTES]
+        if start + CHUNK_BYTES >= len(mm):
+            return
+        start += CHUNK_BYTES - CHUNK_OVERLAP
+
+def iter_pages(path):
+    """
+    Yields (page_number, page_bytes) for a stored document without reading the
+    whole file: the file is memory-mapped and only one page is copied out at a
+    time. PDF pages are found through the xref table (or an object scan when it
+    is missing or damaged) and the page tree, and each page's bytes are its
+    /Contents stream objects, wherever they sit in the file; any other file (or a
+    PDF without readable pages) is split into CHUNK_BYTES chunks.
+    """
+    with open(path, 'rb') as handle:
+        if os.fstat(handle.fileno()).st_size == 0:
+            return
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if mm[:5] != b'%PDF-':
+                yield from _chunks(mm)
+                return
+            number = 0
+            for number, page in enumerate(_pdf_pages(mm), start=1):
+                yield number, page
+            if number == 0:
+                yield from _chunks(mm)
+
+def find_keywords(text):
+    """DOCUMENT_KEYWORDS present in text (str or bytes), case-insensitively."""
+    # lower() + substring search is ~15x faster than an IGNORECASE regex over binary streams
+    lowered = text.lower()
+    if isinstance(lowered, bytes):
+        return [k for k in DOCUMENT_KEYWORDS if k.lower().encode() in lowered]
+    return [k for k in DOCUMENT_KEYWORDS if k.lower() in lowered]
+
+def parse_metrics(text):
+    metrics = {}
+    for name, pattern in METRIC_PATTERNS.items():
+        match = pattern.search(text)
+        if match:
+            metrics[name] = float(match.group(1).replace(',', ''))
+    return metrics
+
+def pdf_page_text(data):
+    """
+    Text-layer strings from one PDF page: the (...) operands of its content
+    streams, inflating FlateDecode streams with zlib. Raises ValueError once the
+    page inflates past MAX_INFLATED_PAGE_BYTES.
+    """
+    parts = []
+    budget = MAX_INFLATED_PAGE_BYTES
+    for stream in PDF_STREAM.finditer(data):
+        content = stream.group(1)
+        inflater = zlib.decompressobj()
+        try:
+            inflated = inflater.decompress(content, budget + 1)
+        except zlib.error:
+            pass
+        else:
+            if len(inflated) > budget:
+                raise ValueError(f"PDF page inflates to more than {MAX_INFLATED_PAGE_BYTES} bytes.")
+            budget -= len(inflated)
+            content = inflated
+        parts.extend(s.replace(b'\\(', b'(').replace(b'\\)', b')') for s in PDF_STRING.findall(content))
+    return b' '.join(parts).decode('latin-1')
+
+class Extractor:
+    """
+    Base extractor. sniff() picks the extractor from a file's first bytes (or its
+    name when there is no content), pages() splits the file, extract_page() turns
+    one page into {'keywords', 'metrics'} and must only depend on the page bytes so
+    it can run in another process, and merge_metrics() folds the pages together.
+    """
+    name = 'generic'
+    detected_type = 'Unknown'
+    extensions = ()
+
+    def sniff(self, head, file_name):
+        return not head and file_name.lower().endswith(self.extensions)
+
+    def pages(self, path):
+        return iter_pages(path)
+
+    def extract_page(self, data):
+        return {'keywords': find_keywords(data), 'metrics': {}}
+
+    def merge_metrics(self, page_metrics):
+        # First value seen wins (statements print their headline figures early)
+        merged = {}
+        for metrics in page_metrics:
+            for key, value in metrics.items():
+                merged.setdefault(key, value)
+        return merged
+
+    def name_only_result(self):
+        return {'keywords': [], 'metrics': {}}
+
+    def summary(self, page_count):
+        return 'Document processed successfully.'
+
+    def build_result(self, page_results):
+        keywords = []
+        for result in page_results:
+            keywords += [k for k in result['keywords'] if k not in keywords]
+        return {
+            'keywords': keywords,
+            'detected_type': self.detected_type,
+            'summary': self.summary(len(page_results)),
+            'extracted_metrics': self.merge_metrics([r['metrics'] for r in page_results]),
+            'page_count': len(page_results),
+            'extractor': self.name,
+        }
+
+EXTRACTORS = {}
+
+def register_extractor(cls):
+    """Class decorator adding an extractor to the registry; earlier registrations are sniffed first."""
+    EXTRACTORS[cls.name] = cls()
+    return cls
+
+def select_extractor(head, file_name):
+    for extractor in EXTRACTORS.values():
+        if extractor.sniff(head, file_name):
+            return extractor
+    return GENERIC_EXTRACTOR
+
+GENERIC_EXTRACTOR = Extractor()
+
+@register_extractor
+class PdfTextExtractor(Extractor):
+    name = 'pdf-text'
+    detected_type = 'PDF Financial Statement'
+    extensions = ('.pdf',)
+
+    def sniff(self, head, file_name):
+        return head.startswith(b'%PDF-') or super().sniff(head, file_name)
+
+    def extract_page(self, data):
+        text = pdf_page_text(data)
+        return {'keywords': find_keywords(text), 'metrics': parse_metrics(text)}
+
+    def summary(self, page_count):
+        return f'Extracted the text layer of {page_count} page(s).'
+
+@register_extractor
+class ImageOcrExtractor(Extractor):
+    name = 'image-ocr'
+    detected_type = 'Scanned BIPA Certificate'
+    extensions = ('.jpg', '.jpeg', '.png')
+
+    def sniff(self, head, file_name):
+        return head.startswith((b'\x89PNG', b'\xff\xd8\xff')) or super().sniff(head, file_name)
+
+    def pages(self, path):
+        # OCR needs the whole image, so a scan is always one page
+        with open(path, 'rb') as handle:
+            yield 1, handle.read()
+
+    def extract_page(self, data):
+        if pytesseract is None:
+            return self.name_only_result()
+        text = pytesseract.image_to_string(Image.open(io.BytesIO(data)))
+        return {'keywords': find_keywords(text), 'metrics': parse_metrics(text)}
+
+    def name_only_result(self):
+        # Simulated extraction for the BIPA certificate scans the UI asks for
+        return {'keywords': ['Registration', 'BIPA', 'Namibia', 'Registration Number'], 'metrics': {}}
+
+    def summary(self, page_count):
+        return 'Extracted BIPA registration details from image scan.'
+
+@register_extractor
+class CsvBankStatementExtractor(Extractor):
+    name = 'csv-bank-statement'
+    detected_type = 'Bank Statement (CSV)'
+    extensions = ('.csv',)
+    AMOUNT_COLUMNS = ('amount', 'credit', 'debit', 'balance')
+
+    def sniff(self, head, file_name):
+        if not head:
+            return super().sniff(head, file_name)
+        if b'\x00' in head:
+            return False
+        header = head.split(b'\n', 1)[0].decode('utf-8', 'ignore').lower()
+        return ',' in header and 'date' in header and any(c in header for c in self.AMOUNT_COLUMNS)
+
+    def pages(self, path):
+        # Fixed-size row blocks, each carrying the header so it parses on its own
+        with open(path, 'rb') as handle:
+            header = handle.readline()
+            number = 0
+            while True:
+                rows = [line for _, line in zip(range(CSV_ROWS_PER_PAGE), handle)]
+                if not rows:
+                    return
+                number += 1
+                yield number, header + b''.join(rows)
+
+    def extract_page(self, data):
+        credits = debits = 0.0
+        count, balance, keywords = 0, None, []
+        for row in csv.DictReader(io.StringIO(data.decode('utf-8', 'replace'))):
+            row = {(k or '').strip().lower(): (v or '').strip() for k, v in row.items()}
+            amount = _number(row.get('amount'))
+            credit, debit = _number(row.get('credit')), _number(row.get('debit'))
+            if amount is not None:
+                credit, debit = (amount, None) if amount >= 0 else (None, -amount)
+            credits += credit or 0.0
+            debits += debit or 0.0
+            balance = _number(row.get('balance'), balance)
+            count += 1
+            keywords += [k for k in find_keywords(row.get('description', '')) if k not in keywords]
+        metrics = {'total_credits': credits, 'total_debits': debits, 'transaction_count': count}
+        if balance is not None:
+            metrics['closing_balance'] = balance
+        return {'keywords': ['Bank Statement'] + keywords, 'metrics': metrics}
+
+    def merge_metrics(self, page_metrics):
+        merged = {'total_credits': 0.0, 'total_debits': 0.0, 'transaction_count': 0}
+        for metrics in page_metrics:
+            for key in merged:
+                merged[key] += metrics.get(key, 0)
+            if 'closing_balance' in metrics:
+                merged['closing_balance'] = metrics['closing_balance']
+        merged['total_credits'] = round(merged['total_credits'], 2)
+        merged['total_debits'] = round(merged['total_debits'], 2)
+        merged['net_cash_flow'] = round(merged['total_credits'] - merged['total_debits'], 2)
+        return merged
+
+    def summary(self, page_count):
+        return 'Summarised bank statement transactions.'
+
+def _number(value, default=None):
+    if not value:
+        return default
+    try:
+        return float(value.replace(',', '').replace('N$', ''))
+    except ValueError:
+        return default
+
+def _extract_page(extractor_name, data):
+    # Module-level so it can be pickled into worker processes
+    return EXTRACTORS.get(extractor_name, GENERIC_EXTRACTOR).extract_page(data)
+
+def _bounded_map(executor, fn, items, window):
+    """Like executor.map, but with at most `window` items in flight so pages are read lazily."""
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(fn, *item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+def process_pool(workers):
+    # spawn, not fork: a forked child would inherit (and on exit close) the parent's DB connection
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+
 class DocumentDecipherer:
     """
     Interface for LLM-powered document analysis.
     Deciphers keywords and key financial metrics from uploaded files (PDF, Image, etc).
     """
 
-    def decipher(self, file_obj):
+    def decipher(self, file_obj, executor=None):
         """
-        Simulates LLM/OCR processing of an uploaded file.
-        Returns extracted keywords and summary data.
+        Extracts keywords and metrics from an uploaded or stored file using the
+        registered extractor that matches its content. Objects without readable
+        content are classified by name only.
         """
-        file_name = file_obj.name.lower()
+        path = _local_path(file_obj)
+        if path:
+            return self.decipher_path(path, file_obj.name, executor=executor)
+        if not hasattr(file_obj, 'read'):
+            extractor = select_extractor(b'', file_obj.name)
+            return extractor.build_result([extractor.name_only_result()])
 
-        # Simulated extraction results
-        results = {
-            'keywords': ['Revenue', 'Registration', 'Namibia', 'Compliance'],
-            'detected_type': 'Unknown',
-            'summary': 'Document processed successfully.',
-            'extracted_metrics': {}
-        }
+        with tempfile.NamedTemporaryFile(suffix=Path(file_obj.name).suffix) as spool:
+            if hasattr(file_obj, 'seek'):
+                file_obj.seek(0)
+            shutil.copyfileobj(file_obj, spool)
+            spool.flush()
+            return self.decipher_path(spool.name, file_obj.name, executor=executor)
 
-        if file_name.endswith('.pdf'):
-            results['detected_type'] = 'PDF Financial Statement'
-            results['extracted_metrics'] = {'total_revenue': 450000, 'net_profit': 55000}
-        elif file_name.endswith(('.jpg', '.jpeg', '.png')):
-            results['detected_type'] = 'Scanned BIPA Certificate'
-            results['keywords'].append('Registration Number')
-            results['summary'] = 'Extracted BIPA registration details from image scan.'
+    def decipher_path(self, path, file_name, executor=None, window=None):
+        """
+        Runs the matching extractor page by page. With an executor the pages are
+        spread across its workers (at most `window` in flight) and merged in order.
+        """
+        with open(path, 'rb') as handle:
+            head = handle.read(SNIFF_BYTES)
+        extractor = select_extractor(head, file_name)
+        if not head:
+            return extractor.build_result([extractor.name_only_result()])
 
-        return results
+        if executor is None:
+            page_results = [extractor.extract_page(data) for _, data in extractor.pages(path)]
+        else:
+            window = window or 2 * (os.cpu_count() or 1)
+            pages = ((extractor.name, data) for _, data in extractor.pages(path))
+            page_results = list(_bounded_map(executor, _extract_page, pages, window))
+        return extractor.build_result(page_results)
 
     def verify_against_profile(self, extracted_data, profile):
         """
@@ -38,3 +469,25 @@ class DocumentDecipherer:
             confidence_delta += 0.2
 
         return confidence_delta
+
+    def match_funder_requirements(self, extracted_data, index):
+        """
+        Finds funders whose requirements mention the document's keywords.
+        index is a core.matching.FundingIndex (or anything exposing search()).
+        """
+        return index.search(extracted_data['keywords'])
+
+def _local_path(file_obj):
+    if hasattr(file_obj, 'temporary_file_path'):
+        return file_obj.temporary_file_path()
+    try:
+        return file_obj.path
+    except (AttributeError, NotImplementedError, ValueError):
+        return None
+
+def process_document(path, file_name, executor=None):
+    """
+    Runs DocumentDecipherer over a stored upload. Module-level and free of ORM access
+    so core.jobs can run it in a worker process.
+    """
+    return DocumentDecipherer().decipher_path(path, file_name, executor=executor)
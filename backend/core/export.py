@@ -0,0 +1,152 @@
+import csv
+from datetime import datetime, time
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from django.utils import timezone
+from .models import AnomalyAlert, Assessment, FinancialProjection, UsageLog
+
+EXPORT_CHUNK_SIZE = 5000
+
+TIMESTAMP = pa.timestamp('us', tz='UTC')
+MONEY = pa.decimal128(12, 2)
+
+# dataset name -> (model, time field used for since/until, [(column, ORM lookup, arrow type)])
+EXPORT_DATASETS = {
+    'assessments': (Assessment, 'created_at', [
+        ('id', 'id', pa.int64()),
+        ('user_id', 'user_id', pa.int64()),
+        ('score', 'score', pa.int64()),
+        ('ml_predicted_success', 'ml_predicted_success', pa.float64()),
+        ('gap_analysis', 'gap_analysis', pa.string()),
+        ('created_at', 'created_at', TIMESTAMP),
+    ]),
+    'financial-projections': (FinancialProjection, 'created_at', [
+        ('id', 'id', pa.int64()),
+        ('user_id', 'user_id', pa.int64()),
+        ('project_name', 'project_name', pa.string()),
+        ('revenue_year1', 'revenue_year1', MONEY),
+        ('expenses_year1', 'expenses_year1', MONEY),
+        ('created_at', 'created_at', TIMESTAMP),
+    ]),
+    'anomaly-alerts': (AnomalyAlert, 'created_at', [
+        ('id', 'id', pa.int64()),
+        ('user_id', 'user_id', pa.int64()),
+        ('field_affected', 'field_affected', pa.string()),
+        ('anomaly_score', 'anomaly_score', pa.float64()),
+        ('message', 'message', pa.string()),
+        ('is_resolved', 'is_resolved', pa.bool_()),
+        ('created_at', 'created_at', TIMESTAMP),
+    ]),
+    'usage-logs': (UsageLog, 'timestamp', [
+        ('id', 'id', pa.int64()),
+        ('user_id', 'user_id', pa.int64()),
+        ('action', 'action__name', pa.string()),
+        ('detail', 'detail', pa.string()),
+        ('timestamp', 'timestamp', TIMESTAMP),
+        ('ip_address', 'ip_address', pa.string()),
+        ('user_agent', 'user_agent__value', pa.string()),
+    ]),
+}
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+def _day_bound(value, end=False):
+    if isinstance(value, datetime):
+        return value
+    return timezone.make_aware(datetime.combine(value, time.max if end else time.min))
+
+def export_rows(dataset, since=None, until=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Returns (columns, row iterator) for a dataset. Rows come from a values_list
+    iterator (a server-side cursor where the backend supports one), so memory
+    stays flat no matter how many rows are exported. since/until are inclusive dates.
+    """
+    if dataset not in EXPORT_DATASETS:
+        raise ValueError(f"Unknown dataset '{dataset}'. Choose from: {', '.join(EXPORT_DATASETS)}")
+    model, time_field, columns = EXPORT_DATASETS[dataset]
+    rows = model.objects.order_by('id')
+    if since:
+        rows = rows.filter(**{f'{time_field}__gte': _day_bound(since)})
+    if until:
+        rows = rows.filter(**{f'{time_field}__lte': _day_bound(until, end=True)})
+    rows = rows.values_list(*[lookup for _, lookup, _ in columns]).iterator(chunk_size=chunk_size)
+    return columns, rows
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+class _Buffer:
+    """Write-only file object that hands its contents back on drain()."""
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data) if not isinstance(data, str) else data
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        chunks, self._chunks = self._chunks, []
+        return chunks
+
+def iter_csv(columns, rows, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yields UTF-8 CSV text, one chunk per chunk_size rows, starting with the header."""
+    buffer = _Buffer()
+    writer = csv.writer(buffer)
+    writer.writerow([name for name, _, _ in columns])
+    for batch in _batches(rows, chunk_size):
+        writer.writerows(batch)
+        yield ''.join(buffer.drain()).encode()
+    tail = buffer.drain()
+    if tail:
+        yield ''.join(tail).encode()
+
+def iter_parquet(columns, rows, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yields Parquet bytes as they are written: one row group per chunk_size rows,
+    then the footer once the rows run out.
+    """
+    schema = pa.schema([(name, arrow_type) for name, _, arrow_type in columns])
+    buffer = _Buffer()
+    writer = pq.ParquetWriter(buffer, schema, compression='snappy')
+    for batch in _batches(rows, chunk_size):
+        arrays = [pa.array(values, type=arrow_type)
+                  for values, (_, _, arrow_type) in zip(zip(*batch), columns)]
+        writer.write_batch(pa.record_batch(arrays, schema=schema))
+        yield b''.join(buffer.drain())
+    writer.close()
+    yield b''.join(buffer.drain())
+
+def iter_export(dataset, output='csv', since=None, until=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """Streams a dataset in the requested output format as an iterator of bytes."""
+    if output not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{output}'. Choose from: {', '.join(EXPORT_FORMATS)}")
+    columns, rows = export_rows(dataset, since=since, until=until, chunk_size=chunk_size)
+    encode = iter_csv if output == 'csv' else iter_parquet
+    return encode(columns, rows, chunk_size=chunk_size)
+
+def export_filename(dataset, output):
+    return f'{dataset}-{timezone.localdate():%Y%m%d}.{output}'
@@ -0,0 +1,183 @@
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F
+from django.utils import timezone
+
+from .document_processor import DECIPHERER_VERSION, process_document, process_pool
+from .models import DocumentJob
+from .result_cache import get_result_cache, sha256_of
+from .trust import mark_trust_scores_dirty
+
+logger = logging.getLogger(__name__)
+
+def result_cache_key(content_hash, file_name):
+    # The extension is part of the key while detection still depends on it
+    return f'{content_hash}{Path(file_name).suffix.lower()}-v{DECIPHERER_VERSION}'
+
+def enqueue_document(user, uploaded_file):
+    """
+    Stores the upload and returns its DocumentJob straight away. Files whose
+    content was already extracted come back DONE from the result cache;
+    everything else is QUEUED for the worker.
+    """
+    content_hash = sha256_of(uploaded_file)
+    job = DocumentJob(user=user, file=uploaded_file, original_name=uploaded_file.name[:255],
+                      content_hash=content_hash)
+    cached = get_result_cache().get(result_cache_key(content_hash, uploaded_file.name))
+    if cached is not None:
+        job.status, job.result, job.finished_at = 'DONE', cached, timezone.now()
+    job.save()
+    return job
+
+def claim_next_job():
+    """
+    Moves the oldest QUEUED job to RUNNING and returns it (None when the queue is empty).
+    The conditional UPDATE acts as the lock: only one worker can flip a given row,
+    which works on SQLite as well as Postgres.
+    """
+    while True:
+        job_id = (DocumentJob.objects.filter(status='QUEUED').order_by('id')
+                  .values_list('id', flat=True).first())
+        if job_id is None:
+            return None
+        claimed = DocumentJob.objects.filter(id=job_id, status='QUEUED').update(
+            status='RUNNING', started_at=timezone.now(), attempts=F('attempts') + 1)
+        if claimed:
+            return DocumentJob.objects.get(id=job_id)
+
+def finish_job(job_id, result=None, error=''):
+    job = DocumentJob.objects.filter(id=job_id)
+    job.update(status='FAILED' if error else 'DONE', result=result, error=error, finished_at=timezone.now())
+    if not error:
+        # update() skips the post_save signal that marks the trust score dirty
+        mark_trust_scores_dirty(job.values_list('user_id', flat=True))
+
+def requeue_job(job_id, error, count_attempt=True):
+    """
+    Puts a RUNNING job back on the queue after a worker crash, or fails it once it
+    is out of attempts. count_attempt=False is for clean shutdowns, which do not
+    use up an attempt.
+    """
+    job = DocumentJob.objects.filter(id=job_id, status='RUNNING')
+    if not count_attempt:
+        job.update(status='QUEUED', started_at=None, attempts=F('attempts') - 1)
+        return
+    job.filter(attempts__lt=settings.DOCUMENT_JOB_MAX_ATTEMPTS).update(status='QUEUED', started_at=None)
+    job.update(status='FAILED', error=error, finished_at=timezone.now())
+
+def requeue_stale_jobs(exclude=()):
+    """
+    Recovers jobs left RUNNING by a worker that died more than DOCUMENT_JOB_TIMEOUT
+    seconds ago. exclude lists the caller's own in-flight jobs, which it times out itself.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.DOCUMENT_JOB_TIMEOUT)
+    stale = list(DocumentJob.objects.filter(status='RUNNING', started_at__lt=cutoff)
+                 .exclude(id__in=list(exclude)).values_list('id', flat=True))
+    for job_id in stale:
+        requeue_job(job_id, 'Timed out')
+    return len(stale)
+
+def _discard_executor(executor):
+    """Shuts an executor down without waiting, terminating pool processes stuck on a job."""
+    processes = list((getattr(executor, '_processes', None) or {}).values())
+    executor.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        process.terminate()
+
+class DocumentWorker:
+    """
+    Drains the DocumentJob queue into a pool of worker processes. Claiming and
+    bookkeeping stay on the dispatching thread; the pool only sees file paths.
+    A job still running DOCUMENT_JOB_TIMEOUT seconds after it was claimed uses up
+    an attempt and the pool is replaced, and jobs orphaned by other workers are
+    requeued every stale_check_interval seconds.
+    """
+    def __init__(self, workers=None, executor=None, poll_interval=1.0, stale_check_interval=60.0):
+        self.workers = workers or settings.DOCUMENT_WORKERS
+        self.executor = executor
+        self.poll_interval = poll_interval
+        self.stale_check_interval = stale_check_interval
+
+    def _new_executor(self):
+        return process_pool(self.workers)
+
+    def _replace_executor(self, in_flight):
+        # Pool processes cannot be interrupted one job at a time; the jobs caught up
+        # in the restart go back on the queue without using an attempt
+        for job_id, _, _ in in_flight.values():
+            requeue_job(job_id, 'Worker restarted', count_attempt=False)
+        in_flight.clear()
+        _discard_executor(self.executor)
+        self.executor = self._new_executor()
+
+    def run(self, once=False):
+        """
+        Processes jobs until interrupted, or until the queue is empty when once=True.
+        Returns the number of jobs finished.
+        """
+        if self.executor is None:
+            self.executor = self._new_executor()
+        timeout = timedelta(seconds=settings.DOCUMENT_JOB_TIMEOUT)
+        in_flight = {}
+        finished = 0
+        last_stale_check = None
+        try:
+            while True:
+                if last_stale_check is None or time.monotonic() - last_stale_check >= self.stale_check_interval:
+                    requeue_stale_jobs(exclude=[job_id for job_id, _, _ in in_flight.values()])
+                    last_stale_check = time.monotonic()
+
+                while len(in_flight) < self.workers:
+                    job = claim_next_job()
+                    if job is None:
+                        break
+                    future = self.executor.submit(process_document, job.file.path, job.original_name)
+                    key = result_cache_key(job.content_hash, job.original_name) if job.content_hash else None
+                    in_flight[future] = (job.pk, key, job.started_at + timeout)
+
+                if not in_flight:
+                    if once:
+                        return finished
+                    close_old_connections()
+                    time.sleep(self.poll_interval)
+                    continue
+
+                done, _ = wait(in_flight, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                broken = False
+                for future in done:
+                    job_id, cache_key, _ = in_flight.pop(future)
+                    try:
+                        result = future.result()
+                    except BrokenProcessPool:
+                        logger.warning("Document worker process died; requeueing job %s", job_id)
+                        requeue_job(job_id, 'Worker process crashed')
+                        broken = True
+                        continue
+                    except Exception as exc:
+                        logger.exception("Document job %s failed", job_id)
+                        finish_job(job_id, error=str(exc) or exc.__class__.__name__)
+                    else:
+                        finish_job(job_id, result=result)
+                        if cache_key:
+                            get_result_cache().set(cache_key, result)
+                    finished += 1
+
+                now = timezone.now()
+                timed_out = [future for future, (_, _, deadline) in in_flight.items() if deadline <= now]
+                for future in timed_out:
+                    job_id, _, _ = in_flight.pop(future)
+                    logger.warning("Document job %s ran past DOCUMENT_JOB_TIMEOUT", job_id)
+                    requeue_job(job_id, 'Timed out')
+                if broken or timed_out:
+                    self._replace_executor(in_flight)
+        finally:
+            for job_id, _, _ in in_flight.values():
+                requeue_job(job_id, 'Worker stopped', count_attempt=False)
+            _discard_executor(self.executor)
@@ -1,61 +1,224 @@
-def generate_bank_standard_projections(base_revenue, base_expenses, scenario='realistic'):
+import copy
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from cachetools import TTLCache
+
+# (revenue growth, expense growth) per scenario
+SCENARIO_MULTIPLIERS = {
+    'conservative': (1.05, 1.02), # 5% rev growth, 2% exp growth
+    'realistic': (1.15, 1.05),    # 15% rev growth, 5% exp growth
+    'optimistic': (1.30, 1.10)    # 30% rev growth, 10% exp growth
+}
+
+INITIAL_CASH = 50000.0 # Initial cash assumption
+INITIAL_ASSETS = 200000.0 # Initial assets assumption
+INITIAL_LIABILITIES = 100000.0 # Initial liabilities assumption
+ASSET_APPRECIATION = 1.05 # 5% asset appreciation
+
+PROJECTION_COLUMNS = [
+    'sme', 'scenario', 'year', 'revenue', 'operating_expenses', 'net_income',
+    'net_cash_flow', 'ending_cash_balance', 'total_assets', 'total_liabilities', 'total_equity'
+]
+
+def project_scenarios(base_revenue, base_expenses, scenarios=None, years=3):
+    """
+    Vectorized projection engine: every scenario x SME x year in one pass.
+    base_revenue/base_expenses are scalars or length-n arrays (one entry per SME).
+    Growth paths are cumulative products of the scenario multipliers, so year y
+    uses base * multiplier ** (y - 1). Returns a long-format DataFrame with
+    PROJECTION_COLUMNS, ordered by scenario, SME and year.
+    """
+    scenarios = [s.lower() for s in (scenarios or SCENARIO_MULTIPLIERS)]
+    unknown = [s for s in scenarios if s not in SCENARIO_MULTIPLIERS]
+    if unknown:
+        raise ValueError(f"Unknown scenario(s): {', '.join(unknown)}")
+    if years < 1:
+        raise ValueError("years must be at least 1")
+
+    revenue0 = np.atleast_1d(np.asarray(base_revenue, dtype=np.float64))
+    expenses0 = np.atleast_1d(np.asarray(base_expenses, dtype=np.float64))
+    revenue0, expenses0 = np.broadcast_arrays(revenue0, expenses0)
+    n_smes = len(revenue0)
+
+    # (scenarios, years) growth factors; year 1 is the base year
+    mults = np.array([SCENARIO_MULTIPLIERS[s] for s in scenarios])
+    steps = np.ones((len(scenarios), years, 2))
+    steps[:, 1:, :] = mults[:, None, :]
+    growth = np.cumprod(steps, axis=1)
+
+    # (scenarios, smes, years)
+    revenue = revenue0[None, :, None] * growth[:, None, :, 0]
+    expenses = expenses0[None, :, None] * growth[:, None, :, 1]
+    net_income = revenue - expenses
+    cash = INITIAL_CASH + np.cumsum(net_income, axis=2)
+    assets = np.broadcast_to(INITIAL_ASSETS * ASSET_APPRECIATION ** np.arange(years), net_income.shape)
+    equity = assets - INITIAL_LIABILITIES + net_income
+
+    shape = net_income.shape
+    return pd.DataFrame({
+        'sme': np.broadcast_to(np.arange(n_smes)[None, :, None], shape).ravel(),
+        'scenario': np.broadcast_to(np.array(scenarios, dtype=object)[:, None, None], shape).ravel(),
+        'year': np.broadcast_to(np.arange(1, years + 1)[None, None, :], shape).ravel(),
+        'revenue': revenue.ravel(),
+        'operating_expenses': expenses.ravel(),
+        'net_income': net_income.ravel(),
+        'net_cash_flow': net_income.ravel(),
+        'ending_cash_balance': cash.ravel(),
+        'total_assets': assets.ravel(),
+        'total_liabilities': np.full(net_income.size, INITIAL_LIABILITIES),
+        'total_equity': equity.ravel(),
+    }, columns=PROJECTION_COLUMNS)
+
+# Memoized projections: bounded LRU with a TTL, shared by the API and the Streamlit app
+PROJECTION_CACHE_SIZE = 2048
+PROJECTION_CACHE_TTL = 15 * 60 # seconds
+
+class ProjectionCache:
     """
-    Generates Cash Flow, Income Statement, and Balance Sheet stubs for a 3-year period.
+    Thread-safe TTL/LRU cache for pure projection results with hit/miss counters.
+    Values are deep-copied on the way out so callers can mutate what they get back.
+    """
+    def __init__(self, maxsize=PROJECTION_CACHE_SIZE, ttl=PROJECTION_CACHE_TTL):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            value = self._cache.get(key)
+            if value is not None:
+                self.hits += 1
+                return copy.deepcopy(value)
+            self.misses += 1
+        # Compute outside the lock; a concurrent miss on the same key just recomputes
+        value = compute()
+        with self._lock:
+            self._cache[key] = value
+        return copy.deepcopy(value)
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._cache),
+                    'maxsize': self._cache.maxsize, 'ttl': self._cache.ttl}
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self.hits = self.misses = 0
+
+projection_cache = ProjectionCache()
+
+def _normalize_inputs(base_revenue, base_expenses, scenario, years):
+    scenario = scenario.lower()
+    if scenario not in SCENARIO_MULTIPLIERS:
+        scenario = 'realistic'
+    return float(base_revenue), float(base_expenses), scenario, int(years)
+
+def scenario_projection(base_revenue, base_expenses, scenario='realistic', years=3):
+    """
+    Memoized single-SME, single-scenario projection rounded to cents
+    (one row per year with PROJECTION_COLUMNS). Unknown scenarios fall back to realistic.
+    """
+    key = _normalize_inputs(base_revenue, base_expenses, scenario, years)
+    return projection_cache.get_or_compute(
+        ('frame',) + key, lambda: project_scenarios(key[0], key[1], [key[2]], years=key[3]).round(2))
+
+def generate_bank_standard_projections(base_revenue, base_expenses, scenario='realistic', years=3):
+    """
+    Generates Cash Flow, Income Statement, and Balance Sheet stubs for a 3-year period (by default).
     Logic includes Conservative, Realistic, and Optimistic scenario multipliers.
     """
-    multipliers = {
-        'conservative': (1.05, 1.02), # 5% rev growth, 2% exp growth
-        'realistic': (1.15, 1.05),    # 15% rev growth, 5% exp growth
-        'optimistic': (1.30, 1.10)    # 30% rev growth, 10% exp growth
-    }
+    key = _normalize_inputs(base_revenue, base_expenses, scenario, years)
 
-    rev_mult, exp_mult = multipliers.get(scenario, multipliers['realistic'])
+    def compute():
+        df = scenario_projection(*key)
+        return {
+            'income_statement': df[['year', 'revenue', 'operating_expenses', 'net_income']].to_dict('records'),
+            'cash_flow': df[['year', 'net_cash_flow', 'ending_cash_balance']].to_dict('records'),
+            'balance_sheet_summary': df[['year', 'total_assets', 'total_liabilities', 'total_equity']].to_dict('records')
+        }
+    return projection_cache.get_or_compute(('statements',) + key, compute)
 
-    projections = {
-        'income_statement': [],
-        'cash_flow': [],
-        'balance_sheet_summary': []
-    }
+# Default growth distributions for simulate_cash_flows (centred on the realistic scenario)
+DEFAULT_REVENUE_GROWTH = {'distribution': 'normal', 'mean': 0.15, 'std': 0.10}
+DEFAULT_EXPENSE_GROWTH = {'distribution': 'normal', 'mean': 0.05, 'std': 0.03}
+
+SIMULATION_PERCENTILES = (5, 25, 50, 75, 95)
+
+def _draw_growth(rng, spec, size):
+    """
+    Draws annual growth rates from a distribution spec:
+    {'distribution': 'normal', 'mean', 'std'}, {'distribution': 'uniform', 'low', 'high'}
+    or {'distribution': 'triangular', 'low', 'mode', 'high'}.
+    """
+    kind = spec.get('distribution', 'normal')
+    if kind == 'normal':
+        return rng.normal(spec['mean'], spec['std'], size)
+    if kind == 'uniform':
+        return rng.uniform(spec['low'], spec['high'], size)
+    if kind == 'triangular':
+        return rng.triangular(spec['low'], spec['mode'], spec['high'], size)
+    raise ValueError(f"Unknown growth distribution: {kind}")
 
-    curr_rev = float(base_revenue)
-    curr_exp = float(base_expenses)
-    curr_cash = 50000.0 # Initial cash assumption
-    curr_assets = 200000.0 # Initial assets assumption
-    curr_liabilities = 100000.0 # Initial liabilities assumption
-
-    for year in range(1, 4):
-        # Income Statement
-        net_income = curr_rev - curr_exp
-        projections['income_statement'].append({
-            'year': year,
-            'revenue': round(curr_rev, 2),
-            'operating_expenses': round(curr_exp, 2),
-            'net_income': round(net_income, 2)
-        })
-
-        # Cash Flow (Simplified)
-        curr_cash += net_income
-        projections['cash_flow'].append({
-            'year': year,
-            'net_cash_flow': round(net_income, 2),
-            'ending_cash_balance': round(curr_cash, 2)
-        })
-
-        # Balance Sheet (Simplified)
-        curr_equity = curr_assets - curr_liabilities + net_income
-        projections['balance_sheet_summary'].append({
-            'year': year,
-            'total_assets': round(curr_assets, 2),
-            'total_liabilities': round(curr_liabilities, 2),
-            'total_equity': round(curr_equity, 2)
-        })
-
-        # Update for next year
-        curr_rev *= rev_mult
-        curr_exp *= exp_mult
-        curr_assets *= 1.05 # 5% asset appreciation
-
-    return projections
+def _simulate_paths(base_revenue, base_expenses, years, paths, revenue_growth, expense_growth, seed):
+    rng = np.random.default_rng(seed)
+    # Year 1 is the base year; growth compounds from year 2 onwards (floored at -100%)
+    steps = np.ones((2, paths, years))
+    steps[0, :, 1:] += np.maximum(_draw_growth(rng, revenue_growth, (paths, years - 1)), -1.0)
+    steps[1, :, 1:] += np.maximum(_draw_growth(rng, expense_growth, (paths, years - 1)), -1.0)
+    growth = np.cumprod(steps, axis=2)
+
+    revenue = base_revenue * growth[0]
+    net_income = revenue - base_expenses * growth[1]
+    cash = INITIAL_CASH + np.cumsum(net_income, axis=1)
+    return revenue, net_income, cash
+
+def simulate_cash_flows(base_revenue, base_expenses, years=3, paths=10000, revenue_growth=None,
+                        expense_growth=None, seed=None, workers=None):
+    """
+    Monte Carlo cash-flow simulation for one SME.
+    Draws revenue and expense growth per path and year, compounds them with a
+    cumulative product and returns per-year percentile bands plus the probability
+    that ending_cash_balance goes negative. With workers > 1 the paths are split
+    across a process pool using independent seed streams.
+    """
+    if years < 1 or paths < 1:
+        raise ValueError("years and paths must be at least 1")
+    revenue_growth = revenue_growth or DEFAULT_REVENUE_GROWTH
+    expense_growth = expense_growth or DEFAULT_EXPENSE_GROWTH
+    base_revenue, base_expenses = float(base_revenue), float(base_expenses)
+
+    seeds = np.random.SeedSequence(seed).spawn(max(workers or 1, 1))
+    chunks = np.array_split(np.arange(paths), len(seeds))
+    args = [(base_revenue, base_expenses, years, len(chunk), revenue_growth, expense_growth, s)
+            for chunk, s in zip(chunks, seeds) if len(chunk)]
+    if len(args) == 1:
+        results = [_simulate_paths(*args[0])]
+    else:
+        # spawn, as in core.document_processor: forking a threaded server process can deadlock
+        with ProcessPoolExecutor(max_workers=len(args), mp_context=multiprocessing.get_context('spawn')) as pool:
+            results = list(pool.map(_simulate_paths, *zip(*args)))
+    revenue, net_income, cash = (np.concatenate(parts) for parts in zip(*results))
+
+    def bands(values):
+        pct = np.percentile(values, SIMULATION_PERCENTILES, axis=0)
+        return {f'p{p}': np.round(pct[i], 2).tolist() for i, p in enumerate(SIMULATION_PERCENTILES)}
+
+    negative = cash < 0
+    return {
+        'paths': paths,
+        'years': list(range(1, years + 1)),
+        'revenue': bands(revenue),
+        'net_income': bands(net_income),
+        'ending_cash_balance': bands(cash),
+        'prob_negative_cash_by_year': np.round(negative.mean(axis=0), 4).tolist(),
+        'prob_negative_cash_any_year': round(float(negative.any(axis=1).mean()), 4),
+    }
 
 def get_business_plan_template(context='Namibian SME'):
     """
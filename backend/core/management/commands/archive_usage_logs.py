@@ -0,0 +1,38 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from core.models import UsageLog, UsageLogArchive
+
+class Command(BaseCommand):
+    help = 'Move usage log rows older than the retention window into the monthly archive table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep-days', type=int, default=180,
+                            help='Days of usage logs to keep in the hot table')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['keep_days'])
+        # Walk the (timestamp, user) index; each batch moves and deletes atomically
+        old_rows = UsageLog.objects.filter(timestamp__lt=cutoff).order_by('timestamp').values(
+            'id', 'user_id', 'action_id', 'detail', 'timestamp', 'ip_address', 'user_agent_id')
+
+        moved = 0
+        while True:
+            with transaction.atomic():
+                batch = list(old_rows[:options['batch_size']])
+                if not batch:
+                    break
+                UsageLogArchive.objects.bulk_create([
+                    UsageLogArchive(
+                        month=row['timestamp'].date().replace(day=1), original_id=row['id'],
+                        user_id=row['user_id'], action_id=row['action_id'], detail=row['detail'],
+                        timestamp=row['timestamp'], ip_address=row['ip_address'], user_agent_id=row['user_agent_id'])
+                    for row in batch
+                ], ignore_conflicts=True)
+                UsageLog.objects.filter(id__in=[row['id'] for row in batch]).delete()
+            moved += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f'Archived {moved} usage log rows older than {cutoff:%Y-%m-%d}'))
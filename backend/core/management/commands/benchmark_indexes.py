@@ -0,0 +1,138 @@
+import os
+import random
+import statistics
+import tempfile
+import time
+from copy import deepcopy
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+from core.models import AnomalyAlert, Assessment, FinancialProjection, FundingSource
+
+BENCHMARK_ALIAS = 'index_benchmark'
+
+# Migration before/after the query-pattern indexes
+BASELINE_MIGRATION = '0007_compact_usagelog'
+INDEXED_MIGRATION = '0008_query_pattern_indexes'
+
+SECTORS = ['General', 'Agriculture', 'Mining', 'Technology', 'Retail', 'Tourism', 'Fisheries']
+FUNDING_TYPES = ['Loan', 'Grant', 'Equity']
+
+class Command(BaseCommand):
+    help = 'Benchmark the query-pattern indexes on a throwaway synthetic SQLite database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000, help='Synthetic rows per table')
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=50, help='Timed executions per query')
+
+    def handle(self, *args, **options):
+        fd, path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(fd)
+        connections.settings[BENCHMARK_ALIAS] = {
+            **deepcopy(connections.settings['default']),
+            'ENGINE': 'django.db.backends.sqlite3', 'NAME': path, 'OPTIONS': {},
+        }
+        try:
+            call_command('migrate', database=BENCHMARK_ALIAS, verbosity=0)
+            call_command('migrate', 'core', BASELINE_MIGRATION, database=BENCHMARK_ALIAS, verbosity=0)
+            self.stdout.write(f"Generating {options['rows']:,} rows per table in {path}...")
+            self._populate(options['rows'], options['users'])
+
+            before = self._run_queries(options)
+            call_command('migrate', 'core', INDEXED_MIGRATION, database=BENCHMARK_ALIAS, verbosity=0)
+            with connections[BENCHMARK_ALIAS].cursor() as cursor:
+                cursor.execute('ANALYZE')
+            after = self._run_queries(options)
+
+            self.stdout.write(f"\n{'query':<28}{'before ms':>12}{'after ms':>12}{'speedup':>10}")
+            for name in before:
+                b, a = before[name]['median_ms'], after[name]['median_ms']
+                self.stdout.write(f'{name:<28}{b:>12.3f}{a:>12.3f}{b / max(a, 1e-6):>9.1f}x')
+                self.stdout.write(f"    plan before: {before[name]['plan']}")
+                self.stdout.write(f"    plan after:  {after[name]['plan']}")
+        finally:
+            connections[BENCHMARK_ALIAS].close()
+            del connections.settings[BENCHMARK_ALIAS]
+            os.remove(path)
+
+    def _populate(self, rows, users):
+        rng = random.Random(42)
+        connection = connections[BENCHMARK_ALIAS]
+        now = time.time()
+
+        def stamp():
+            return time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(now - rng.random() * 3 * 365 * 86400))
+
+        with transaction.atomic(using=BENCHMARK_ALIAS), connection.cursor() as cursor:
+            cursor.executemany(
+                'INSERT INTO auth_user (id, password, is_superuser, username, first_name, last_name, '
+                "email, is_staff, is_active, date_joined) VALUES (%s, '', 0, %s, '', '', '', 0, 1, %s)",
+                [(i, f'user{i}', stamp()) for i in range(1, users + 1)])
+
+            self._insert(cursor, Assessment, ['user_id', 'score', 'gap_analysis', 'created_at'],
+                         ((rng.randint(1, users), rng.randint(0, 100), '', stamp()) for _ in range(rows)))
+            self._insert(cursor, FinancialProjection,
+                         ['user_id', 'project_name', 'revenue_year1', 'expenses_year1', 'created_at'],
+                         ((rng.randint(1, users), 'Plan', rng.randint(1, 10 ** 7), rng.randint(1, 10 ** 7), stamp())
+                          for _ in range(rows)))
+            self._insert(cursor, FundingSource,
+                         ['name', 'organization', 'description', 'amount_min', 'amount_max', 'funding_type',
+                          'sector', 'requirements', 'website_url'],
+                         (('Fund', 'Org', '', 10000, 1000000, rng.choice(FUNDING_TYPES), rng.choice(SECTORS), '', '')
+                          for _ in range(rows)))
+            self._insert(cursor, AnomalyAlert,
+                         ['user_id', 'field_affected', 'anomaly_score', 'message', 'is_resolved', 'created_at'],
+                         ((rng.randint(1, users), 'revenue', rng.random() * 10, '', rng.random() < 0.9, stamp())
+                          for _ in range(rows)))
+
+    def _insert(self, cursor, model, columns, rows, chunk_size=50000):
+        sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+            model._meta.db_table, ', '.join(columns), ', '.join(['%s'] * len(columns)))
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                cursor.executemany(sql, chunk)
+                chunk = []
+        if chunk:
+            cursor.executemany(sql, chunk)
+
+    def _queries(self, rng, users):
+        # The schema is migrated back to BASELINE_MIGRATION, so every query names its
+        # columns instead of selecting fields the live models gained in later migrations
+        user_id = rng.randint(1, users)
+        using = BENCHMARK_ALIAS
+        return {
+            'assessments by user': Assessment.objects.using(using).filter(
+                user_id=user_id).order_by('-created_at', '-id').values_list('id', 'score', 'created_at')[:50],
+            'projections by user': FinancialProjection.objects.using(using).filter(
+                user_id=user_id).order_by('-created_at', '-id').values_list(
+                'id', 'revenue_year1', 'expenses_year1', 'created_at')[:50],
+            'funders by sector/type': FundingSource.objects.using(using).filter(
+                sector=rng.choice(SECTORS), funding_type=rng.choice(FUNDING_TYPES)).values_list('id', 'amount_max'),
+            'open alerts by user': AnomalyAlert.objects.using(using).filter(
+                user_id=user_id, is_resolved=False).values_list('id', 'field_affected', 'anomaly_score'),
+        }
+
+    def _run_queries(self, options):
+        rng = random.Random(7)
+        timings = {}
+        plans = {}
+        connection = connections[BENCHMARK_ALIAS]
+        for _ in range(options['repeat']):
+            for name, queryset in self._queries(rng, options['users']).items():
+                # Time the SQL alone so ORM row construction does not mask the plan difference
+                sql, params = queryset.query.sql_with_params()
+                with connection.cursor() as cursor:
+                    started = time.perf_counter()
+                    cursor.execute(sql, params)
+                    cursor.fetchall()
+                    timings.setdefault(name, []).append((time.perf_counter() - started) * 1000)
+                if name not in plans:
+                    plans[name] = queryset.explain().replace('\n', ' | ')
+        return {
+            name: {'median_ms': statistics.median(values), 'plan': plans[name]}
+            for name, values in timings.items()
+        }
@@ -0,0 +1,38 @@
+import sys
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from core.export import EXPORT_CHUNK_SIZE, EXPORT_DATASETS, EXPORT_FORMATS, iter_export
+
+class Command(BaseCommand):
+    help = 'Stream a dataset (assessments, projections, anomaly alerts, usage logs) to CSV or Parquet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=list(EXPORT_DATASETS))
+        parser.add_argument('--format', dest='output', choices=list(EXPORT_FORMATS), default='csv')
+        parser.add_argument('--output', dest='path', default='-',
+                            help="Destination file ('-' writes CSV to stdout)")
+        parser.add_argument('--since', type=date.fromisoformat, help='First day to include (YYYY-MM-DD)')
+        parser.add_argument('--until', type=date.fromisoformat, help='Last day to include (YYYY-MM-DD)')
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        if options['path'] == '-' and options['output'] == 'parquet':
+            raise CommandError('Parquet exports need an --output file.')
+
+        content = iter_export(options['dataset'], output=options['output'], since=options['since'],
+                              until=options['until'], chunk_size=options['chunk_size'])
+        written = 0
+        if options['path'] == '-':
+            for chunk in content:
+                sys.stdout.buffer.write(chunk)
+                written += len(chunk)
+            sys.stdout.buffer.flush()
+            return
+
+        with open(options['path'], 'wb') as handle:
+            for chunk in content:
+                handle.write(chunk)
+                written += len(chunk)
+        self.stdout.write(self.style.SUCCESS(
+            f"Exported {options['dataset']} to {options['path']} ({written / 1e6:.1f} MB)"))
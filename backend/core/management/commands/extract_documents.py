@@ -0,0 +1,31 @@
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from core.document_processor import DocumentDecipherer, process_pool
+
+class Command(BaseCommand):
+    help = 'Extract keywords and metrics from local documents, spreading each document\'s pages over a process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='Files to extract')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Worker processes shared by all documents (defaults to DOCUMENT_WORKERS); 0 runs serially')
+
+    def handle(self, *args, **options):
+        workers = settings.DOCUMENT_WORKERS if options['workers'] is None else options['workers']
+        paths = [Path(p) for p in options['paths']]
+        missing = [str(p) for p in paths if not p.is_file()]
+        if missing:
+            raise CommandError(f"Not a file: {', '.join(missing)}")
+
+        decipherer = DocumentDecipherer()
+        executor = process_pool(workers) if workers > 0 else None
+        try:
+            for path in paths:
+                result = decipherer.decipher_path(path, path.name, executor=executor)
+                self.stdout.write(json.dumps({'file': str(path), **result}))
+        finally:
+            if executor is not None:
+                executor.shutdown()
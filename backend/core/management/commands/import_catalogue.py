@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.catalogue import CATALOGUES, IMPORT_BATCH_SIZE, import_catalogue, read_records
+
+class Command(BaseCommand):
+    help = 'Bulk upsert a funding source or question catalogue from a CSV, JSON or Parquet file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('catalogue', choices=list(CATALOGUES))
+        parser.add_argument('path')
+        parser.add_argument('--format', dest='fmt', choices=['csv', 'json', 'jsonl', 'parquet'],
+                            help='File format (defaults to the file extension)')
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help='Validate and de-duplicate without writing')
+
+    def handle(self, *args, **options):
+        try:
+            stats = import_catalogue(options['catalogue'], read_records(options['path'], options['fmt']),
+                                     batch_size=options['batch_size'], dry_run=options['dry_run'])
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc))
+
+        for error in stats['errors']:
+            self.stderr.write(error)
+        verb = 'Would import' if options['dry_run'] else 'Imported'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {options['catalogue']}: {stats['read']} rows read, {stats['created']} created, "
+            f"{stats['updated']} updated, {stats['duplicates']} duplicates, {stats['invalid']} invalid"))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from core.jobs import DocumentWorker
+
+class Command(BaseCommand):
+    help = 'Run the document extraction worker: claims queued DocumentJobs and processes them in a process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Worker processes (defaults to DOCUMENT_WORKERS, i.e. the CPU count)')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds between queue polls when idle')
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty')
+
+    def handle(self, *args, **options):
+        worker = DocumentWorker(workers=options['workers'], poll_interval=options['poll_interval'])
+        try:
+            finished = worker.run(once=options['once'])
+        except KeyboardInterrupt:
+            self.stdout.write('Stopped; in-flight jobs were returned to the queue')
+            return
+        self.stdout.write(self.style.SUCCESS(f'Processed {finished} document jobs'))
@@ -0,0 +1,16 @@
+import time
+
+from django.core.management.base import BaseCommand
+from core.scoring import recompute_assessment_scores
+
+class Command(BaseCommand):
+    help = 'Re-score all historic assessments from their answers after question weights change'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000, help='Assessments per answers query')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        updated = recompute_assessment_scores(batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Re-scored {updated} assessments in {elapsed:.1f}s'))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from core.models import SMEProfile
+from core.trust import TrustScoreWorker, mark_trust_scores_dirty, recompute_dirty_trust_scores
+
+class Command(BaseCommand):
+    help = 'Recompute DataTrustScores whose inputs changed (verification tasks, documents, anomaly alerts)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Run a single pass and exit')
+        parser.add_argument('--debounce', type=int, default=None,
+                            help='Seconds a score must have been dirty before it is recomputed '
+                                 '(defaults to TRUST_SCORE_DEBOUNCE)')
+        parser.add_argument('--batch-size', type=int, default=None, help='Scores recomputed per batch')
+        parser.add_argument('--poll-interval', type=float, default=5.0, help='Seconds between passes')
+        parser.add_argument('--all', action='store_true',
+                            help='Mark every profile dirty first (backfill after deploying or changing the formula)')
+
+    def handle(self, *args, **options):
+        updated = 0
+        if options['all']:
+            mark_trust_scores_dirty(SMEProfile.objects.values_list('user_id', flat=True))
+            updated = recompute_dirty_trust_scores(debounce=0, batch_size=options['batch_size'])
+        worker = TrustScoreWorker(debounce=options['debounce'], batch_size=options['batch_size'],
+                                  poll_interval=options['poll_interval'])
+        try:
+            updated += worker.run(once=options['once'])
+        except KeyboardInterrupt:
+            self.stdout.write('Stopped')
+            return
+        self.stdout.write(self.style.SUCCESS(f'Recomputed {updated} trust scores'))
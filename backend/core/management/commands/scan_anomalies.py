@@ -0,0 +1,125 @@
+import sys
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from core.models import AnomalyAlert, FinancialProjection, SMEProfile
+from core.trust import mark_trust_scores_dirty
+from core.validation import (BENCHMARK_FIELDS, DataAnomalyDetector, HIGH_EXPENSE_MESSAGE,
+                             NEGATIVE_REVENUE_MESSAGE)
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Field reported on the alert and rule name used in its source_key, per check_consistency rule
+CONSISTENCY_RULES = {
+    NEGATIVE_REVENUE_MESSAGE: ('revenue', 'negative-revenue'),
+    HIGH_EXPENSE_MESSAGE: ('expenses', 'expense-ratio'),
+}
+
+def alert_key(projection_id, field, rule):
+    # Stable across scans, unlike the message, whose z-score moves with the sector benchmark
+    return f'projection:{projection_id}:{field}:{rule}'
+
+class Command(BaseCommand):
+    help = 'Scan all financial projections for sector outliers and consistency issues in vectorized chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument('--threshold', type=float, default=3.0,
+                            help='Absolute z-score above which a value is flagged')
+        parser.add_argument('--dry-run', action='store_true', help='Report anomalies without creating alerts')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        detector = DataAnomalyDetector()
+        sectors = dict(SMEProfile.objects.values_list('user_id', 'sector'))
+        self._benchmarks = {}
+        self._detector = detector
+
+        started = time.perf_counter()
+        scanned = flagged = 0
+        columns = ('id', 'user_id') + tuple(BENCHMARK_FIELDS.values())
+        rows = FinancialProjection.objects.order_by('id').values_list(*columns)
+
+        chunk = []
+        for row in rows.iterator(chunk_size=chunk_size):
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                flagged += self._scan_chunk(chunk, sectors, options)
+                scanned += len(chunk)
+                chunk = []
+        if chunk:
+            flagged += self._scan_chunk(chunk, sectors, options)
+            scanned += len(chunk)
+
+        elapsed = time.perf_counter() - started
+        rate = scanned / elapsed if elapsed > 0 else 0.0
+        self.stdout.write(f'Scanned {scanned} projections in {elapsed:.2f}s ({rate:,.0f} rows/sec)')
+        self.stdout.write(f'Peak memory: {self._peak_memory()}')
+        verb = 'Found' if options['dry_run'] else 'Created'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {flagged} anomaly alerts'))
+
+    def _scan_chunk(self, chunk, sectors, options):
+        ids = np.fromiter((r[0] for r in chunk), dtype=np.int64, count=len(chunk))
+        user_ids = np.fromiter((r[1] for r in chunk), dtype=np.int64, count=len(chunk))
+        values = {
+            field: np.fromiter((float(r[2 + i]) for r in chunk), dtype=np.float64, count=len(chunk))
+            for i, field in enumerate(BENCHMARK_FIELDS)
+        }
+        row_sectors = [sectors.get(uid, 'General') for uid in user_ids.tolist()]
+
+        candidates = []
+        for field, field_values in values.items():
+            means, stds = self._benchmark_arrays(field, row_sectors)
+            z_scores = self._detector.zscore_batch(field_values, means, stds)
+            for i in np.flatnonzero(z_scores > options['threshold']):
+                candidates.append((user_ids[i], field, z_scores[i], alert_key(ids[i], field, 'zscore'),
+                                   f'Projection #{ids[i]}: {field} is {z_scores[i]:.1f} standard deviations '
+                                   f'from the {row_sectors[i]} sector benchmark.'))
+
+        masks = self._detector.check_consistency_batch(values['revenue'], values['expenses'])
+        for message, mask in masks.items():
+            field, rule = CONSISTENCY_RULES[message]
+            for i in np.flatnonzero(mask):
+                candidates.append((user_ids[i], field, 1.0, alert_key(ids[i], field, rule),
+                                   f'Projection #{ids[i]}: {message}'))
+
+        if not candidates:
+            return 0
+
+        # Skip anomalies already raised by a previous unresolved scan
+        existing = set(AnomalyAlert.objects.filter(
+            is_resolved=False, source_key__in=[c[3] for c in candidates]
+        ).values_list('source_key', flat=True))
+        alerts = [
+            AnomalyAlert(user_id=int(uid), field_affected=field, anomaly_score=float(score), source_key=key,
+                         message=message)
+            for uid, field, score, key, message in candidates if key not in existing
+        ]
+        if not options['dry_run']:
+            AnomalyAlert.objects.bulk_create(alerts, batch_size=1000)
+            # bulk_create skips post_save, which would mark these trust scores dirty
+            mark_trust_scores_dirty({alert.user_id for alert in alerts})
+        return len(alerts)
+
+    def _benchmark_arrays(self, field, row_sectors):
+        lookup = {}
+        for sector in set(row_sectors):
+            key = (sector, field)
+            if key not in self._benchmarks:
+                self._benchmarks[key] = self._detector.get_benchmark(field, sector) or (np.nan, 0.0)
+            lookup[sector] = self._benchmarks[key]
+        means = np.array([lookup[s][0] for s in row_sectors], dtype=np.float64)
+        stds = np.array([lookup[s][1] for s in row_sectors], dtype=np.float64)
+        return means, stds
+
+    def _peak_memory(self):
+        if resource is None:
+            return 'unavailable on this platform'
+        # ru_maxrss is in bytes on macOS and kilobytes on Linux and the BSDs
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak_bytes = peak if sys.platform == 'darwin' else peak * 1024
+        return f'{peak_bytes / (1024 * 1024):.1f} MB'
@@ -1,5 +1,5 @@
 from django.core.management.base import BaseCommand
-from core.models import Question, FundingSource
+from core.catalogue import import_catalogue
 
 class Command(BaseCommand):
     help = 'Seed the database with initial Namibian funding sources and questions'
@@ -11,8 +11,8 @@ class Command(BaseCommand):
             ("Do you have a formal business plan?", "Planning", 8),
             ("Do you keep separate bank accounts for business and personal use?", "Financials", 7),
         ]
-        for text, cat, weight in questions:
-            Question.objects.get_or_create(text=text, category=cat, weight=weight)
+        import_catalogue('questions', [
+            {'text': text, 'category': cat, 'weight': weight} for text, cat, weight in questions])
 
         # Funding Sources
         sources = [
@@ -37,7 +37,6 @@ class Command(BaseCommand):
                 "requirements": "Project proposal, land ownership proof."
             }
         ]
-        for s in sources:
-            FundingSource.objects.get_or_create(**s)
+        import_catalogue('funding-sources', sources)
 
         self.stdout.write(self.style.SUCCESS('Successfully seeded Namibia DSS Database'))
@@ -0,0 +1,153 @@
+import math
+import re
+
+import numpy as np
+from .models import FundingSource
+from .serializers import FundingSourceSerializer
+from .versioning import VersionedResource
+
+# Funders in this sector are candidates for every SME
+GENERAL_SECTOR = 'General'
+
+# Words ignored by the requirements index
+STOPWORDS = {'a', 'an', 'and', 'for', 'in', 'of', 'on', 'or', 'the', 'to', 'with', 'months'}
+
+# Term weight per indexed field (requirements matter more than marketing copy)
+TEXT_FIELD_WEIGHTS = {'requirements': 2.0, 'description': 1.0}
+
+def tokenize(text):
+    """
+    Lowercases and splits text into index terms with a light plural stemmer,
+    so 'Bank statements' and 'bank statement' hit the same postings.
+    """
+    tokens = []
+    for token in re.findall(r'[a-z0-9]+', (text or '').lower()):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+class RequirementsIndex:
+    """
+    Inverted index over FundingSource.requirements and description.
+    Postings map a term to {row position: field-weighted term frequency}; queries
+    are scored with tf-idf so rare terms like 'collateral' outrank common ones.
+    """
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.postings = {}
+        for pos, row in enumerate(rows):
+            for field, weight in TEXT_FIELD_WEIGHTS.items():
+                for token in tokenize(row.get(field)):
+                    postings = self.postings.setdefault(token, {})
+                    postings[pos] = postings.get(pos, 0.0) + weight
+
+    def search(self, query, limit=20):
+        terms = tokenize(query) if isinstance(query, str) else [t for q in query for t in tokenize(q)]
+        scores = {}
+        matched = {}
+        for term in set(terms):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + len(self.rows) / len(postings))
+            for pos, tf in postings.items():
+                scores[pos] = scores.get(pos, 0.0) + tf * idf
+                matched.setdefault(pos, []).append(term)
+
+        ranked = sorted(scores, key=lambda pos: (-scores[pos], pos))[:limit]
+        return [
+            {'funding_source': self.rows[pos], 'relevance': round(scores[pos], 4),
+             'matched_terms': sorted(matched[pos])}
+            for pos in ranked
+        ]
+
+class FundingIndex:
+    """
+    In-memory sector/amount index over FundingSource.
+    Each sector holds column arrays (amount_min, amount_max, is_loan) plus the
+    pre-serialized rows, so a match is a vectorized pass over the SME's sector
+    and the General funders only, with no database query. Keyword search over
+    requirements and description goes through the attached RequirementsIndex.
+    """
+
+    def __init__(self, sources):
+        self.requirements = RequirementsIndex(list(sources))
+        grouped = {}
+        for source in sources:
+            grouped.setdefault(source['sector'], []).append(source)
+
+        self.sectors = {}
+        for sector, rows in grouped.items():
+            self.sectors[sector] = {
+                'amount_min': np.array([float(r['amount_min']) for r in rows]),
+                'amount_max': np.array([float(r['amount_max']) for r in rows]),
+                'is_loan': np.array([r['funding_type'].lower() == 'loan' for r in rows]),
+                'rows': rows,
+            }
+
+    @classmethod
+    def build(cls):
+        return cls(FundingSourceSerializer(FundingSource.objects.order_by('id'), many=True).data)
+
+    def match(self, sector, amount=None, readiness=0.5, limit=10):
+        """
+        Ranks funders for an SME. The score blends sector fit (0.5), whether the requested
+        amount lies inside [amount_min, amount_max] (0.3) and readiness (0.2).
+        Lenders weigh readiness fully; grants and equity only partially.
+        """
+        candidates = [(sector, 1.0)]
+        if sector != GENERAL_SECTOR:
+            candidates.append((GENERAL_SECTOR, 0.6))
+
+        rows, score_parts, fit_parts = [], [], []
+        for candidate_sector, sector_score in candidates:
+            entry = self.sectors.get(candidate_sector)
+            if entry is None:
+                continue
+
+            if amount is None:
+                amount_fit = np.ones(len(entry['rows']))
+            else:
+                # Decays with the relative distance outside the funder's range
+                below = np.clip(entry['amount_min'] - amount, 0, None) / np.maximum(entry['amount_min'], 1)
+                above = np.clip(amount - entry['amount_max'], 0, None) / np.maximum(entry['amount_max'], 1)
+                amount_fit = np.clip(1.0 - below - above, 0.0, 1.0)
+
+            readiness_fit = np.where(entry['is_loan'], readiness, 0.5 + readiness / 2)
+            score_parts.append(0.5 * sector_score + 0.3 * amount_fit + 0.2 * readiness_fit)
+            fit_parts.append(amount_fit == 1.0)
+            rows.extend(entry['rows'])
+
+        if not rows or limit < 1:
+            return []
+        scores = np.concatenate(score_parts)
+        fits = np.concatenate(fit_parts)
+        # Select the top `limit` in linear time, then order just those (ties keep sector-first order)
+        top = np.arange(len(scores))
+        if limit < len(scores):
+            top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.lexsort((top, -scores[top]))]
+        return [
+            {'funding_source': rows[pos], 'match_score': round(float(scores[pos]), 4),
+             'amount_in_range': bool(fits[pos])}
+            for pos in top
+        ]
+
+    def search(self, query, limit=20):
+        return self.requirements.search(query, limit=limit)
+
+# Rebuilt in every process once a FundingSource change commits
+_index = VersionedResource('funding-index', FundingIndex.build)
+
+def get_funding_index():
+    """
+    Returns the process-wide FundingIndex, rebuilding it only after FundingSource changes.
+    """
+    return _index.get()
+
+def invalidate_funding_index():
+    _index.invalidate()
@@ -0,0 +1,68 @@
+# Generated by Django 6.0.1 on 2026-10-18 10:44
+
+from django.db import migrations, models
+
+
+def backfill_sector_benchmarks(apps, schema_editor):
+    db_alias = schema_editor.connection.alias
+    FinancialProjection = apps.get_model("core", "FinancialProjection")
+    SMEProfile = apps.get_model("core", "SMEProfile")
+    SectorBenchmark = apps.get_model("core", "SectorBenchmark")
+
+    sectors = dict(SMEProfile.objects.using(db_alias).values_list("user_id", "sector"))
+    stats = {}
+    rows = FinancialProjection.objects.using(db_alias).values_list(
+        "user_id", "revenue_year1", "expenses_year1"
+    )
+    for user_id, revenue, expenses in rows.iterator(chunk_size=2000):
+        sector = sectors.get(user_id, "General")
+        for field_name, value in (("revenue", revenue), ("expenses", expenses)):
+            count, mean, m2 = stats.get((sector, field_name), (0, 0.0, 0.0))
+            count += 1
+            delta = float(value) - mean
+            mean += delta / count
+            m2 += delta * (float(value) - mean)
+            stats[(sector, field_name)] = (count, mean, m2)
+
+    SectorBenchmark.objects.using(db_alias).bulk_create(
+        SectorBenchmark(sector=sector, field_name=field_name, count=c, mean=mean, m2=m2)
+        for (sector, field_name), (c, mean, m2) in stats.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0004_question_fundingsource_requirements_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SectorBenchmark",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("sector", models.CharField(max_length=100)),
+                ("field_name", models.CharField(max_length=100)),
+                ("count", models.BigIntegerField(default=0)),
+                ("mean", models.FloatField(default=0.0)),
+                ("m2", models.FloatField(default=0.0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("sector", "field_name"), name="unique_sector_benchmark"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_sector_benchmarks, migrations.RunPython.noop),
+    ]
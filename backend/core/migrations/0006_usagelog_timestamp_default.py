@@ -0,0 +1,19 @@
+# Generated by Django 6.0.1 on 2026-10-18 10:50
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0005_sectorbenchmark"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="usagelog",
+            name="timestamp",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,236 @@
+# Generated by Django 6.0.1 on 2026-10-18 10:51
+
+import hashlib
+
+import django.db.models.deletion
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.conf import settings
+from django.db import migrations, models
+
+
+def intern_usage_logs(apps, schema_editor):
+    """
+    Moves free-text action/user-agent values into the interned tables and builds
+    the daily rollups for the existing log.
+    """
+    db_alias = schema_editor.connection.alias
+    AuditAction = apps.get_model("core", "AuditAction")
+    UserAgent = apps.get_model("core", "UserAgent")
+    UsageLog = apps.get_model("core", "UsageLog")
+    UsageDailyRollup = apps.get_model("core", "UsageDailyRollup")
+
+    for name in (
+        UsageLog.objects.using(db_alias).values_list("action", flat=True).distinct()
+    ):
+        action = AuditAction.objects.using(db_alias).create(name=name)
+        UsageLog.objects.using(db_alias).filter(action=name).update(action_ref=action)
+
+    agents = (
+        UsageLog.objects.using(db_alias)
+        .exclude(user_agent="")
+        .values_list("user_agent", flat=True)
+    )
+    for value in agents.distinct():
+        agent = UserAgent.objects.using(db_alias).create(
+            value_hash=hashlib.sha256(value.encode()).hexdigest(), value=value
+        )
+        UsageLog.objects.using(db_alias).filter(user_agent=value).update(
+            user_agent_ref=agent
+        )
+
+    daily = (
+        UsageLog.objects.using(db_alias)
+        .annotate(day=TruncDate("timestamp"))
+        .values("day", "user_id", "action_ref_id")
+        .annotate(total=Count("id"))
+    )
+    UsageDailyRollup.objects.using(db_alias).bulk_create(
+        UsageDailyRollup(
+            day=row["day"],
+            user_id=row["user_id"],
+            action_id=row["action_ref_id"],
+            count=row["total"],
+        )
+        for row in daily
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0006_usagelog_timestamp_default"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AuditAction",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=255, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="UserAgent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("value_hash", models.CharField(max_length=64, unique=True)),
+                ("value", models.TextField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name="UsageDailyRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("count", models.PositiveIntegerField(default=0)),
+                (
+                    "action",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        to="core.auditaction",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="UsageLogArchive",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("month", models.DateField()),
+                ("original_id", models.BigIntegerField(unique=True)),
+                ("timestamp", models.DateTimeField()),
+                ("ip_address", models.GenericIPAddressField(blank=True, null=True)),
+                (
+                    "action",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        to="core.auditaction",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "user_agent",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.PROTECT,
+                        to="core.useragent",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name="usagelog",
+            name="action_ref",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="+",
+                to="core.auditaction",
+            ),
+        ),
+        migrations.AddField(
+            model_name="usagelog",
+            name="user_agent_ref",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="+",
+                to="core.useragent",
+            ),
+        ),
+        migrations.RunPython(intern_usage_logs, migrations.RunPython.noop),
+        migrations.RemoveField(model_name="usagelog", name="action"),
+        migrations.RemoveField(model_name="usagelog", name="user_agent"),
+        migrations.RenameField(
+            model_name="usagelog", old_name="action_ref", new_name="action"
+        ),
+        migrations.RenameField(
+            model_name="usagelog", old_name="user_agent_ref", new_name="user_agent"
+        ),
+        migrations.AlterField(
+            model_name="usagelog",
+            name="action",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.PROTECT, to="core.auditaction"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="usagelog",
+            name="user_agent",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                to="core.useragent",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="usagelog",
+            index=models.Index(
+                fields=["timestamp", "user"], name="usagelog_timestamp_user_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="usagedailyrollup",
+            constraint=models.UniqueConstraint(
+                fields=("day", "user", "action"), name="unique_usage_daily_rollup"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="usagelogarchive",
+            index=models.Index(
+                fields=["month", "user"], name="usagelogarchive_month_idx"
+            ),
+        ),
+    ]
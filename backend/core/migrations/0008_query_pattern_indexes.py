@@ -0,0 +1,39 @@
+# Generated by Django 6.0.1 on 2026-10-18 10:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0007_compact_usagelog"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="anomalyalert",
+            index=models.Index(
+                fields=["user", "is_resolved"], name="anomaly_user_resolved_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="assessment",
+            index=models.Index(
+                fields=["user", "created_at"], name="assessment_user_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="financialprojection",
+            index=models.Index(
+                fields=["user", "created_at"], name="projection_user_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="fundingsource",
+            index=models.Index(
+                fields=["sector", "funding_type"], name="funding_sector_type_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 6.0.1 on 2026-10-18 11:11
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicate_catalogue_rows(apps, schema_editor):
+    """Keep the oldest row per natural key so the unique constraints can be added."""
+    db_alias = schema_editor.connection.alias
+    FundingSource = apps.get_model("core", "FundingSource")
+    Question = apps.get_model("core", "Question")
+    Answer = apps.get_model("core", "Answer")
+
+    duplicates = (
+        FundingSource.objects.using(db_alias)
+        .values("organization", "name")
+        .annotate(keep=Min("id"), rows=Count("id"))
+        .filter(rows__gt=1)
+    )
+    for dup in duplicates:
+        FundingSource.objects.using(db_alias).filter(
+            organization=dup["organization"], name=dup["name"]
+        ).exclude(id=dup["keep"]).delete()
+
+    duplicates = (
+        Question.objects.using(db_alias)
+        .values("text")
+        .annotate(keep=Min("id"), rows=Count("id"))
+        .filter(rows__gt=1)
+    )
+    for dup in duplicates:
+        extra = Question.objects.using(db_alias).filter(text=dup["text"]).exclude(id=dup["keep"])
+        # Re-point answers before deleting, otherwise the cascade would drop them
+        Answer.objects.using(db_alias).filter(question__in=extra).update(question_id=dup["keep"])
+        extra.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0008_query_pattern_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_catalogue_rows, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="fundingsource",
+            constraint=models.UniqueConstraint(
+                fields=("organization", "name"), name="unique_funding_source"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="question",
+            constraint=models.UniqueConstraint(
+                fields=("text",), name="unique_question_text"
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 11:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0009_catalogue_natural_keys"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="assessment",
+            name="category_scores",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
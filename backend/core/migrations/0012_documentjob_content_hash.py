@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 11:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0011_documentjob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="documentjob",
+            name="content_hash",
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
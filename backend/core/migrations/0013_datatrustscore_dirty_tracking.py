@@ -0,0 +1,27 @@
+# Generated by Django 6.0.1 on 2026-10-18 11:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0012_documentjob_content_hash"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="datatrustscore",
+            name="dirty_since",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="datatrustscore",
+            name="pending_changes",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name="datatrustscore",
+            index=models.Index(fields=["dirty_since"], name="trustscore_dirty_idx"),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 6.0.1 on 2026-10-18 11:38
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0013_datatrustscore_dirty_tracking"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="verificationtask",
+            name="assigned_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="verificationtask",
+            name="created_at",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name="verificationtask",
+            name="priority",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name="verificationtask",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("PENDING", "Pending"),
+                    ("IN_PROGRESS", "In Progress"),
+                    ("COMPLETED", "Completed"),
+                    ("REJECTED", "Rejected"),
+                ],
+                default="PENDING",
+                max_length=20,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="verificationtask",
+            index=models.Index(
+                fields=["status", "created_at"], name="verification_overdue_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="verificationtask",
+            index=models.Index(
+                fields=["status", "-priority", "created_at"],
+                name="verification_queue_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="verificationtask",
+            index=models.Index(
+                fields=["assigned_to", "status"], name="verification_assignee_idx"
+            ),
+        ),
+    ]
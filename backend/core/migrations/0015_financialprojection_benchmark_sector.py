@@ -0,0 +1,36 @@
+# Generated by Django 6.0.1 on 2026-10-18 11:48
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_benchmark_sector(apps, schema_editor):
+    # Existing projections were counted under their owner's current sector (or General)
+    db_alias = schema_editor.connection.alias
+    FinancialProjection = apps.get_model("core", "FinancialProjection")
+    SMEProfile = apps.get_model("core", "SMEProfile")
+    sector = (
+        SMEProfile.objects.using(db_alias)
+        .filter(user_id=OuterRef("user_id"))
+        .values("sector")[:1]
+    )
+    FinancialProjection.objects.using(db_alias).update(
+        benchmark_sector=Coalesce(Subquery(sector), Value("General"))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0014_verificationtask_queue"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="financialprojection",
+            name="benchmark_sector",
+            field=models.CharField(blank=True, editable=False, max_length=100),
+        ),
+        migrations.RunPython(backfill_benchmark_sector, migrations.RunPython.noop),
+    ]
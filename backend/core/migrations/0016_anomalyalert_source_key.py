@@ -0,0 +1,62 @@
+# Generated by Django 6.0.1 on 2026-10-18 11:50
+
+import re
+
+from django.conf import settings
+from django.db import migrations, models
+
+ZSCORE_MESSAGE = re.compile(r"^Projection #(\d+): (\w+) is ")
+CONSISTENCY_MESSAGES = {
+    "Revenue cannot be negative.": "negative-revenue",
+    "Expenses are unusually high relative to revenue (over 10x).": "expense-ratio",
+}
+
+
+def backfill_source_keys(apps, schema_editor):
+    """Keys the open alerts raised by earlier scan_anomalies runs so the next scan does not repeat them."""
+    db_alias = schema_editor.connection.alias
+    AnomalyAlert = apps.get_model("core", "AnomalyAlert")
+    alerts = AnomalyAlert.objects.using(db_alias).filter(
+        is_resolved=False, message__startswith="Projection #"
+    )
+    batch = []
+    for alert in alerts.iterator(chunk_size=2000):
+        match = ZSCORE_MESSAGE.match(alert.message)
+        projection_id, _, text = alert.message[len("Projection #") :].partition(": ")
+        if match:
+            alert.source_key = f"projection:{match[1]}:{match[2]}:zscore"
+        elif text in CONSISTENCY_MESSAGES:
+            rule = CONSISTENCY_MESSAGES[text]
+            alert.source_key = (
+                f"projection:{projection_id}:{alert.field_affected}:{rule}"
+            )
+        else:
+            continue
+        batch.append(alert)
+        if len(batch) >= 2000:
+            AnomalyAlert.objects.using(db_alias).bulk_update(batch, ["source_key"])
+            batch = []
+    AnomalyAlert.objects.using(db_alias).bulk_update(batch, ["source_key"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0015_financialprojection_benchmark_sector"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="anomalyalert",
+            name="source_key",
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name="anomalyalert",
+            index=models.Index(
+                fields=["source_key", "is_resolved"], name="anomaly_source_key_idx"
+            ),
+        ),
+        migrations.RunPython(backfill_source_keys, migrations.RunPython.noop),
+    ]
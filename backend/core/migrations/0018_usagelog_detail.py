@@ -0,0 +1,74 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:22
+
+import re
+
+from django.db import migrations, models
+from django.db.models import F
+
+# Per-event action names logged before UsageLog.detail existed -> (fixed name, detail group)
+DYNAMIC_ACTIONS = [
+    (re.compile(r"^Batch Prediction \((\d+ profiles)\)$"), "Batch Prediction"),
+    (re.compile(r"^Exported (\S+ \(\w+\))$"), "Exported Dataset"),
+    (re.compile(r"^Queued Document: (.*)$", re.DOTALL), "Queued Document"),
+    (re.compile(r"^Claimed Verification (Task #\d+)$"), "Claimed Verification Task"),
+    (
+        re.compile(r"^Closed Verification (Task #\d+ as \w+)$"),
+        "Closed Verification Task",
+    ),
+    (re.compile(r"^Released Verification (Task #\d+)$"), "Released Verification Task"),
+]
+
+
+def split_dynamic_actions(apps, schema_editor):
+    """Folds one-off action names into their fixed action, moving the varying part to detail."""
+    db_alias = schema_editor.connection.alias
+    AuditAction = apps.get_model("core", "AuditAction")
+    UsageLog = apps.get_model("core", "UsageLog")
+    UsageLogArchive = apps.get_model("core", "UsageLogArchive")
+    UsageDailyRollup = apps.get_model("core", "UsageDailyRollup")
+    for action in list(AuditAction.objects.using(db_alias).all()):
+        for pattern, name in DYNAMIC_ACTIONS:
+            match = pattern.match(action.name)
+            if match:
+                break
+        else:
+            continue
+        fixed, _ = AuditAction.objects.using(db_alias).get_or_create(name=name)
+        for model in (UsageLog, UsageLogArchive):
+            model.objects.using(db_alias).filter(action=action).update(
+                action=fixed, detail=match[1][:255]
+            )
+        for rollup in UsageDailyRollup.objects.using(db_alias).filter(action=action):
+            merged = UsageDailyRollup.objects.using(db_alias).filter(
+                day=rollup.day, user_id=rollup.user_id, action=fixed
+            )
+            if not merged.update(count=F("count") + rollup.count):
+                UsageDailyRollup.objects.using(db_alias).create(
+                    day=rollup.day,
+                    user_id=rollup.user_id,
+                    action=fixed,
+                    count=rollup.count,
+                )
+            rollup.delete()
+        action.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0017_cacheversion"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="usagelog",
+            name="detail",
+            field=models.CharField(blank=True, default="", max_length=255),
+        ),
+        migrations.AddField(
+            model_name="usagelogarchive",
+            name="detail",
+            field=models.CharField(blank=True, default="", max_length=255),
+        ),
+        migrations.RunPython(split_dynamic_actions, migrations.RunPython.noop),
+    ]
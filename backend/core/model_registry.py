@@ -0,0 +1,137 @@
+import os
+import pickle
+import re
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+# Artifacts are named '<name>-v<version>.npy' (coefficient array) or '<name>-v<version>.pkl' (pickled estimator)
+ARTIFACT_PATTERN = re.compile(r'^(?P<name>[\w-]+?)-v(?P<version>\d+)\.(?P<ext>npy|pkl)$')
+
+class LoadedModel:
+    """
+    A versioned model artifact held in memory.
+    Coefficient arrays are [intercept, w_1 .. w_n] of a logistic model over the
+    PredictiveEngine feature matrix; pickled estimators must expose predict_proba.
+    """
+
+    def __init__(self, version, payload, path):
+        self.version = version
+        self.payload = payload
+        self.path = path
+
+    def predict_proba(self, features):
+        if isinstance(self.payload, np.ndarray):
+            logits = self.payload[0] + features @ self.payload[1:]
+            return 1.0 / (1.0 + np.exp(-logits))
+        return np.asarray(self.payload.predict_proba(features))[:, 1]
+
+class ModelRegistry:
+    """
+    Loads the newest (or pinned) artifact for a model name once per process and
+    hot-swaps to a newer version when one is published, without a restart.
+    The artifact directory is re-scanned at most every check_interval seconds,
+    including while it is still empty.
+    """
+
+    def __init__(self, name, directory=None, check_interval=None, pinned_version=None):
+        self.name = name
+        self._directory = directory
+        self._check_interval = check_interval
+        self._pinned_version = pinned_version
+        self._model = None
+        self._last_check = None
+        self._lock = threading.Lock()
+
+    @property
+    def directory(self):
+        return Path(self._directory or getattr(settings, 'MODEL_ARTIFACT_DIR', settings.BASE_DIR / 'ml_models'))
+
+    @property
+    def check_interval(self):
+        if self._check_interval is not None:
+            return self._check_interval
+        return getattr(settings, 'MODEL_RELOAD_INTERVAL', 30)
+
+    @property
+    def pinned_version(self):
+        if self._pinned_version is not None:
+            return self._pinned_version
+        return getattr(settings, 'MODEL_PINNED_VERSIONS', {}).get(self.name)
+
+    def current(self):
+        """
+        Returns the active LoadedModel, or None when no artifact has been published.
+        """
+        now = time.monotonic()
+        if not self._scan_due(now):
+            return self._model
+
+        with self._lock:
+            if self._scan_due(now):
+                self._last_check = now
+                artifact = self._select_artifact()
+                if artifact is None:
+                    self._model = None
+                elif self._model is None or self._model.path != artifact[1]:
+                    self._model = self._load(*artifact)
+        return self._model
+
+    def reload(self):
+        self._last_check = None
+        return self.current()
+
+    def _scan_due(self, now):
+        return self._last_check is None or now - self._last_check >= self.check_interval
+
+    def available_versions(self):
+        versions = {}
+        if not self.directory.is_dir():
+            return versions
+        for entry in os.scandir(self.directory):
+            match = ARTIFACT_PATTERN.match(entry.name)
+            if match and match.group('name') == self.name:
+                versions[int(match.group('version'))] = Path(entry.path)
+        return versions
+
+    def publish(self, payload, version):
+        """
+        Writes a new artifact atomically so concurrent workers never read a partial file.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        ext = 'npy' if isinstance(payload, np.ndarray) else 'pkl'
+        target = self.directory / f'{self.name}-v{int(version)}.{ext}'
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as fh:
+            if ext == 'npy':
+                np.save(fh, payload)
+            else:
+                pickle.dump(payload, fh)
+        os.replace(tmp_path, target)
+        # Picked up by this process on its next call; other processes within check_interval
+        self._last_check = None
+        return target
+
+    def _select_artifact(self):
+        versions = self.available_versions()
+        if not versions:
+            return None
+        version = self.pinned_version
+        if version is None or version not in versions:
+            version = max(versions)
+        return version, versions[version]
+
+    def _load(self, version, path):
+        if path.suffix == '.npy':
+            # Memory-map so large weight files are paged in on demand and shared between workers
+            payload = np.load(path, mmap_mode='r')
+        else:
+            with open(path, 'rb') as fh:
+                payload = pickle.load(fh)
+        return LoadedModel(version, payload, path)
+
+readiness_registry = ModelRegistry('readiness')
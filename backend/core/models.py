@@ -1,5 +1,6 @@
-from django.db import models
+from django.db import models, router, transaction
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 class SMEProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
@@ -17,6 +18,14 @@ class DataTrustScore(models.Model):
     score = models.FloatField(default=0.0)
     last_calculated = models.DateTimeField(auto_now=True)
     verification_metrics = models.JSONField(default=dict)
+    # Set when an input changes and cleared by the recompute worker (see core.trust)
+    dirty_since = models.DateTimeField(null=True, blank=True)
+    pending_changes = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['dirty_since'], name='trustscore_dirty_idx'),
+        ]
 
 class ValidationRule(models.Model):
     field_name = models.CharField(max_length=100)
@@ -29,15 +38,38 @@ class AnomalyAlert(models.Model):
     field_affected = models.CharField(max_length=100)
     anomaly_score = models.FloatField()
     message = models.TextField()
+    # What was flagged, e.g. 'projection:42:revenue:zscore'; scans skip keys that still have an open alert
+    source_key = models.CharField(max_length=100, blank=True)
     is_resolved = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'is_resolved'], name='anomaly_user_resolved_idx'),
+            models.Index(fields=['source_key', 'is_resolved'], name='anomaly_source_key_idx'),
+        ]
+
 class VerificationTask(models.Model):
+    """A review waiting in the reviewer work queue; reviewers claim tasks through core.verification."""
     TASK_TYPES = [('DOCUMENT', 'Document Review'), ('FINANCIAL', 'Financial Audit')]
+    STATUSES = [('PENDING', 'Pending'), ('IN_PROGRESS', 'In Progress'), ('COMPLETED', 'Completed'),
+                ('REJECTED', 'Rejected')]
     task_type = models.CharField(max_length=20, choices=TASK_TYPES)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
-    status = models.CharField(max_length=20, default='PENDING')
+    status = models.CharField(max_length=20, choices=STATUSES, default='PENDING')
     assigned_to = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name='assigned_tasks')
+    priority = models.IntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+    assigned_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # claim_next_task tiers: overdue tasks by age, then by priority and age
+            models.Index(fields=['status', 'created_at'], name='verification_overdue_idx'),
+            models.Index(fields=['status', '-priority', 'created_at'], name='verification_queue_idx'),
+            # reviewer load: active tasks per assignee
+            models.Index(fields=['assigned_to', 'status'], name='verification_assignee_idx'),
+        ]
 
 class FundingSource(models.Model):
     name = models.CharField(max_length=255)
@@ -50,18 +82,39 @@ class FundingSource(models.Model):
     requirements = models.TextField(blank=True)
     website_url = models.URLField(blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['sector', 'funding_type'], name='funding_sector_type_idx'),
+        ]
+        # Natural key for catalogue imports (bulk upserts conflict on it)
+        constraints = [
+            models.UniqueConstraint(fields=['organization', 'name'], name='unique_funding_source'),
+        ]
+
 class Question(models.Model):
     text = models.CharField(max_length=500)
     category = models.CharField(max_length=100)
     weight = models.IntegerField(default=1)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['text'], name='unique_question_text'),
+        ]
+
 class Assessment(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     score = models.IntegerField(default=0)
     ml_predicted_success = models.FloatField(null=True, blank=True)
     gap_analysis = models.TextField()
+    # Weighted 0-100 score per question category, from the submitted answers
+    category_scores = models.JSONField(default=dict, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='assessment_user_created_idx'),
+        ]
+
 class Answer(models.Model):
     assessment = models.ForeignKey(Assessment, related_name='answers', on_delete=models.CASCADE)
     question = models.ForeignKey(Question, on_delete=models.CASCADE)
@@ -79,10 +132,154 @@ class FinancialProjection(models.Model):
     revenue_year1 = models.DecimalField(max_digits=12, decimal_places=2)
     expenses_year1 = models.DecimalField(max_digits=12, decimal_places=2)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Sector whose SectorBenchmark currently counts this projection, so edits and
+    # deletes subtract from the same aggregates even after the owner's sector changes
+    benchmark_sector = models.CharField(max_length=100, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='projection_user_created_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # The pre/post_save receivers in core.signals read the stored row and update its
+        # SectorBenchmark; both commit with the row or not at all (deletes already run
+        # their signals inside the deletion transaction)
+        with transaction.atomic(using=kwargs.get('using') or router.db_for_write(type(self), instance=self)):
+            super().save(*args, **kwargs)
+
+class AuditAction(models.Model):
+    """
+    Interned UsageLog action names; each log row stores only the integer key.
+    Names are a fixed vocabulary ("Exported Dataset"); the per-event part goes in UsageLog.detail.
+    """
+    name = models.CharField(max_length=255, unique=True)
+
+    def __str__(self):
+        return self.name
+
+class UserAgent(models.Model):
+    """Interned user-agent strings, deduplicated on a SHA-256 of the full value."""
+    value_hash = models.CharField(max_length=64, unique=True)
+    value = models.TextField()
+
+    def __str__(self):
+        return self.value
 
 class UsageLog(models.Model):
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
-    action = models.CharField(max_length=255)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    action = models.ForeignKey(AuditAction, on_delete=models.PROTECT)
+    # The event's subject, e.g. "Task #12" or a document name
+    detail = models.CharField(max_length=255, blank=True, default='')
+    # Stamped when the event is logged, not when the buffered audit writer flushes it
+    timestamp = models.DateTimeField(default=timezone.now)
+    ip_address = models.GenericIPAddressField(null=True, blank=True)
+    user_agent = models.ForeignKey(UserAgent, null=True, blank=True, on_delete=models.PROTECT)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['timestamp', 'user'], name='usagelog_timestamp_user_idx'),
+        ]
+
+class UsageLogArchive(models.Model):
+    """
+    Cold storage for UsageLog rows older than the retention window, keyed by month
+    so a whole month can be exported or dropped with one indexed range.
+    """
+    month = models.DateField()
+    original_id = models.BigIntegerField(unique=True)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
+    action = models.ForeignKey(AuditAction, on_delete=models.PROTECT)
+    detail = models.CharField(max_length=255, blank=True, default='')
+    timestamp = models.DateTimeField()
     ip_address = models.GenericIPAddressField(null=True, blank=True)
-    user_agent = models.TextField(blank=True)
+    user_agent = models.ForeignKey(UserAgent, null=True, blank=True, on_delete=models.PROTECT)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['month', 'user'], name='usagelogarchive_month_idx'),
+        ]
+
+class UsageDailyRollup(models.Model):
+    """Actions per user per day, maintained as audit events are written."""
+    day = models.DateField()
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
+    action = models.ForeignKey(AuditAction, on_delete=models.PROTECT)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'user', 'action'], name='unique_usage_daily_rollup'),
+        ]
+
+class SectorBenchmark(models.Model):
+    """
+    Running per-sector statistics for a financial field, maintained incrementally
+    with Welford's algorithm so anomaly checks never scan the projection history.
+    """
+    sector = models.CharField(max_length=100)
+    field_name = models.CharField(max_length=100)
+    count = models.BigIntegerField(default=0)
+    mean = models.FloatField(default=0.0)
+    m2 = models.FloatField(default=0.0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['sector', 'field_name'], name='unique_sector_benchmark'),
+        ]
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self):
+        return self.variance ** 0.5
+
+    def add_value(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def remove_value(self, value):
+        if self.count <= 1:
+            self.count, self.mean, self.m2 = 0, 0.0, 0.0
+            return
+        delta = value - self.mean
+        self.count -= 1
+        self.mean -= delta / self.count
+        self.m2 = max(self.m2 - delta * (value - self.mean), 0.0)
+
+class DocumentJob(models.Model):
+    """
+    An uploaded document waiting for (or done with) DocumentDecipherer extraction.
+    The table doubles as the work queue; see core.jobs.
+    """
+    STATUSES = [('QUEUED', 'Queued'), ('RUNNING', 'Running'), ('DONE', 'Done'), ('FAILED', 'Failed')]
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    file = models.FileField(upload_to='documents/%Y/%m/')
+    original_name = models.CharField(max_length=255)
+    content_hash = models.CharField(max_length=64, blank=True)
+    status = models.CharField(max_length=10, choices=STATUSES, default='QUEUED')
+    attempts = models.IntegerField(default=0)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'id'], name='documentjob_status_idx'),
+            models.Index(fields=['user', 'created_at'], name='documentjob_user_created_idx'),
+        ]
+
+class CacheVersion(models.Model):
+    """
+    Version counters for process-local caches (see core.versioning). Kept in the
+    database so a bump from any web worker or management command reaches all of them.
+    """
+    name = models.CharField(max_length=100, primary_key=True)
+    version = models.BigIntegerField(default=0)
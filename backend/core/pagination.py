@@ -0,0 +1,26 @@
+from rest_framework.pagination import CursorPagination
+
+class IdCursorPagination(CursorPagination):
+    """
+    Keyset pagination over the primary key; page cost is independent of table size
+    and pages stay stable while rows are being inserted.
+    """
+    ordering = '-id'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+class CreatedAtCursorPagination(IdCursorPagination):
+    ordering = ('-created_at', '-id')
+
+class TimestampCursorPagination(IdCursorPagination):
+    ordering = ('-timestamp', '-id')
+
+class DayCursorPagination(IdCursorPagination):
+    ordering = ('-day', '-id')
+
+class ProjectionBatchPagination(IdCursorPagination):
+    """Pages of projections fed through the stress-test engine in one array operation each."""
+    ordering = 'id'
+    page_size = 1000
+    max_page_size = 10000
@@ -0,0 +1,103 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+from django.conf import settings
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+def sha256_of(uploaded_file, chunk_size=HASH_CHUNK_SIZE):
+    """
+    SHA-256 hex digest of an uploaded/stored file, read chunk by chunk. Uploads
+    spooled by core.uploads.HashingTemporaryFileUploadHandler arrive pre-hashed.
+    """
+    if getattr(uploaded_file, 'sha256', None):
+        return uploaded_file.sha256
+    digest = hashlib.sha256()
+    for chunk in uploaded_file.chunks(chunk_size):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+class DocumentResultCache:
+    """
+    Content-addressed store of extraction results: one JSON file per key under
+    directory/<key[:2]>/<key>.json. Reads bump the file's mtime, and once the
+    directory grows past max_bytes the least recently used files are removed
+    until it is back under 90% of the limit. Safe to share between processes:
+    writes are atomic renames and the size is re-measured before evicting.
+    """
+    def __init__(self, directory, max_bytes):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._size = None
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return self.directory / key[:2] / f'{key}.json'
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, encoding='utf-8') as handle:
+                value = json.load(handle)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return value
+
+    def set(self, key, value):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = json.dumps(value).encode()
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as handle:
+            handle.write(data)
+        os.replace(tmp, path)
+
+        with self._lock:
+            if self._size is None:
+                self._size = self._measure()[1]
+            else:
+                self._size += len(data)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _measure(self):
+        entries = []
+        for path in self.directory.glob('*/*.json'):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries, sum(size for _, size, _ in entries)
+
+    def _evict(self):
+        entries, total = self._measure()
+        target = self.max_bytes * 0.9
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+        self._size = total
+
+    def clear(self):
+        with self._lock:
+            for _, _, path in self._measure()[0]:
+                path.unlink(missing_ok=True)
+            self._size = 0
+
+_cache = None
+
+def get_result_cache():
+    global _cache
+    if _cache is None or _cache.directory != Path(settings.DOCUMENT_CACHE_DIR):
+        _cache = DocumentResultCache(settings.DOCUMENT_CACHE_DIR, settings.DOCUMENT_CACHE_MAX_BYTES)
+    return _cache
@@ -0,0 +1,127 @@
+import numpy as np
+from django.db import connection, transaction
+from .analytics import get_engine
+from .models import Answer, Assessment, Question
+from .versioning import VersionedResource
+
+# Answers are recorded on a 0 (not at all) to RESPONSE_SCALE_MAX (fully in place) scale
+RESPONSE_SCALE_MAX = 5
+
+# Categories scoring below this (out of 100) are reported as gaps
+GAP_THRESHOLD = 60
+
+class QuestionWeights:
+    """
+    Question weights and categories as sorted NumPy arrays, so a whole batch of
+    answers can be looked up with one searchsorted call.
+    """
+    def __init__(self, rows):
+        rows = sorted(rows)
+        self.categories = sorted({category for _, _, category in rows})
+        category_codes = {category: i for i, category in enumerate(self.categories)}
+        self.question_ids = np.array([pk for pk, _, _ in rows], dtype=np.int64)
+        self.weights = np.array([weight for _, weight, _ in rows], dtype=np.float64)
+        self.category_codes = np.array([category_codes[c] for _, _, c in rows], dtype=np.int64)
+
+    @classmethod
+    def build(cls):
+        return cls(Question.objects.values_list('id', 'weight', 'category'))
+
+    def __contains__(self, question_id):
+        position = np.searchsorted(self.question_ids, question_id)
+        return position < len(self.question_ids) and self.question_ids[position] == question_id
+
+    def score(self, groups, question_ids, values, n_groups):
+        """
+        Weighted scores for n_groups assessments from flat answer arrays
+        (groups[i] is the assessment index of answer i). Returns overall scores
+        (n_groups,) and per-category scores (n_groups, n_categories) on a 0-100
+        scale; groups or categories without answers are NaN.
+        """
+        groups = np.asarray(groups, dtype=np.int64)
+        positions = np.searchsorted(self.question_ids, np.asarray(question_ids, dtype=np.int64))
+        weights = self.weights[positions]
+        earned = weights * np.clip(np.asarray(values, dtype=np.float64), 0, RESPONSE_SCALE_MAX) / RESPONSE_SCALE_MAX
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            overall = 100 * np.bincount(groups, earned, n_groups) / np.bincount(groups, weights, n_groups)
+            n_categories = len(self.categories)
+            cells = groups * n_categories + self.category_codes[positions]
+            by_category = (100 * np.bincount(cells, earned, n_groups * n_categories)
+                           / np.bincount(cells, weights, n_groups * n_categories))
+        return overall, by_category.reshape(n_groups, n_categories)
+
+    def category_dict(self, row):
+        return {category: round(float(value), 1)
+                for category, value in zip(self.categories, row) if not np.isnan(value)}
+
+    def gaps(self, category_scores):
+        return [category for category, value in category_scores.items() if value < GAP_THRESHOLD]
+
+_weights = VersionedResource('question-weights', QuestionWeights.build)
+
+def get_question_weights():
+    """Returns the process-wide QuestionWeights, reloading them only after Question changes."""
+    return _weights.get()
+
+def invalidate_question_weights():
+    _weights.invalidate()
+
+def gap_analysis(weak_categories, sector, engine=None):
+    """The stored gap_analysis text: weak questionnaire categories, then the sector's gap clusters."""
+    engine = engine or get_engine()
+    return ", ".join(weak_categories + engine.identify_gap_clusters(sector or 'General'))
+
+def score_answers(answers, weights=None):
+    """
+    Scores one assessment from [(question_id, response_value), ...].
+    Returns (score 0-100, {category: score}, [categories below GAP_THRESHOLD]).
+    """
+    if weights is None:
+        weights = get_question_weights()
+    question_ids = [question_id for question_id, _ in answers]
+    values = [value for _, value in answers]
+    overall, by_category = weights.score(np.zeros(len(answers), dtype=np.int64), question_ids, values, 1)
+    category_scores = weights.category_dict(by_category[0])
+    gaps = weights.gaps(category_scores)
+    score = 0 if np.isnan(overall[0]) else int(round(overall[0]))
+    return score, category_scores, gaps
+
+def recompute_assessment_scores(batch_size=2000):
+    """
+    Re-scores every assessment that has answers against the current question
+    weights, refreshing score, category_scores and gap_analysis: one answers
+    query and one batched UPDATE per batch of assessments.
+    Returns the number of assessments updated.
+    """
+    invalidate_question_weights()
+    weights = get_question_weights()
+    engine = get_engine()
+    category_field = Assessment._meta.get_field('category_scores')
+    update_sql = (f"UPDATE {connection.ops.quote_name(Assessment._meta.db_table)} "
+                  f"SET score = %s, category_scores = %s, gap_analysis = %s WHERE id = %s")
+    assessments = (Assessment.objects.filter(answers__isnull=False).distinct()
+                   .order_by('id').values_list('id', 'user__smeprofile__sector'))
+    updated = 0
+    last_id = 0
+    while True:
+        page = list(assessments.filter(id__gt=last_id)[:batch_size])
+        if not page:
+            return updated
+        batch = [pk for pk, _ in page]
+        last_id = batch[-1]
+        rows = np.array(Answer.objects.filter(assessment_id__in=batch)
+                        .values_list('assessment_id', 'question_id', 'response_value'),
+                        dtype=np.int64).reshape(-1, 3)
+        groups = np.searchsorted(np.asarray(batch, dtype=np.int64), rows[:, 0])
+        overall, by_category = weights.score(groups, rows[:, 1], rows[:, 2], len(batch))
+        # executemany with one parameterised UPDATE; bulk_update's CASE expressions
+        # cost more to build than the scoring itself
+        params = []
+        for (pk, sector), score, categories in zip(page, overall, by_category):
+            category_scores = weights.category_dict(categories)
+            params.append((int(round(score)), category_field.get_db_prep_value(category_scores, connection),
+                           gap_analysis(weights.gaps(category_scores), sector, engine), pk))
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(update_sql, params)
+        updated += len(batch)
@@ -1,36 +1,97 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
 from rest_framework import serializers
 from .models import (SMEProfile, Assessment, FundingSource, BusinessPlan,
-                         FinancialProjection, UsageLog, Question, Answer)
+                         FinancialProjection, UsageLog, UsageDailyRollup, Question, Answer, DocumentJob,
+                         VerificationTask)
 from .validation import DataAnomalyDetector
+from .scoring import RESPONSE_SCALE_MAX, get_question_weights
+
+class SparseFieldsetMixin:
+    """
+    Lets read requests project a subset of fields with ?fields=id,score,created_at.
+    Unknown names are ignored, and a list with no known names returns every field;
+    writes always see the full field set.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            return
+        requested = request.query_params.get('fields')
+        if not requested:
+            return
+        keep = {name.strip() for name in requested.split(',')} & set(self.fields)
+        if not keep:
+            return
+        for name in set(self.fields) - keep:
+            self.fields.pop(name)
 
-class SMEProfileSerializer(serializers.ModelSerializer):
+class SMEProfileSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = SMEProfile
         fields = '__all__'
         read_only_fields = ['user']
 
-class QuestionSerializer(serializers.ModelSerializer):
+class QuestionSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Question
         fields = '__all__'
 
 class AnswerSerializer(serializers.ModelSerializer):
+    # Checked against the cached question weights instead of one query per answer
+    question = serializers.IntegerField(source='question_id')
+    response_value = serializers.IntegerField(min_value=0, max_value=RESPONSE_SCALE_MAX)
+
     class Meta:
         model = Answer
         fields = ['question', 'response_value']
 
-class AssessmentSerializer(serializers.ModelSerializer):
+class AssessmentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     answers = AnswerSerializer(many=True, required=False)
 
     class Meta:
         model = Assessment
         fields = '__all__'
-        read_only_fields = ['user', 'score', 'ml_predicted_success', 'gap_analysis']
+        read_only_fields = ['user', 'score', 'ml_predicted_success', 'gap_analysis', 'category_scores']
+
+    def validate_answers(self, answers):
+        weights = get_question_weights()
+        question_ids = [answer['question_id'] for answer in answers]
+        unknown = sorted({pk for pk in question_ids if pk not in weights})
+        if unknown:
+            raise serializers.ValidationError(f"Unknown question id(s): {', '.join(map(str, unknown))}")
+        if len(set(question_ids)) != len(question_ids):
+            raise serializers.ValidationError("Each question can only be answered once.")
+        return answers
 
-class FinancialProjectionSerializer(serializers.ModelSerializer):
+    def _save_answers(self, assessment, answers):
+        Answer.objects.bulk_create([Answer(assessment=assessment, **answer) for answer in answers])
+
+    def create(self, validated_data):
+        answers = validated_data.pop('answers', [])
+        with transaction.atomic():
+            assessment = super().create(validated_data)
+            self._save_answers(assessment, answers)
+        return assessment
+
+    def update(self, instance, validated_data):
+        answers = validated_data.pop('answers', None)
+        # The assessment, its scores and its answers change together or not at all
+        with transaction.atomic():
+            assessment = super().update(instance, validated_data)
+            if answers is not None:
+                assessment.answers.all().delete()
+                self._save_answers(assessment, answers)
+        return assessment
+
+class FinancialProjectionSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = FinancialProjection
-        fields = '__all__'
+        exclude = ['benchmark_sector']
         read_only_fields = ['user']
 
     def validate(self, data):
@@ -53,18 +114,58 @@ class FinancialProjectionSerializer(serializers.ModelSerializer):
 
         return data
 
-class BusinessPlanSerializer(serializers.ModelSerializer):
+class BusinessPlanSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = BusinessPlan
         fields = '__all__'
         read_only_fields = ['user']
 
-class FundingSourceSerializer(serializers.ModelSerializer):
+class FundingSourceSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = FundingSource
         fields = '__all__'
 
-class UsageLogSerializer(serializers.ModelSerializer):
+class UsageLogSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    action = serializers.CharField(source='action.name', read_only=True)
+    user_agent = serializers.SerializerMethodField()
+
     class Meta:
         model = UsageLog
         fields = '__all__'
+
+    def get_user_agent(self, obj):
+        return obj.user_agent.value if obj.user_agent_id else ''
+
+class UsageDailyRollupSerializer(serializers.ModelSerializer):
+    action = serializers.CharField(source='action.name', read_only=True)
+
+    class Meta:
+        model = UsageDailyRollup
+        fields = ['day', 'user', 'action', 'count']
+
+class DocumentJobSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    ALLOWED_EXTENSIONS = ('.pdf', '.png', '.jpg', '.jpeg', '.csv')
+
+    file = serializers.FileField(write_only=True)
+
+    class Meta:
+        model = DocumentJob
+        fields = ['id', 'file', 'original_name', 'content_hash', 'status', 'attempts', 'error',
+                  'created_at', 'started_at', 'finished_at']
+        read_only_fields = ['original_name', 'content_hash', 'status', 'attempts', 'error',
+                            'created_at', 'started_at', 'finished_at']
+
+    def validate_file(self, upload):
+        if Path(upload.name).suffix.lower() not in self.ALLOWED_EXTENSIONS:
+            raise serializers.ValidationError(
+                f"Unsupported file type. Upload one of: {', '.join(self.ALLOWED_EXTENSIONS)}")
+        if upload.size > settings.DOCUMENT_MAX_UPLOAD_BYTES:
+            raise serializers.ValidationError(
+                f"File is larger than {settings.DOCUMENT_MAX_UPLOAD_BYTES // (1024 * 1024)} MB.")
+        return upload
+
+class VerificationTaskSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    class Meta:
+        model = VerificationTask
+        fields = ['id', 'task_type', 'user', 'status', 'priority', 'assigned_to', 'created_at', 'assigned_at']
+        read_only_fields = ['status', 'assigned_to', 'created_at', 'assigned_at']
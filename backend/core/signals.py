@@ -0,0 +1,86 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from .models import (AnomalyAlert, DocumentJob, SMEProfile, FinancialProjection, FundingSource, Question,
+                     VerificationTask)
+from .analytics import invalidate_cached_prediction
+from .matching import invalidate_funding_index
+from .scoring import invalidate_question_weights
+from .trust import mark_trust_scores_dirty
+from .validation import BENCHMARK_FIELDS, sector_for_projection, update_sector_benchmarks
+
+@receiver([post_save, post_delete], sender=SMEProfile)
+def invalidate_profile_prediction(sender, instance, **kwargs):
+    invalidate_cached_prediction(instance.pk)
+
+def _benchmark_values(projection):
+    return {field: getattr(projection, attr) for field, attr in BENCHMARK_FIELDS.items()}
+
+@receiver(pre_save, sender=FinancialProjection)
+def remember_previous_projection(sender, instance, raw=False, **kwargs):
+    instance._previous_benchmark_values = instance._previous_benchmark_sector = None
+    if instance.pk:
+        # Locked until the save commits, so concurrent edits cannot both subtract the same old values
+        previous = sender.objects.select_for_update().filter(pk=instance.pk).values(
+            'benchmark_sector', *BENCHMARK_FIELDS.values()).first()
+        if previous:
+            instance._previous_benchmark_values = {
+                field: previous[attr] for field, attr in BENCHMARK_FIELDS.items()}
+            instance._previous_benchmark_sector = previous['benchmark_sector']
+    if not raw:
+        instance.benchmark_sector = sector_for_projection(instance)
+
+@receiver(post_save, sender=FinancialProjection)
+def record_projection_benchmark(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous_values = getattr(instance, '_previous_benchmark_values', None)
+    previous_sector = getattr(instance, '_previous_benchmark_sector', None) or instance.benchmark_sector
+    if previous_values is not None and previous_sector != instance.benchmark_sector:
+        # The owner changed sector since this projection was counted: move the value across
+        update_sector_benchmarks(previous_sector, removed=previous_values)
+        previous_values = None
+    update_sector_benchmarks(instance.benchmark_sector, added=_benchmark_values(instance), removed=previous_values)
+
+@receiver(post_delete, sender=FinancialProjection)
+def forget_projection_benchmark(sender, instance, **kwargs):
+    sector = instance.benchmark_sector or sector_for_projection(instance)
+    update_sector_benchmarks(sector, removed=_benchmark_values(instance))
+
+@receiver([post_save, post_delete], sender=FundingSource)
+def rebuild_funding_index(sender, **kwargs):
+    invalidate_funding_index()
+
+@receiver([post_save, post_delete], sender=Question)
+def reload_question_weights(sender, **kwargs):
+    invalidate_question_weights()
+
+# Trust score inputs: mark the owner's score dirty for core.trust's worker
+
+@receiver(post_save, sender=SMEProfile)
+def create_profile_trust_score(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        mark_trust_scores_dirty(instance.user_id)
+
+@receiver(pre_save, sender=VerificationTask)
+def remember_previous_task_status(sender, instance, **kwargs):
+    instance._previous_status = None
+    if instance.pk:
+        instance._previous_status = sender.objects.filter(pk=instance.pk).values_list('status', flat=True).first()
+
+@receiver(post_save, sender=VerificationTask)
+def verification_task_changed(sender, instance, created, raw=False, **kwargs):
+    if not raw and (created or instance.status != getattr(instance, '_previous_status', None)):
+        mark_trust_scores_dirty(instance.user_id)
+
+@receiver(post_save, sender=AnomalyAlert)
+@receiver(post_save, sender=DocumentJob)
+def trust_input_saved(sender, instance, raw=False, **kwargs):
+    if raw or (sender is DocumentJob and instance.status != 'DONE'):
+        return
+    mark_trust_scores_dirty(instance.user_id)
+
+@receiver(post_delete, sender=VerificationTask)
+@receiver(post_delete, sender=AnomalyAlert)
+@receiver(post_delete, sender=DocumentJob)
+def trust_input_deleted(sender, instance, **kwargs):
+    mark_trust_scores_dirty(instance.user_id)
@@ -1,6 +1,61 @@
-from django.test import TestCase
+import hashlib
+import os
+import tempfile
+import threading
+import time
+import unittest
+import zlib
+from datetime import timedelta
+from decimal import Decimal
+from importlib import import_module
+from io import BytesIO, StringIO
+from pathlib import Path
+from types import SimpleNamespace
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+from django.apps import apps as django_apps
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from django.contrib.auth.models import User
-from .models import SMEProfile, Assessment
+from rest_framework.test import APIClient
+from fundready_backend.database import database_config
+from .models import (SMEProfile, Assessment, Answer, AnomalyAlert, AuditAction, BusinessPlan, DataTrustScore,
+                     DocumentJob, VerificationTask,
+                     FinancialProjection, FundingSource, Question, SectorBenchmark, UsageDailyRollup,
+                     UsageLog, UsageLogArchive, UserAgent)
+from .matching import FundingIndex, get_funding_index, tokenize
+from .serializers import AssessmentSerializer
+from .versioning import VersionedResource, read_version
+from .document_processor import DocumentDecipherer
+from .model_registry import ModelRegistry
+from . import audit as audit_module
+from .audit import INTERN_CACHE_SIZE, USER_AGENT_MAX_LENGTH, AuditLogWriter, audit_log, user_agent_id
+from .export import iter_export
+from .catalogue import import_catalogue, read_records
+from .scoring import get_question_weights, recompute_assessment_scores
+from .jobs import DocumentWorker, claim_next_job, finish_job, requeue_stale_jobs
+from .trust import mark_trust_scores_dirty, recompute_dirty_trust_scores
+from .verification import ReviewerAtCapacity, claim_next_task
+from .result_cache import DocumentResultCache
+from .uploads import HashingTemporaryFileUploadHandler
+from .management.commands.benchmark_indexes import BENCHMARK_ALIAS
+from .management.commands.scan_anomalies import Command as ScanAnomaliesCommand, resource
+from .document_processor import (EXTRACTORS, iter_pages, pdf_page_text, process_document, process_pool,
+                                 register_extractor, Extractor)
+from .validation import DataAnomalyDetector, MIN_BENCHMARK_SAMPLES
+from .logic import (ProjectionCache, generate_bank_standard_projections, project_scenarios,
+                    projection_cache, scenario_projection, simulate_cash_flows)
+from .analytics import (PredictiveEngine, SECTOR_CODES, PREDICTION_CACHE_PREFIX,
+                        get_cached_prediction)
 
 class coreModelTest(TestCase):
     def setUp(self):
@@ -13,3 +68,1508 @@ class coreModelTest(TestCase):
     def test_assessment_creation(self):
         assessment = Assessment.objects.create(user=self.user, score=80)
         self.assertEqual(assessment.score, 80)
+
+@override_settings(AUDIT_LOG_ASYNC=False)
+class PredictiveEngineBatchTest(TestCase):
+    def setUp(self):
+        self.engine = PredictiveEngine()
+
+    def test_predict_batch_matches_rule_bands(self):
+        features = np.array([
+            [0, 0, 1, SECTOR_CODES['General']],
+            [3, 1, 5, SECTOR_CODES['Agriculture']],
+            [10, 1, 20, SECTOR_CODES['Mining']],
+        ])
+        predictions = self.engine.predict_batch(features)
+        self.assertEqual(predictions.shape, (3,))
+        for pred, expected in zip(predictions, [0.4, 0.75, 0.9]):
+            self.assertAlmostEqual(pred, expected, delta=0.05)
+
+    def test_predict_batch_accepts_dataframe(self):
+        df = pd.DataFrame({'years_in_operation': [6, 1], 'is_registered': [1, 0]})
+        predictions = self.engine.predict_batch(df)
+        self.assertAlmostEqual(predictions[0], 0.9, delta=0.05)
+        self.assertAlmostEqual(predictions[1], 0.4, delta=0.05)
+
+    def test_predict_batch_endpoint(self):
+        user = User.objects.create_user(username='lender', password='password')
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.post('/api/assessments/predict-batch/', {'profiles': [
+            {'years_in_operation': 10, 'registration_number': 'BIPA-1', 'sector': 'Mining'},
+            {'years_in_operation': 0},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(len(response.data['predictions']), 2)
+
+    def test_predict_batch_endpoint_rejects_non_list(self):
+        user = User.objects.create_user(username='lender', password='password')
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.post('/api/assessments/predict-batch/', {'profiles': 'all'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+class DeterministicPredictionTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='sme', password='password')
+        self.profile = SMEProfile.objects.create(
+            user=self.user, company_name="Test Co", sector="Agriculture",
+            years_in_operation=4, registration_number="BIPA-42")
+
+    def test_deterministic_engine_is_stable(self):
+        engine = PredictiveEngine(deterministic=True)
+        data = {'years_in_operation': 4, 'registration_number': 'BIPA-42'}
+        first = engine.predict_readiness_probability(data)
+        self.assertEqual(first, engine.predict_readiness_probability(data))
+        self.assertEqual(first, PredictiveEngine(deterministic=True).predict_readiness_probability(data))
+        self.assertAlmostEqual(first, 0.75, delta=0.05)
+
+    def test_cached_prediction_invalidated_on_profile_save(self):
+        first = get_cached_prediction(self.profile)
+        self.assertIsNotNone(cache.get(f'{PREDICTION_CACHE_PREFIX}:{self.profile.pk}'))
+        self.assertEqual(first, get_cached_prediction(self.profile))
+
+        self.profile.years_in_operation = 10
+        self.profile.save()
+        self.assertIsNone(cache.get(f'{PREDICTION_CACHE_PREFIX}:{self.profile.pk}'))
+        self.assertAlmostEqual(get_cached_prediction(self.profile), 0.9, delta=0.05)
+
+    def test_predictions_endpoint_is_repeatable(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        first = client.get('/api/assessments/predictions/').data['ml_predicted_success']
+        second = client.get('/api/assessments/predictions/').data['ml_predicted_success']
+        self.assertEqual(first, second)
+
+class ModelRegistryTest(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.registry = ModelRegistry('readiness', directory=self.tmp.name, check_interval=0)
+
+    def test_no_artifact_falls_back_to_simulated_rules(self):
+        self.assertIsNone(self.registry.current())
+
+    def test_loads_memory_mapped_coefficients(self):
+        self.registry.publish(np.array([0.0, 0.0, 0.0, 0.0, 0.0]), version=1)
+        model = self.registry.current()
+        self.assertEqual(model.version, 1)
+        self.assertIsInstance(model.payload, np.memmap)
+        engine = PredictiveEngine(model=model)
+        self.assertAlmostEqual(engine.predict_readiness_probability({'years_in_operation': 3}), 0.5)
+
+    def test_hot_swaps_to_newer_version(self):
+        self.registry.publish(np.zeros(5), version=1)
+        first = self.registry.current()
+        self.assertIs(first, self.registry.current())
+
+        self.registry.publish(np.array([10.0, 0.0, 0.0, 0.0, 0.0]), version=2)
+        second = self.registry.current()
+        self.assertEqual(second.version, 2)
+        self.assertGreater(PredictiveEngine(model=second).predict_batch(np.zeros((1, 4)))[0], 0.99)
+
+    def test_pinned_version_wins(self):
+        self.registry.publish(np.zeros(5), version=1)
+        self.registry.publish(np.ones(5), version=2)
+        pinned = ModelRegistry('readiness', directory=self.tmp.name, check_interval=0, pinned_version=1)
+        self.assertEqual(pinned.current().version, 1)
+
+    def test_empty_directory_is_rescanned_once_per_interval(self):
+        registry = ModelRegistry('readiness', directory=self.tmp.name, check_interval=30)
+        with mock.patch('core.model_registry.time.monotonic', return_value=1000.0) as clock, \
+                mock.patch.object(registry, 'available_versions', wraps=registry.available_versions) as scan:
+            for _ in range(5):
+                self.assertIsNone(registry.current())
+            self.assertEqual(scan.call_count, 1)
+
+            # Published by another process: seen only once the interval has passed
+            self.registry.publish(np.zeros(5), version=1)
+            self.assertIsNone(registry.current())
+            clock.return_value = 1030.0
+            self.assertEqual(registry.current().version, 1)
+            self.assertEqual(scan.call_count, 2)
+
+class SectorBenchmarkTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='farmer', password='password')
+        SMEProfile.objects.create(user=self.user, company_name="Farm Co", sector="Agriculture")
+
+    def _project(self, revenue, expenses=0):
+        return FinancialProjection.objects.create(
+            user=self.user, project_name="Plan", revenue_year1=revenue, expenses_year1=expenses)
+
+    def test_running_stats_match_numpy(self):
+        values = [100000, 250000, 175000, 90000]
+        projections = [self._project(v) for v in values]
+        benchmark = SectorBenchmark.objects.get(sector="Agriculture", field_name="revenue")
+        self.assertEqual(benchmark.count, 4)
+        self.assertAlmostEqual(benchmark.mean, np.mean(values))
+        self.assertAlmostEqual(benchmark.std, np.std(values, ddof=1))
+
+        projections[0].revenue_year1 = 120000
+        projections[0].save()
+        projections[1].delete()
+        values = [120000, 175000, 90000]
+        benchmark.refresh_from_db()
+        self.assertEqual(benchmark.count, 3)
+        self.assertAlmostEqual(benchmark.mean, np.mean(values))
+        self.assertAlmostEqual(benchmark.std, np.std(values, ddof=1))
+
+    def test_removal_uses_sector_value_was_counted_under(self):
+        newcomer = User.objects.create_user(username='newcomer', password='password')
+        early = FinancialProjection.objects.create(
+            user=newcomer, project_name="Plan", revenue_year1=300000, expenses_year1=0)
+        self.assertEqual(early.benchmark_sector, 'General')
+        profile = SMEProfile.objects.create(user=newcomer, company_name="New Co", sector="Agriculture")
+        self._project(100000)
+
+        early.delete()
+        general = SectorBenchmark.objects.get(sector="General", field_name="revenue")
+        agriculture = SectorBenchmark.objects.get(sector="Agriculture", field_name="revenue")
+        self.assertEqual((general.count, agriculture.count), (0, 1))
+        self.assertAlmostEqual(agriculture.mean, 100000)
+
+        moved = FinancialProjection.objects.create(
+            user=newcomer, project_name="Plan", revenue_year1=200000, expenses_year1=0)
+        profile.sector = "Mining"
+        profile.save()
+        moved.revenue_year1 = 250000
+        moved.save()
+        agriculture.refresh_from_db()
+        mining = SectorBenchmark.objects.get(sector="Mining", field_name="revenue")
+        self.assertEqual((agriculture.count, mining.count), (1, 1))
+        self.assertAlmostEqual(agriculture.mean, 100000)
+        self.assertAlmostEqual(mining.mean, 250000)
+
+    def test_failed_benchmark_update_rolls_back_the_save(self):
+        projection = self._project(100000)
+        projection.revenue_year1 = 400000
+        with mock.patch('core.signals.update_sector_benchmarks', side_effect=OperationalError("database is locked")):
+            with self.assertRaises(OperationalError):
+                projection.save()
+            with self.assertRaises(OperationalError):
+                self._project(900000)
+        self.assertEqual(FinancialProjection.objects.get().revenue_year1, 100000)
+        benchmark = SectorBenchmark.objects.get(sector="Agriculture", field_name="revenue")
+        self.assertEqual((benchmark.count, benchmark.mean), (1, 100000))
+
+    def test_detect_outlier_uses_real_statistics(self):
+        detector = DataAnomalyDetector()
+        # Prior benchmark until enough samples exist
+        self.assertTrue(detector.detect_outlier('revenue', 1500000, 'Agriculture'))
+        for i in range(MIN_BENCHMARK_SAMPLES):
+            self._project(1400000 + (i % 5) * 50000)
+        self.assertFalse(detector.detect_outlier('revenue', 1500000, 'Agriculture'))
+        self.assertTrue(detector.detect_outlier('revenue', 5000000, 'Agriculture'))
+
+    def test_detect_outlier_unknown_sector(self):
+        self.assertFalse(DataAnomalyDetector().detect_outlier('revenue', 10 ** 9, 'Tourism'))
+
+class ScanAnomaliesCommandTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='miner', password='password')
+        SMEProfile.objects.create(user=self.user, company_name="Mine Co", sector="Mining")
+        for revenue, expenses in [(5000000, 100), (50000000, 100), (-10, 0), (1000, 20000)]:
+            FinancialProjection.objects.create(
+                user=self.user, project_name="Plan", revenue_year1=revenue, expenses_year1=expenses)
+
+    def test_scan_creates_alerts_once(self):
+        out = StringIO()
+        call_command('scan_anomalies', chunk_size=2, stdout=out)
+        self.assertIn('rows/sec', out.getvalue())
+        messages = list(AnomalyAlert.objects.values_list('field_affected', 'message'))
+        # 50M, -10 and 1000 are far from the Mining prior; -10 and 1000/20000 break consistency rules
+        self.assertEqual(len(messages), 5)
+        self.assertEqual(sum(1 for field, _ in messages if field == 'expenses'), 1)
+
+        call_command('scan_anomalies', stdout=StringIO())
+        self.assertEqual(AnomalyAlert.objects.count(), 5)
+
+    def test_rescan_after_benchmark_drift_does_not_duplicate(self):
+        call_command('scan_anomalies', stdout=StringIO())
+        outlier_key = f'projection:{FinancialProjection.objects.order_by("id")[1].pk}:revenue:zscore'
+        self.assertEqual(AnomalyAlert.objects.filter(source_key=outlier_key).count(), 1)
+        # Enough new Mining projections to replace the prior, so the z-score in the message changes
+        for i in range(MIN_BENCHMARK_SAMPLES):
+            FinancialProjection.objects.create(
+                user=self.user, project_name="Plan", revenue_year1=4000000 + i * 100000, expenses_year1=100)
+        call_command('scan_anomalies', stdout=StringIO())
+        self.assertEqual(AnomalyAlert.objects.filter(source_key=outlier_key).count(), 1)
+
+    @unittest.skipIf(resource is None, 'resource module unavailable')
+    def test_peak_memory_is_normalised_per_platform(self):
+        command = ScanAnomaliesCommand()
+        usage = SimpleNamespace(ru_maxrss=2 * 1024 * 1024)
+        with mock.patch('resource.getrusage', return_value=usage):
+            with mock.patch('sys.platform', 'linux'):
+                self.assertEqual(command._peak_memory(), '2048.0 MB')
+            with mock.patch('sys.platform', 'darwin'):
+                self.assertEqual(command._peak_memory(), '2.0 MB')
+
+    def test_dry_run_creates_nothing(self):
+        call_command('scan_anomalies', dry_run=True, stdout=StringIO())
+        self.assertFalse(AnomalyAlert.objects.exists())
+
+class FundingMatchTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='grower', password='password')
+        SMEProfile.objects.create(user=self.user, company_name="Farm Co", sector="Agriculture",
+                                  years_in_operation=6, registration_number="BIPA-7")
+        self.agri = FundingSource.objects.create(
+            name="Agri-Business Grant", organization="DBN", description="Agriculture support.",
+            amount_min=100000, amount_max=5000000, funding_type="Grant", sector="Agriculture")
+        self.general = FundingSource.objects.create(
+            name="SME Special Loan", organization="FNB Namibia", description="Loan for SMEs.",
+            amount_min=50000, amount_max=1000000, funding_type="Loan", sector="General")
+        FundingSource.objects.create(
+            name="Mining Fund", organization="DBN", description="Mining equipment.",
+            amount_min=1000000, amount_max=9000000, funding_type="Loan", sector="Mining")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_match_ranks_sector_and_amount(self):
+        response = self.client.get('/api/funding-sources/match/', {'amount': 200000})
+        self.assertEqual(response.status_code, 200)
+        names = [m['funding_source']['name'] for m in response.data['matches']]
+        self.assertEqual(names, ["Agri-Business Grant", "SME Special Loan"])
+        self.assertTrue(all(m['amount_in_range'] for m in response.data['matches']))
+
+    def test_out_of_range_amount_scores_lower(self):
+        matches = get_funding_index().match('Agriculture', amount=3000000, readiness=0.9)
+        by_name = {m['funding_source']['name']: m for m in matches}
+        self.assertFalse(by_name["SME Special Loan"]['amount_in_range'])
+        self.assertLess(by_name["SME Special Loan"]['match_score'], by_name["Agri-Business Grant"]['match_score'])
+
+    def test_index_rebuilt_when_funding_sources_change(self):
+        first = get_funding_index()
+        self.assertIs(first, get_funding_index())
+        self.general.delete()
+        names = [m['funding_source']['name'] for m in get_funding_index().match('Agriculture')]
+        self.assertEqual(names, ["Agri-Business Grant"])
+
+    def test_other_processes_rebuild_after_commit(self):
+        # A second resource with the same name stands in for another worker process
+        other_process = VersionedResource('funding-index', FundingIndex.build, check_interval=0)
+        self.assertEqual(len(other_process.get().match('Agriculture')), 2)
+        before = read_version('funding-index')
+        with self.captureOnCommitCallbacks(execute=True):
+            FundingSource.objects.create(
+                name="Harvest Fund", organization="AgriBank", description="Farm loans.", amount_min=1000,
+                amount_max=500000, funding_type="Loan", sector="Agriculture")
+            self.assertEqual(read_version('funding-index'), before)
+        self.assertEqual(read_version('funding-index'), before + 1)
+        self.assertEqual(len(other_process.get().match('Agriculture')), 3)
+
+    def test_match_requires_profile(self):
+        other = User.objects.create_user(username='anon', password='password')
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get('/api/funding-sources/match/').status_code, 400)
+
+    def test_match_rejects_out_of_range_limit(self):
+        for params in ({'limit': 0}, {'limit': -5}, {'limit': 101}, {'amount': 'nan'}, {'amount': 'inf'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get('/api/funding-sources/match/', params).status_code, 400)
+        self.assertEqual(self.client.get('/api/funding-sources/match/', {'limit': 100}).status_code, 200)
+
+    def test_top_k_matches_full_sort(self):
+        sources = [
+            {'name': f"Fund {i}", 'sector': sector, 'funding_type': kind, 'amount_min': low, 'amount_max': low * 10}
+            for i, (sector, kind, low) in enumerate(
+                [('Agriculture', 'Grant', 1000), ('General', 'Loan', 500), ('Agriculture', 'Loan', 90000),
+                 ('General', 'Equity', 20), ('Agriculture', 'Grant', 1000), ('General', 'Grant', 700000)])
+        ]
+        index = FundingIndex(sources)
+        ranked = [m['funding_source']['name'] for m in index.match('Agriculture', amount=5000, limit=len(sources))]
+        for limit in range(1, len(sources) + 1):
+            with self.subTest(limit=limit):
+                top = index.match('Agriculture', amount=5000, limit=limit)
+                self.assertEqual([m['funding_source']['name'] for m in top], ranked[:limit])
+        scores = [m['match_score'] for m in index.match('Agriculture', amount=5000, limit=10)]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+class RequirementsSearchTest(TestCase):
+    def setUp(self):
+        FundingSource.objects.create(
+            name="SME Special Loan", organization="FNB Namibia", description="Tailored loan for growing SMEs.",
+            amount_min=50000, amount_max=1000000, funding_type="Loan", sector="General",
+            requirements="BIPA Registration, 12 months bank statements.")
+        FundingSource.objects.create(
+            name="Agri-Business Grant", organization="DBN", description="Support for innovative agriculture.",
+            amount_min=100000, amount_max=5000000, funding_type="Grant", sector="Agriculture",
+            requirements="Project proposal, land ownership proof, collateral.")
+
+    def test_tokenize_stems_plurals(self):
+        self.assertEqual(tokenize("12 months Bank Statements"), ['12', 'bank', 'statement'])
+
+    def test_search_endpoint(self):
+        response = APIClient().get('/api/funding-sources/search/', {'q': 'land ownership'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 1)
+        result = response.data['results'][0]
+        self.assertEqual(result['funding_source']['name'], "Agri-Business Grant")
+        self.assertEqual(result['matched_terms'], ['land', 'ownership'])
+
+    def test_search_requires_query(self):
+        self.assertEqual(APIClient().get('/api/funding-sources/search/').status_code, 400)
+
+    def test_document_keywords_match_requirements(self):
+        decipherer = DocumentDecipherer()
+        extracted = decipherer.decipher(SimpleNamespace(name='bipa_certificate.png'))
+        matches = decipherer.match_funder_requirements(extracted, get_funding_index())
+        self.assertEqual([m['funding_source']['name'] for m in matches], ["SME Special Loan"])
+
+@override_settings(AUDIT_LOG_ASYNC=False)
+class QueryBudgetTest(TestCase):
+    """
+    Pins the number of SQL queries per endpoint; list endpoints must not grow with row counts.
+    """
+    LIST_BUDGETS = {
+        '/api/profiles/': 1,
+        '/api/questions/': 1,
+        '/api/assessments/': 2,
+        '/api/business-plans/': 1,
+        '/api/financial-projections/': 1,
+        '/api/funding-sources/': 1,
+        '/api/usage-logs/': 1,
+    }
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='admin', password='password', is_staff=True)
+        SMEProfile.objects.create(user=self.user, company_name="Budget Co", sector="Agriculture")
+        self.question = Question.objects.create(text="Registered?", category="Registration", weight=10)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _add_rows(self, n):
+        for _ in range(n):
+            assessment = Assessment.objects.create(user=self.user, score=50)
+            Answer.objects.bulk_create([
+                Answer(assessment=assessment, question=self.question, response_value=v) for v in range(3)])
+            FinancialProjection.objects.create(
+                user=self.user, project_name="Plan", revenue_year1=1000, expenses_year1=500)
+            BusinessPlan.objects.create(user=self.user, company_name="Budget Co")
+            audit_log.log(self.user, "Seeded")
+            FundingSource.objects.create(
+                name=f"Fund {FundingSource.objects.count()}", organization="DBN", description="Fund.", amount_min=1, amount_max=2,
+                funding_type="Loan", sector="General")
+
+    def test_list_endpoints_are_constant_queries(self):
+        for n in (1, 5):
+            self._add_rows(n)
+            for url, budget in self.LIST_BUDGETS.items():
+                with self.subTest(url=url, rows=n), self.assertNumQueries(budget):
+                    self.assertEqual(self.client.get(url).status_code, 200)
+
+    @override_settings(AUDIT_LOG_ASYNC=True)
+    def test_create_projection_budget(self):
+        self._add_rows(1)  # sector benchmark rows already exist
+        # Audit events are queued as in production; flush them here instead of the worker thread
+        self.addCleanup(audit_log.flush)
+        with mock.patch.object(audit_log, '_ensure_worker'):
+            # savepoint, INSERT, savepoint, locked benchmark SELECT, bulk UPDATE, two releases
+            with self.assertNumQueries(7):
+                response = self.client.post('/api/financial-projections/', {
+                    'project_name': "Plan", 'revenue_year1': 1000, 'expenses_year1': 500}, format='json')
+        self.assertEqual(response.status_code, 201)
+
+    @override_settings(AUDIT_LOG_ASYNC=True)
+    def test_assessment_create_and_retrieve_budgets(self):
+        # A real session, so request.user comes from the authentication backend
+        client = APIClient()
+        client.force_login(self.user)
+        get_question_weights()
+        self.addCleanup(audit_log.flush)
+        with mock.patch.object(audit_log, '_ensure_worker'):
+            # session, user joined with its profile, INSERT and answers INSERT (in a savepoint),
+            # answers read back for the response
+            with self.assertNumQueries(7):
+                response = client.post('/api/assessments/', {
+                    'answers': [{'question': self.question.id, 'response_value': 1}]}, format='json')
+        self.assertEqual(response.status_code, 201)
+
+        # session, user joined with its profile, assessment, prefetched answers
+        with self.assertNumQueries(4):
+            self.assertEqual(client.get(f"/api/assessments/{response.data['id']}/").status_code, 200)
+
+@override_settings(AUDIT_LOG_ASYNC=False)
+class PaginationAndFieldsTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='admin', password='password', is_staff=True)
+        for i in range(7):
+            audit_log.log(self.user, f"Action {i}")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_cursor_pagination_walks_all_rows(self):
+        seen = []
+        url = '/api/usage-logs/?page_size=3'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data['results']), 3)
+            seen.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(sorted(seen), sorted(UsageLog.objects.values_list('id', flat=True)))
+        self.assertEqual(len(seen), len(set(seen)))
+
+    def test_sparse_fieldset(self):
+        response = self.client.get('/api/usage-logs/', {'fields': 'id,action'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'action'})
+
+    def test_sparse_fieldset_with_only_unknown_names_returns_all_fields(self):
+        response = self.client.get('/api/usage-logs/', {'fields': 'nope,typo'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('action', response.data['results'][0])
+        self.assertIn('timestamp', response.data['results'][0])
+
+    def test_fields_ignored_on_write(self):
+        response = self.client.post('/api/business-plans/?fields=id', {'company_name': "Plan Co"}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(BusinessPlan.objects.get().company_name, "Plan Co")
+
+@override_settings(AUDIT_LOG_ASYNC=True)
+class AuditLogWriterTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='auditor', password='password')
+        self.writer = AuditLogWriter(batch_size=2, flush_interval=3600)
+        # Flush from the test thread so writes stay inside the test transaction
+        patcher = mock.patch.object(self.writer, '_ensure_worker')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_events_are_buffered_until_flush(self):
+        for i in range(3):
+            self.writer.log(self.user, f"Action {i}", ip_address='127.0.0.1')
+        self.assertFalse(UsageLog.objects.exists())
+
+        self.assertEqual(self.writer.flush(), 3)
+        self.assertEqual(UsageLog.objects.filter(user=self.user).count(), 3)
+        self.assertEqual(self.writer.flush(), 0)
+
+    def test_timestamp_is_taken_at_log_time(self):
+        self.writer.log(self.user, "Early")
+        logged_before = timezone.now()
+        self.writer.flush()
+        self.assertLessEqual(UsageLog.objects.get().timestamp, logged_before)
+
+    def test_size_threshold_wakes_worker(self):
+        self.writer.log(self.user, "One")
+        self.assertFalse(self.writer._wakeup.is_set())
+        self.writer.log(self.user, "Two")
+        self.assertTrue(self.writer._wakeup.is_set())
+
+    def test_failed_batch_is_requeued(self):
+        self.writer.log(self.user, "Kept")
+        with mock.patch.object(audit_module, 'write_events', side_effect=OperationalError("database is locked")):
+            with self.assertRaises(OperationalError):
+                self.writer.flush()
+        self.assertFalse(UsageLog.objects.exists())
+
+        self.assertEqual(self.writer.flush(), 1)
+        self.assertEqual(UsageLog.objects.get().action.name, "Kept")
+
+    def test_exhausted_batch_falls_back_to_single_rows(self):
+        write_events = audit_module.write_events
+
+        def reject_poison(events):
+            if any(event[1] == "Poison" for event in events):
+                raise OperationalError("value too long")
+            write_events(events)
+
+        self.writer.max_attempts = 2
+        self.writer.log(self.user, "Good")
+        self.writer.log(self.user, "Poison")
+        with mock.patch.object(audit_module, 'write_events', side_effect=reject_poison):
+            with self.assertRaises(OperationalError):
+                self.writer.flush()
+            with self.assertLogs('core.audit', level='ERROR') as logs, self.assertRaises(OperationalError):
+                self.writer.flush()
+        self.assertEqual(list(UsageLog.objects.values_list('action__name', flat=True)), ["Good"])
+        self.assertIn("Poison", logs.output[0])
+        self.assertEqual(self.writer.flush(), 0)
+
+@override_settings(AUDIT_LOG_ASYNC=True)
+class AuditLogWorkerThreadTest(TransactionTestCase):
+    """Runs the real background thread, which writes on its own database connection."""
+
+    def test_worker_thread_flushes_buffered_events(self):
+        user = User.objects.create_user(username='auditor', password='password')
+        writer = AuditLogWriter(batch_size=100, flush_interval=0.05)
+        self.addCleanup(writer.stop)
+        writer.log(user, "Background", ip_address='127.0.0.1')
+        self.assertTrue(writer._worker.is_alive())
+
+        deadline = time.monotonic() + 5
+        while not writer._queue.empty() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        # The worker holds the flush lock until the batch it dequeued is written; reading
+        # meanwhile would hit SQLite's shared-cache table lock
+        with writer._flush_lock:
+            pass
+        log = UsageLog.objects.select_related('action').get(user=user)
+        self.assertEqual(log.action.name, "Background")
+        self.assertEqual(UsageDailyRollup.objects.get(user=user).count, 1)
+
+@override_settings(AUDIT_LOG_ASYNC=False)
+class CompactUsageLogTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='admin', password='password', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_actions_and_user_agents_are_interned(self):
+        for _ in range(3):
+            audit_log.log(self.user, "Viewed Dashboard", user_agent="Mozilla/5.0")
+        audit_log.log(self.user, "Exported Report", user_agent="Mozilla/5.0")
+        self.assertEqual(UsageLog.objects.count(), 4)
+        self.assertEqual(AuditAction.objects.count(), 2)
+        self.assertEqual(UserAgent.objects.count(), 1)
+
+        row = self.client.get('/api/usage-logs/').data['results'][0]
+        self.assertEqual(row['action'], "Exported Report")
+        self.assertEqual(row['user_agent'], "Mozilla/5.0")
+
+    def test_per_event_details_share_one_action(self):
+        VerificationTask.objects.bulk_create([VerificationTask(task_type='DOCUMENT', user=self.user) for _ in range(3)])
+        for task in VerificationTask.objects.all():
+            audit_log.log(self.user, "Claimed Verification Task", detail=f"Task #{task.pk}")
+        audit_log.log(self.user, "Queued Document", detail='x' * 300, user_agent='A' * 5000)
+
+        self.assertEqual(sorted(AuditAction.objects.values_list('name', flat=True)),
+                         ["Claimed Verification Task", "Queued Document"])
+        self.assertEqual(UsageLog.objects.filter(action__name="Claimed Verification Task").count(), 3)
+        self.assertEqual(len(UsageLog.objects.get(action__name="Queued Document").detail), 255)
+        self.assertEqual(len(UserAgent.objects.get().value), USER_AGENT_MAX_LENGTH)
+
+    def test_intern_caches_are_bounded(self):
+        self.assertEqual(audit_module._action_ids.maxsize, INTERN_CACHE_SIZE)
+        # The ids cached here belong to rows this test rolls back
+        self.addCleanup(audit_module._user_agent_ids.clear)
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(INTERN_CACHE_SIZE + 10):
+                user_agent_id(f"Agent/{i}")
+        self.assertEqual(len(audit_module._user_agent_ids), INTERN_CACHE_SIZE)
+
+    def test_migration_folds_per_event_action_names(self):
+        old = AuditAction.objects.create(name="Exported usage-logs (csv)")
+        UsageLog.objects.create(user=self.user, action=old)
+        UsageDailyRollup.objects.create(day=timezone.now().date(), user=self.user, action=old, count=2)
+        audit_log.log(self.user, "Exported Dataset", detail="assessments (parquet)")
+
+        migration = import_module('core.migrations.0018_usagelog_detail')
+        migration.split_dynamic_actions(django_apps, SimpleNamespace(connection=connection))
+        self.assertEqual(list(AuditAction.objects.values_list('name', flat=True)), ["Exported Dataset"])
+        self.assertEqual(sorted(UsageLog.objects.values_list('detail', flat=True)),
+                         ["assessments (parquet)", "usage-logs (csv)"])
+        self.assertEqual(UsageDailyRollup.objects.get().count, 3)
+
+    def test_daily_rollups(self):
+        for _ in range(3):
+            audit_log.log(self.user, "Viewed Dashboard")
+        audit_log.log(self.user, "Exported Report")
+        rollup = UsageDailyRollup.objects.get(action__name="Viewed Dashboard")
+        self.assertEqual((rollup.user, rollup.count), (self.user, 3))
+
+        today = timezone.now().date().isoformat()
+        response = self.client.get('/api/usage-logs/daily/', {'since': today, 'user': self.user.pk})
+        counts = {r['action']: r['count'] for r in response.data['results']}
+        self.assertEqual(counts, {"Viewed Dashboard": 3, "Exported Report": 1})
+        self.assertEqual(self.client.get('/api/usage-logs/daily/', {'since': 'yesterday'}).status_code, 400)
+
+    def test_archive_moves_old_rows(self):
+        audit_log.log(self.user, "Old Action")
+        audit_log.log(self.user, "New Action")
+        UsageLog.objects.filter(action__name="Old Action").update(
+            timestamp=timezone.now() - timedelta(days=400))
+
+        call_command('archive_usage_logs', keep_days=180, batch_size=1, stdout=StringIO())
+        self.assertEqual(list(UsageLog.objects.values_list('action__name', flat=True)), ["New Action"])
+        archived = UsageLogArchive.objects.get()
+        self.assertEqual(archived.action.name, "Old Action")
+        self.assertEqual(archived.month.day, 1)
+        # Rollups keep reporting on archived activity
+        self.assertTrue(UsageDailyRollup.objects.filter(action__name="Old Action").exists())
+
+class DatabaseConfigTest(TestCase):
+    def test_sqlite_is_default(self):
+        config = database_config(Path('/srv/app'), environ={})
+        self.assertEqual(config['ENGINE'], 'django.db.backends.sqlite3')
+        self.assertEqual(config['NAME'], Path('/srv/app/db.sqlite3'))
+        self.assertEqual(config['OPTIONS']['transaction_mode'], 'IMMEDIATE')
+
+    def test_postgres_persistent_connections(self):
+        config = database_config(Path('.'), environ={
+            'FUNDREADY_DB_ENGINE': 'postgres', 'FUNDREADY_DB_HOST': 'db', 'FUNDREADY_DB_CONN_MAX_AGE': '300'})
+        self.assertEqual(config['ENGINE'], 'django.db.backends.postgresql')
+        self.assertEqual((config['HOST'], config['CONN_MAX_AGE']), ('db', 300))
+        self.assertTrue(config['CONN_HEALTH_CHECKS'])
+        self.assertNotIn('pool', config['OPTIONS'])
+
+    def test_postgres_pool(self):
+        config = database_config(Path('.'), environ={
+            'FUNDREADY_DB_ENGINE': 'postgres', 'FUNDREADY_DB_POOL': 'True', 'FUNDREADY_DB_POOL_MAX': '20'})
+        self.assertEqual(config['CONN_MAX_AGE'], 0)
+        self.assertEqual(config['OPTIONS']['pool']['max_size'], 20)
+
+    def test_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            database_config(Path('.'), environ={'FUNDREADY_DB_ENGINE': 'oracle'})
+
+    def test_sqlite_pragmas_applied_on_connect(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+
+class IndexBenchmarkCommandTest(TestCase):
+    def test_runs_against_the_baseline_schema(self):
+        # The command registers its own throwaway alias, which sits at an older migration than the models
+        out = StringIO()
+        with mock.patch.object(type(self), 'databases', self.databases | {BENCHMARK_ALIAS}):
+            call_command('benchmark_indexes', rows=20, users=3, repeat=1, stdout=out)
+        self.assertIn('assessments by user', out.getvalue())
+        self.assertIn('funding_sector_type_idx', out.getvalue())
+
+class ProjectionEngineTest(TestCase):
+    def test_matches_year_by_year_growth(self):
+        df = project_scenarios([100000, 200000], [80000, 150000], ['Realistic', 'optimistic'], years=4)
+        self.assertEqual(len(df), 2 * 2 * 4)
+        row = df[(df.scenario == 'optimistic') & (df.sme == 1) & (df.year == 3)].iloc[0]
+        self.assertAlmostEqual(row.revenue, 200000 * 1.30 ** 2)
+        self.assertAlmostEqual(row.operating_expenses, 150000 * 1.10 ** 2)
+        sme_rows = df[(df.scenario == 'optimistic') & (df.sme == 1)]
+        self.assertAlmostEqual(row.ending_cash_balance, 50000 + sme_rows.net_income.iloc[:3].sum())
+
+    def test_bank_standard_projections_shape(self):
+        result = generate_bank_standard_projections(100000, 80000, 'conservative')
+        self.assertEqual([r['year'] for r in result['income_statement']], [1, 2, 3])
+        self.assertEqual(result['income_statement'][1]['revenue'], 105000.0)
+        self.assertEqual(result['cash_flow'][0]['ending_cash_balance'], 70000.0)
+        self.assertEqual(result['balance_sheet_summary'][0]['total_equity'], 120000.0)
+
+    def test_unknown_scenario(self):
+        with self.assertRaises(ValueError):
+            project_scenarios(1, 1, ['pessimistic'])
+
+    def test_stress_test_endpoint(self):
+        user = User.objects.create_user(username='lender', password='password')
+        for revenue in (100000, 250000):
+            FinancialProjection.objects.create(
+                user=user, project_name="Plan", revenue_year1=revenue, expenses_year1=50000)
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get('/api/financial-projections/stress-test/', {'years': 5})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(len(response.data['results']['revenue']), 2 * 3 * 5)
+        self.assertEqual(set(response.data['results']['projection']),
+                         set(FinancialProjection.objects.values_list('id', flat=True)))
+        self.assertEqual(client.get('/api/financial-projections/stress-test/', {'years': 0}).status_code, 400)
+
+        pk = FinancialProjection.objects.first().pk
+        response = client.get(f'/api/financial-projections/{pk}/scenarios/', {'scenario': 'realistic'})
+        self.assertEqual(response.data['year'], [1, 2, 3])
+
+    def test_stress_test_pages_through_the_book(self):
+        staff = User.objects.create_user(username='lender', password='password', is_staff=True)
+        for revenue in (100000, 200000, 300000):
+            FinancialProjection.objects.create(
+                user=staff, project_name="Plan", revenue_year1=revenue, expenses_year1=50000)
+        client = APIClient()
+        client.force_authenticate(staff)
+        seen = []
+        url = '/api/financial-projections/stress-test/?page_size=2&years=1&scenario=realistic'
+        while url:
+            response = client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(response.data['count'], 2)
+            seen.extend(response.data['results']['projection'])
+            url = response.data['next']
+        self.assertEqual(seen, list(FinancialProjection.objects.order_by('id').values_list('id', flat=True)))
+
+class ProjectionCacheTest(TestCase):
+    def setUp(self):
+        projection_cache.clear()
+
+    def test_identical_inputs_hit_the_cache(self):
+        first = generate_bank_standard_projections(100000, 80000, 'Realistic')
+        second = generate_bank_standard_projections(Decimal('100000'), 80000.0, 'realistic')
+        self.assertEqual(first, second)
+        stats = projection_cache.stats()
+        self.assertEqual(stats['hits'], 1)
+        # one miss for the statements, one for the underlying frame
+        self.assertEqual(stats['misses'], 2)
+
+    def test_cached_results_are_isolated_copies(self):
+        result = generate_bank_standard_projections(100000, 80000)
+        result['income_statement'][0]['revenue'] = -1
+        frame = scenario_projection(100000, 80000, 'realistic')
+        frame['revenue'] = 0
+        self.assertEqual(generate_bank_standard_projections(100000, 80000)['income_statement'][0]['revenue'], 100000.0)
+        self.assertEqual(scenario_projection(100000, 80000, 'realistic')['revenue'].iloc[0], 100000.0)
+
+    def test_lru_eviction(self):
+        cache = ProjectionCache(maxsize=2, ttl=60)
+        for key in ('a', 'b', 'a', 'c'):
+            cache.get_or_compute(key, lambda: key.upper())
+        self.assertEqual(cache.stats()['hits'], 1)
+        # 'b' was least recently used when 'c' arrived
+        cache.get_or_compute('b', lambda: 'B')
+        self.assertEqual(cache.stats()['misses'], 4)
+
+class CashFlowSimulationTest(TestCase):
+    def test_zero_variance_matches_deterministic_projection(self):
+        fixed = {'distribution': 'normal', 'mean': 0.15, 'std': 0.0}
+        fixed_exp = {'distribution': 'normal', 'mean': 0.05, 'std': 0.0}
+        result = simulate_cash_flows(100000, 80000, years=3, paths=100, revenue_growth=fixed,
+                                     expense_growth=fixed_exp, seed=1)
+        expected = generate_bank_standard_projections(100000, 80000, 'realistic')['cash_flow']
+        self.assertEqual(result['ending_cash_balance']['p50'], [r['ending_cash_balance'] for r in expected])
+        self.assertEqual(result['prob_negative_cash_any_year'], 0.0)
+
+    def test_seeded_runs_are_reproducible_and_bands_ordered(self):
+        first = simulate_cash_flows(100000, 99000, years=5, paths=5000, seed=42)
+        self.assertEqual(first, simulate_cash_flows(100000, 99000, years=5, paths=5000, seed=42))
+        bands = first['ending_cash_balance']
+        for lower, upper in zip(bands['p5'], bands['p95']):
+            self.assertLessEqual(lower, upper)
+        self.assertTrue(0.0 <= first['prob_negative_cash_any_year'] <= 1.0)
+
+    def test_parallel_paths_run_in_spawned_workers(self):
+        with mock.patch('core.logic.ProcessPoolExecutor', wraps=ProcessPoolExecutor) as pool:
+            result = simulate_cash_flows(100000, 99000, years=3, paths=2000, seed=5, workers=2)
+        self.assertEqual(pool.call_args.kwargs['mp_context'].get_start_method(), 'spawn')
+        self.assertEqual(result, simulate_cash_flows(100000, 99000, years=3, paths=2000, seed=5, workers=2))
+
+    def test_loss_making_sme_runs_out_of_cash(self):
+        result = simulate_cash_flows(10000, 100000, years=3, paths=1000, seed=3)
+        self.assertEqual(result['prob_negative_cash_by_year'][-1], 1.0)
+
+    def test_simulate_endpoint(self):
+        user = User.objects.create_user(username='owner', password='password')
+        projection = FinancialProjection.objects.create(
+            user=user, project_name="Plan", revenue_year1=100000, expenses_year1=90000)
+        client = APIClient()
+        client.force_authenticate(user)
+        url = f'/api/financial-projections/{projection.pk}/simulate/'
+        response = client.get(url, {'paths': 20000, 'years': 4, 'seed': 7})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['years'], [1, 2, 3, 4])
+        self.assertEqual(client.get(url, {'paths': 10 ** 7}).status_code, 400)
+        self.assertEqual(client.get(url, {'revenue_growth_std': 'wide'}).status_code, 400)
+
+    def test_simulate_rejects_non_finite_and_out_of_range_growth(self):
+        user = User.objects.create_user(username='owner', password='password')
+        projection = FinancialProjection.objects.create(
+            user=user, project_name="Plan", revenue_year1=100000, expenses_year1=90000)
+        client = APIClient()
+        client.force_authenticate(user)
+        url = f'/api/financial-projections/{projection.pk}/simulate/'
+        for params in ({'revenue_growth_mean': 'nan'}, {'expense_growth_std': 'nan'},
+                       {'revenue_growth_mean': 'inf'}, {'expense_growth_mean': '-inf'},
+                       {'revenue_growth_mean': '1e300', 'years': 30}, {'revenue_growth_std': '1e300'},
+                       {'revenue_growth_std': -0.1}, {'years': 31}, {'seed': -1}):
+            with self.subTest(params=params):
+                self.assertEqual(client.get(url, {'paths': 100, **params}).status_code, 400)
+        response = client.get(url, {'paths': 100, 'years': 30, 'revenue_growth_mean': 1, 'revenue_growth_std': 1})
+        self.assertEqual(response.status_code, 200)
+
+@override_settings(AUDIT_LOG_ASYNC=False)
+class ExportTest(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin', password='password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        for i in range(7):
+            FinancialProjection.objects.create(user=self.admin, project_name=f"Plan {i}",
+                                               revenue_year1=Decimal('1000.50') * (i + 1), expenses_year1=500)
+
+    def test_csv_is_streamed_in_chunks(self):
+        chunks = list(iter_export('financial-projections', chunk_size=3))
+        # 7 rows in batches of 3 -> three chunks, header included in the first
+        self.assertEqual(len(chunks), 3)
+        df = pd.read_csv(BytesIO(b''.join(chunks)))
+        self.assertEqual(len(df), 7)
+        self.assertEqual(df['revenue_year1'].iloc[1], 2001.0)
+
+    def test_parquet_round_trip(self):
+        content = b''.join(iter_export('financial-projections', output='parquet', chunk_size=3))
+        parquet = pq.ParquetFile(BytesIO(content))
+        self.assertEqual(parquet.metadata.num_row_groups, 3)
+        table = parquet.read()
+        self.assertEqual(table.num_rows, 7)
+        self.assertEqual(table.column('revenue_year1')[0].as_py(), Decimal('1000.50'))
+
+    def test_export_endpoint(self):
+        audit_log.log(self.admin, "Viewed dashboard", user_agent='pytest')
+        response = self.client.get('/api/exports/usage-logs/', {'since': '2000-01-01'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        body = b''.join(response.streaming_content).decode()
+        self.assertIn('Viewed dashboard', body)
+        self.assertIn('pytest', body)
+        self.assertIn('attachment; filename="usage-logs-', response['Content-Disposition'])
+
+        response = self.client.get('/api/exports/anomaly-alerts/', {'output': 'parquet'})
+        self.assertEqual(pq.read_table(BytesIO(b''.join(response.streaming_content))).num_rows, 0)
+        self.assertEqual(self.client.get('/api/exports/passwords/').status_code, 400)
+        self.assertEqual(self.client.get('/api/exports/assessments/', {'output': 'xlsx'}).status_code, 400)
+
+    def test_export_requires_admin(self):
+        member = User.objects.create_user(username='member', password='password')
+        self.client.force_authenticate(member)
+        self.assertEqual(self.client.get('/api/exports/assessments/').status_code, 403)
+
+    def test_export_command_writes_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'projections.parquet'
+            call_command('export_data', 'financial-projections', '--format', 'parquet',
+                         '--output', str(path), stdout=StringIO())
+            self.assertEqual(pq.read_table(path).num_rows, 7)
+
+class CatalogueImportTest(TestCase):
+    def funder(self, name, **overrides):
+        row = {'name': name, 'organization': 'DBN', 'description': 'Loan', 'amount_min': '1000',
+               'amount_max': '50000', 'funding_type': 'Loan', 'sector': 'Retail'}
+        row.update(overrides)
+        return row
+
+    def test_upsert_deduplicates_on_natural_key(self):
+        FundingSource.objects.create(**self.funder('Existing Fund', amount_max=10))
+        rows = [self.funder('Existing Fund', amount_max='75000'), self.funder('New Fund'),
+                self.funder('New Fund', sector='Agriculture'), self.funder('Broken', amount_min='lots')]
+        with self.assertNumQueries(5):
+            stats = import_catalogue('funding-sources', rows)
+        self.assertEqual((stats['created'], stats['updated'], stats['duplicates'], stats['invalid']), (1, 1, 1, 1))
+        self.assertEqual(FundingSource.objects.get(name='Existing Fund').amount_max, 75000)
+        self.assertEqual(FundingSource.objects.get(name='New Fund').sector, 'Agriculture')
+
+    def test_reads_csv_json_lines_and_parquet(self):
+        frame = pd.DataFrame([{'text': f'Question {i}?', 'category': 'General', 'weight': i} for i in range(3)])
+        with tempfile.TemporaryDirectory() as tmp:
+            frame.to_csv(Path(tmp) / 'q.csv', index=False)
+            frame.to_json(Path(tmp) / 'q.jsonl', orient='records', lines=True)
+            frame.to_parquet(Path(tmp) / 'q.parquet')
+            for name in ('q.csv', 'q.jsonl', 'q.parquet'):
+                self.assertEqual([r['text'] for r in read_records(Path(tmp) / name)],
+                                 list(frame['text']), name)
+            call_command('import_catalogue', 'questions', str(Path(tmp) / 'q.parquet'), stdout=StringIO())
+        self.assertEqual(sorted(Question.objects.values_list('weight', flat=True)), [0, 1, 2])
+
+    def test_import_invalidates_caches_in_every_process(self):
+        for dataset, name, row in (('funding-sources', 'funding-index', self.funder('New Fund')),
+                                   ('questions', 'question-weights', {'text': 'Audited?', 'category': 'Finance'})):
+            before = read_version(name)
+            with self.captureOnCommitCallbacks(execute=True):
+                import_catalogue(dataset, [row])
+            with self.subTest(dataset=dataset):
+                self.assertEqual(read_version(name), before + 1)
+        self.assertIn(Question.objects.get(text='Audited?').pk, get_question_weights())
+
+    def test_seed_db_is_idempotent(self):
+        call_command('seed_db', stdout=StringIO())
+        call_command('seed_db', stdout=StringIO())
+        self.assertEqual(FundingSource.objects.count(), 2)
+        self.assertEqual(Question.objects.count(), 3)
+
+@override_settings(AUDIT_LOG_ASYNC=False)
+class AssessmentScoringTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='scored', password='password')
+        self.registered = Question.objects.create(text="Registered?", category="Registration", weight=10)
+        self.plan = Question.objects.create(text="Business plan?", category="Planning", weight=5)
+        self.accounts = Question.objects.create(text="Separate accounts?", category="Planning", weight=5)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def answers(self, registered, plan, accounts):
+        return [{'question': self.registered.pk, 'response_value': registered},
+                {'question': self.plan.pk, 'response_value': plan},
+                {'question': self.accounts.pk, 'response_value': accounts}]
+
+    def test_create_persists_answers_and_weighted_score(self):
+        response = self.client.post('/api/assessments/', {'answers': self.answers(5, 1, 3)}, format='json')
+        self.assertEqual(response.status_code, 201)
+        assessment = Assessment.objects.get(pk=response.data['id'])
+        self.assertEqual(assessment.answers.count(), 3)
+        # (10*5 + 5*1 + 5*3) / (20*5) = 70%
+        self.assertEqual(assessment.score, 70)
+        self.assertEqual(assessment.category_scores, {'Planning': 40.0, 'Registration': 100.0})
+        self.assertTrue(assessment.gap_analysis.startswith('Planning'))
+        self.assertEqual(len(response.data['answers']), 3)
+
+    def test_rejects_unknown_questions_and_out_of_scale_values(self):
+        bad_question = [{'question': 999, 'response_value': 3}]
+        self.assertEqual(self.client.post('/api/assessments/', {'answers': bad_question}, format='json').status_code, 400)
+        self.assertEqual(self.client.post('/api/assessments/', {'answers': self.answers(9, 0, 0)},
+                                          format='json').status_code, 400)
+        self.assertFalse(Assessment.objects.exists())
+
+    def test_weights_are_cached_until_questions_change(self):
+        get_question_weights()
+        with self.assertNumQueries(0):
+            get_question_weights()
+        Question.objects.filter(pk=self.plan.pk).update(weight=1)
+        self.assertEqual(get_question_weights().weights.tolist(), [10.0, 5.0, 5.0])
+        self.plan.weight = 1
+        self.plan.save()
+        self.assertEqual(get_question_weights().weights.tolist(), [10.0, 1.0, 5.0])
+
+    def test_bulk_recompute_after_weight_change(self):
+        for values in ((5, 0, 0), (0, 5, 5)):
+            self.client.post('/api/assessments/', {'answers': self.answers(*values)}, format='json')
+        Assessment.objects.create(user=self.user, score=42)  # no answers: left alone
+        self.assertEqual(sorted(Assessment.objects.values_list('score', flat=True)), [42, 50, 50])
+
+        Question.objects.filter(pk=self.registered.pk).update(weight=30)
+        # weights version + weights, then ids + answers + bulk update (in a savepoint) per batch,
+        # then the empty ids page
+        with self.assertNumQueries(8):
+            self.assertEqual(recompute_assessment_scores(), 2)
+        self.assertEqual(sorted(Assessment.objects.values_list('score', flat=True)), [25, 42, 75])
+
+    def test_recompute_refreshes_gap_analysis(self):
+        SMEProfile.objects.create(user=self.user, company_name="Scored Co", sector="Mining")
+        self.client.post('/api/assessments/', {'answers': self.answers(5, 5, 1)}, format='json')
+        assessment = Assessment.objects.get()
+        self.assertEqual(assessment.gap_analysis, "Environmental Compliance Gap, Equipment Financing Needs")
+
+        # Planning drops under the gap threshold once its weaker answer carries most of the weight
+        Question.objects.filter(pk=self.plan.pk).update(weight=1)
+        recompute_assessment_scores()
+        assessment.refresh_from_db()
+        self.assertEqual(assessment.category_scores, {'Planning': 33.3, 'Registration': 100.0})
+        self.assertEqual(assessment.gap_analysis,
+                         "Planning, Environmental Compliance Gap, Equipment Financing Needs")
+
+    def test_update_recomputes_score_and_gap_analysis(self):
+        response = self.client.post('/api/assessments/', {'answers': self.answers(0, 5, 5)}, format='json')
+        self.assertTrue(response.data['gap_analysis'].startswith('Registration, '))
+
+        response = self.client.patch(f"/api/assessments/{response.data['id']}/",
+                                     {'answers': self.answers(5, 0, 5)}, format='json')
+        self.assertEqual(response.status_code, 200)
+        assessment = Assessment.objects.get()
+        self.assertEqual(assessment.score, 75)
+        self.assertEqual(assessment.gap_analysis, "Planning, Business Plan Clarity, Credit History Improvement")
+
+    def test_clearing_answers_matches_creating_without_answers(self):
+        created = self.client.post('/api/assessments/', {'answers': []}, format='json').data
+        response = self.client.post('/api/assessments/', {'answers': self.answers(5, 0, 5)}, format='json')
+
+        response = self.client.patch(f"/api/assessments/{response.data['id']}/", {'answers': []}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['answers'], [])
+        for field in ('score', 'ml_predicted_success', 'gap_analysis', 'category_scores'):
+            self.assertEqual(response.data[field], created[field], field)
+        self.assertGreater(response.data['score'], 0)
+
+    def test_failed_update_keeps_previous_answers(self):
+        response = self.client.post('/api/assessments/', {'answers': self.answers(5, 0, 5)}, format='json')
+        with mock.patch.object(AssessmentSerializer, '_save_answers', side_effect=OperationalError("disk I/O error")):
+            with self.assertRaises(OperationalError):
+                self.client.patch(f"/api/assessments/{response.data['id']}/",
+                                  {'answers': self.answers(0, 5, 0)}, format='json')
+        assessment = Assessment.objects.get()
+        self.assertEqual(assessment.answers.count(), 3)
+        self.assertEqual(assessment.score, 75)
+
+@override_settings(AUDIT_LOG_ASYNC=False)
+class DocumentJobQueueTest(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        override = override_settings(MEDIA_ROOT=media.name, DOCUMENT_CACHE_DIR=Path(media.name) / 'cache')
+        override.enable()
+        self.addCleanup(override.disable)
+        self.user = User.objects.create_user(username='uploader', password='password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def upload(self, name='statement.pdf', content=b'%PDF-1.4 statement'):
+        return self.client.post('/api/documents/', {'file': SimpleUploadedFile(name, content)}, format='multipart')
+
+    def test_upload_is_queued_and_processed_by_worker(self):
+        response = self.upload()
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['status'], 'QUEUED')
+        result_url = f"/api/documents/{response.data['id']}/result/"
+        self.assertEqual(self.client.get(result_url).status_code, 202)
+
+        self.upload('bipa.png')
+        # Threads stand in for the process pool so the test stays inside its transaction
+        self.assertEqual(DocumentWorker(workers=2, executor=ThreadPoolExecutor(2)).run(once=True), 2)
+
+        response = self.client.get(result_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['result']['detected_type'], 'PDF Financial Statement')
+        self.assertEqual(self.client.get(f"/api/documents/{response.data['id']}/").data['status'], 'DONE')
+
+    def test_csv_bank_statement_upload(self):
+        response = self.upload('statement.csv', (TEST_DOCUMENTS / 'bank_statement.csv').read_bytes())
+        self.assertEqual(response.status_code, 202)
+        DocumentWorker(workers=1, executor=ThreadPoolExecutor(1)).run(once=True)
+        result = self.client.get(f"/api/documents/{response.data['id']}/result/").data['result']
+        self.assertEqual(result['extractor'], 'csv-bank-statement')
+        self.assertEqual(result['extracted_metrics']['closing_balance'], 9000.5)
+
+    def test_failed_extraction_is_reported(self):
+        job_id = self.upload().data['id']
+        with mock.patch('core.jobs.process_document', side_effect=ValueError('Unreadable scan')), \
+                self.assertLogs('core.jobs', 'ERROR'):
+            DocumentWorker(workers=1, executor=ThreadPoolExecutor(1)).run(once=True)
+        response = self.client.get(f'/api/documents/{job_id}/result/')
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(response.data['error'], 'Unreadable scan')
+
+    def test_jobs_are_claimed_once_in_order(self):
+        first, second = self.upload().data['id'], self.upload().data['id']
+        self.assertEqual(claim_next_job().pk, first)
+        self.assertEqual(claim_next_job().pk, second)
+        self.assertIsNone(claim_next_job())
+
+    def test_rejects_unsupported_uploads(self):
+        self.assertEqual(self.upload('macro.docm').status_code, 400)
+        with override_settings(DOCUMENT_MAX_UPLOAD_BYTES=10):
+            self.assertEqual(self.upload(content=b'x' * 11).status_code, 400)
+
+    def test_identical_upload_is_served_from_result_cache(self):
+        first = self.upload(content=b'%PDF-1.4 same bytes').data
+        DocumentWorker(workers=1, executor=ThreadPoolExecutor(1)).run(once=True)
+
+        with mock.patch('core.jobs.process_document') as process:
+            response = self.upload('statement-again.pdf', content=b'%PDF-1.4 same bytes')
+            self.assertEqual(response.data['status'], 'DONE')
+            self.assertEqual(response.data['content_hash'], first['content_hash'])
+            self.assertEqual(DocumentWorker(workers=1, executor=ThreadPoolExecutor(1)).run(once=True), 0)
+        process.assert_not_called()
+        result = self.client.get(f"/api/documents/{response.data['id']}/result/").data['result']
+        self.assertEqual(result['detected_type'], 'PDF Financial Statement')
+
+        self.assertEqual(self.upload(content=b'%PDF-1.4 other bytes').data['status'], 'QUEUED')
+
+    def test_large_upload_is_spooled_and_prehashed(self):
+        content = b'%PDF-1.4 ' + b'0' * 5000
+        with override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=1024):
+            response = self.upload(content=content)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['content_hash'], hashlib.sha256(content).hexdigest())
+        self.assertEqual(DocumentJob.objects.get(pk=response.data['id']).file.size, len(content))
+
+    def test_job_past_timeout_uses_its_attempts_then_fails(self):
+        job_id = self.upload().data['id']
+        release = threading.Event()
+        self.addCleanup(release.set)
+        worker = DocumentWorker(workers=1, executor=ThreadPoolExecutor(1), poll_interval=0.01)
+        with override_settings(DOCUMENT_JOB_TIMEOUT=0), \
+                mock.patch('core.jobs.process_document', side_effect=lambda *args: release.wait()), \
+                mock.patch.object(worker, '_new_executor', side_effect=lambda: ThreadPoolExecutor(1)), \
+                self.assertLogs('core.jobs', 'WARNING') as logs:
+            self.assertEqual(worker.run(once=True), 0)
+        job = DocumentJob.objects.get(pk=job_id)
+        self.assertEqual((job.status, job.error, job.attempts), ('FAILED', 'Timed out', 3))
+        self.assertEqual(len(logs.output), 3)
+
+    def test_stale_jobs_are_checked_while_the_worker_runs(self):
+        self.upload(), self.upload()
+        with mock.patch('core.jobs.requeue_stale_jobs', wraps=requeue_stale_jobs) as check:
+            DocumentWorker(workers=1, executor=ThreadPoolExecutor(1), stale_check_interval=0).run(once=True)
+        self.assertGreater(check.call_count, 2)
+        self.assertEqual(DocumentJob.objects.filter(status='DONE').count(), 2)
+
+        # Another worker's orphaned job is recovered, but never a job still in flight here
+        orphan = DocumentJob.objects.first()
+        DocumentJob.objects.filter(pk=orphan.pk).update(
+            status='RUNNING', started_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(requeue_stale_jobs(exclude=[orphan.pk]), 0)
+        self.assertEqual(requeue_stale_jobs(), 1)
+        self.assertEqual(DocumentJob.objects.get(pk=orphan.pk).status, 'QUEUED')
+
+    def test_process_pool_worker(self):
+        job_id = self.upload().data['id']
+        self.assertEqual(DocumentWorker(workers=1).run(once=True), 1)
+        self.assertEqual(DocumentJob.objects.get(pk=job_id).status, 'DONE')
+
+class DocumentResultCacheTest(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cache = DocumentResultCache(directory.name, max_bytes=1000)
+
+    def test_round_trip_and_miss(self):
+        self.cache.set('ab' * 32, {'keywords': ['BIPA']})
+        self.assertEqual(self.cache.get('ab' * 32), {'keywords': ['BIPA']})
+        self.assertIsNone(self.cache.get('cd' * 32))
+
+    def test_evicts_least_recently_used_past_size_limit(self):
+        payload = {'summary': 'x' * 180}  # ~200 bytes per entry
+        keys = [f'{i:02d}' * 32 for i in range(5)]
+        for age, key in enumerate(keys[:4]):
+            self.cache.set(key, payload)
+            path = self.cache._path(key)
+            os.utime(path, (1000 + age, 1000 + age))
+        self.cache.get(keys[0])  # most recently used now
+        self.cache.set(keys[4], payload)
+        self.cache.set('99' * 32, payload)
+
+        self.assertIsNotNone(self.cache.get(keys[0]))
+        self.assertIsNone(self.cache.get(keys[1]))
+        self.assertLessEqual(self.cache._measure()[1], 1000)
+
+class StreamingDocumentTest(TestCase):
+    def write_pdf(self, page_payloads):
+        body = b'%PDF-1.4\n1 0 obj\n<< /Type /Pages /Count 3 >>\nendobj\n'
+        for number, payload in enumerate(page_payloads, start=2):
+            body += f'{number} 0 obj\n<< /Type /Page /Parent 1 0 R >>\nstream\n'.encode() + payload
+            body += b'\nendstream\nendobj\n'
+        handle = tempfile.NamedTemporaryFile(suffix='.pdf', delete=False)
+        handle.write(body + b'%%EOF')
+        handle.close()
+        self.addCleanup(os.unlink, handle.name)
+        return handle.name
+
+    def test_pages_are_yielded_one_at_a_time(self):
+        path = self.write_pdf([b'BT (Revenue) ET', b'\x00' * 4096, b'BT (Net Profit for the year) ET'])
+        pages = iter_pages(path)
+        number, first = next(pages)
+        self.assertEqual(number, 1)
+        self.assertIn(b'Revenue', first)
+        self.assertNotIn(b'Net Profit', first)
+        self.assertEqual([n for n, _ in pages], [2, 3])
+
+    def test_process_document_scans_every_page(self):
+        path = self.write_pdf([b'BT (cover) ET', b'BT (BALANCE SHEET) ET', b'BT (bank statement) ET'])
+        result = process_document(path, 'annual-report.pdf')
+        self.assertEqual(result['page_count'], 3)
+        self.assertEqual(result['detected_type'], 'PDF Financial Statement')
+        self.assertIn('Balance Sheet', result['keywords'])
+        self.assertIn('Bank Statement', result['keywords'])
+
+    def test_page_contents_are_resolved_through_the_xref_table(self):
+        # Content streams precede their page objects and page 2 draws from two of them
+        path = TEST_DOCUMENTS / 'out_of_order_report.pdf'
+        pages = [pdf_page_text(data) for _, data in iter_pages(path)]
+        self.assertEqual(pages, ["Income Statement Total Revenue: N$ 120,000",
+                                 "Tax compliance certificate on file Net Profit: N$ 18,500"])
+
+        # Without a usable xref table the objects are found by scanning for their headers
+        damaged = path.read_bytes().replace(b'startxref\n657', b'startxref\n9')
+        with tempfile.NamedTemporaryFile(suffix='.pdf') as handle:
+            handle.write(damaged)
+            handle.flush()
+            self.assertEqual([pdf_page_text(data) for _, data in iter_pages(handle.name)], pages)
+
+        result = process_document(str(path), 'out_of_order_report.pdf')
+        self.assertEqual(result['page_count'], 2)
+        self.assertEqual(result['extracted_metrics'], {'total_revenue': 120000.0, 'net_profit': 18500.0})
+
+    def test_inflated_page_size_is_capped(self):
+        text = b'BT (Revenue: N$ 5,000) ET'
+        self.assertEqual(pdf_page_text(b'stream\n' + zlib.compress(text) + b'\nendstream'), "Revenue: N$ 5,000")
+
+        bomb = zlib.compress(b'\x00' * (1024 * 1024), 9)
+        self.assertLess(len(bomb), 2048)
+        path = self.write_pdf([text, bomb])
+        with mock.patch('core.document_processor.MAX_INFLATED_PAGE_BYTES', 64 * 1024):
+            self.assertEqual(pdf_page_text(next(iter_pages(path))[1]), "Revenue: N$ 5,000")
+            with self.assertRaisesRegex(ValueError, 'inflates to more than'):
+                process_document(path, 'bomb.pdf')
+
+    def test_non_pdf_is_a_single_page(self):
+        with tempfile.NamedTemporaryFile(suffix='.png') as handle:
+            handle.write(b'\x89PNG fake scan')
+            handle.flush()
+            self.assertEqual([n for n, _ in iter_pages(handle.name)], [1])
+
+    def test_other_files_are_read_in_overlapping_chunks(self):
+        content = b'x' * 30 + b'Bank Statement' + b'y' * 30 + b' Namibia'
+        with tempfile.NamedTemporaryFile(suffix='.bin') as handle:
+            handle.write(content)
+            handle.flush()
+            with mock.patch('core.document_processor.CHUNK_BYTES', 36):
+                pages = list(iter_pages(handle.name))
+                result = DocumentDecipherer().decipher_path(handle.name, 'records.bin')
+        self.assertEqual([n for n, _ in pages], [1, 2, 3, 4])
+        self.assertTrue(all(len(data) <= 36 for _, data in pages))
+        self.assertEqual(pages[-1][1][-8:], b' Namibia')
+        # 'Bank Statement' straddles the first chunk boundary
+        self.assertNotIn(b'Bank Statement', pages[0][1])
+        self.assertEqual(result['keywords'], ['Bank Statement', 'Namibia'])
+        self.assertEqual(result['page_count'], 4)
+
+    def test_upload_handler_spools_and_hashes_chunks(self):
+        handler = HashingTemporaryFileUploadHandler()
+        handler.new_file('file', 'report.pdf', 'application/pdf', None)
+        chunks = [b'%PDF-1.4 ', b'x' * 100000, b' %%EOF']
+        offset = 0
+        for chunk in chunks:
+            handler.receive_data_chunk(chunk, offset)
+            offset += len(chunk)
+        upload = handler.file_complete(offset)
+        self.addCleanup(upload.close)
+        self.assertTrue(os.path.exists(upload.temporary_file_path()))
+        self.assertEqual(upload.sha256, hashlib.sha256(b''.join(chunks)).hexdigest())
+
+TEST_DOCUMENTS = Path(__file__).resolve().parent / 'test_documents'
+
+class ExtractorRegistryTest(TestCase):
+    def decipher(self, name, file_name=None, **kwargs):
+        return DocumentDecipherer().decipher_path(TEST_DOCUMENTS / name, file_name or name, **kwargs)
+
+    def test_extractor_is_picked_by_content_not_name(self):
+        self.assertEqual(self.decipher('annual_report.pdf', 'scan.png')['extractor'], 'pdf-text')
+        self.assertEqual(self.decipher('bank_statement.csv', 'statement.txt')['extractor'], 'csv-bank-statement')
+        self.assertEqual(self.decipher('bipa_certificate.png', 'certificate.pdf')['extractor'], 'image-ocr')
+
+    def test_pdf_metrics_are_read_from_later_pages(self):
+        result = self.decipher('annual_report.pdf')
+        self.assertEqual(result['page_count'], 3)
+        self.assertEqual(result['extracted_metrics'],
+                         {'total_revenue': 450000.0, 'total_expenses': 394999.5, 'net_profit': 55000.5})
+        self.assertIn('Income Statement', result['keywords'])
+
+    def test_csv_statement_totals_span_pages(self):
+        with mock.patch('core.document_processor.CSV_ROWS_PER_PAGE', 2):
+            result = self.decipher('bank_statement.csv')
+        self.assertEqual(result['page_count'], 3)
+        self.assertEqual(result['extracted_metrics'], {
+            'total_credits': 16200.5, 'total_debits': 7200.0, 'transaction_count': 5,
+            'closing_balance': 9000.5, 'net_cash_flow': 9000.5})
+
+    def test_parallel_pages_match_serial(self):
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            for name in ('annual_report.pdf', 'bank_statement.csv'):
+                self.assertEqual(self.decipher(name, executor=executor, window=1), self.decipher(name))
+        with process_pool(2) as executor:
+            self.assertEqual(self.decipher('annual_report.pdf', executor=executor), self.decipher('annual_report.pdf'))
+
+    def test_registered_extractor_is_sniffed(self):
+        @register_extractor
+        class MarkdownExtractor(Extractor):
+            name = 'test-markdown'
+            detected_type = 'Business Plan'
+
+            def sniff(self, head, file_name):
+                return head.startswith(b'# ')
+
+        self.addCleanup(EXTRACTORS.pop, 'test-markdown')
+        with tempfile.NamedTemporaryFile(suffix='.txt') as handle:
+            handle.write(b'# Plan\nRevenue grows with Namibia exports')
+            handle.flush()
+            result = DocumentDecipherer().decipher_path(handle.name, 'plan.txt')
+        self.assertEqual(result['detected_type'], 'Business Plan')
+        self.assertEqual(result['keywords'], ['Revenue', 'Namibia'])
+
+    def test_unknown_content_falls_back_to_generic(self):
+        with tempfile.NamedTemporaryFile(suffix='.bin') as handle:
+            handle.write(b'\x00\x01 Tax records')
+            handle.flush()
+            result = DocumentDecipherer().decipher_path(handle.name, 'records.bin')
+        self.assertEqual((result['extractor'], result['keywords']), ('generic', ['Tax']))
+
+class TrustScoreRecomputeTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='trusted', password='password')
+        self.profile = SMEProfile.objects.create(user=self.user, company_name="Trust Co", sector="Retail")
+
+    def trust(self):
+        return DataTrustScore.objects.get(profile=self.profile)
+
+    def test_new_profile_is_scored_on_first_pass(self):
+        self.assertIsNotNone(self.trust().dirty_since)
+        self.assertEqual(recompute_dirty_trust_scores(debounce=0), 1)
+        trust = self.trust()
+        self.assertIsNone(trust.dirty_since)
+        self.assertEqual(trust.score, 0.7)
+        self.assertEqual(trust.verification_metrics['open_anomalies'], 0)
+        self.assertEqual(recompute_dirty_trust_scores(debounce=0), 0)
+
+    def test_events_mark_only_affected_profiles(self):
+        other = User.objects.create_user(username='other', password='password')
+        SMEProfile.objects.create(user=other, company_name="Other Co", sector="Retail")
+        recompute_dirty_trust_scores(debounce=0)
+
+        task = VerificationTask.objects.create(task_type='DOCUMENT', user=self.user)
+        self.assertEqual(recompute_dirty_trust_scores(debounce=0), 1)
+        task.assigned_to = other
+        task.save()
+        self.assertIsNone(self.trust().dirty_since)
+
+        task.status = 'COMPLETED'
+        task.save()
+        recompute_dirty_trust_scores(debounce=0)
+        self.assertEqual(self.trust().score, 1.0)
+
+        AnomalyAlert.objects.create(user=self.user, field_affected='revenue', anomaly_score=4.0, message='Outlier')
+        recompute_dirty_trust_scores(debounce=0)
+        self.assertEqual(self.trust().score, 0.8)
+        self.assertEqual(self.trust().verification_metrics['open_anomalies'], 1)
+
+    def test_finished_document_job_marks_profile(self):
+        recompute_dirty_trust_scores(debounce=0)
+        job = DocumentJob.objects.create(user=self.user, file='documents/report.pdf', original_name='report.pdf',
+                                         status='RUNNING')
+        self.assertIsNone(self.trust().dirty_since)
+        finish_job(job.pk, result={'keywords': []})
+        recompute_dirty_trust_scores(debounce=0)
+        self.assertEqual(self.trust().verification_metrics['processed_documents'], 1)
+
+    def test_debounce_coalesces_bursts(self):
+        recompute_dirty_trust_scores(debounce=0)
+        for _ in range(3):
+            VerificationTask.objects.create(task_type='FINANCIAL', user=self.user)
+        trust = self.trust()
+        self.assertEqual(trust.pending_changes, 4)
+        self.assertEqual(recompute_dirty_trust_scores(debounce=60), 0)
+        with mock.patch('core.trust.timezone.now', return_value=trust.dirty_since + timedelta(seconds=61)):
+            self.assertEqual(recompute_dirty_trust_scores(debounce=60), 1)
+        self.assertEqual(self.trust().verification_metrics['pending_tasks'], 3)
+
+    def test_change_during_recompute_keeps_score_dirty(self):
+        from . import trust as trust_module
+        real_inputs = trust_module.trust_inputs
+
+        def inputs_then_change(user_ids):
+            metrics = real_inputs(user_ids)
+            mark_trust_scores_dirty(self.user.pk)
+            return metrics
+
+        with mock.patch('core.trust.trust_inputs', side_effect=inputs_then_change):
+            self.assertEqual(recompute_dirty_trust_scores(debounce=0), 1)
+        self.assertIsNotNone(self.trust().dirty_since)
+        self.assertEqual(recompute_dirty_trust_scores(debounce=0), 1)
+        self.assertIsNone(self.trust().dirty_since)
+
+    def test_batch_query_count_is_constant(self):
+        for i in range(5):
+            user = User.objects.create_user(username=f'bulk{i}', password='password')
+            SMEProfile.objects.create(user=user, company_name=f"Bulk {i}", sector="Retail")
+        # select batch, three input queries, the executemany UPDATE (+ savepoints), then an empty batch
+        with self.assertNumQueries(8):
+            self.assertEqual(recompute_dirty_trust_scores(debounce=0, batch_size=10), 6)
+
+    def test_scan_anomalies_marks_flagged_users(self):
+        FinancialProjection.objects.create(user=self.user, project_name="Plan", revenue_year1=-10, expenses_year1=0)
+        recompute_dirty_trust_scores(debounce=0)
+        call_command('scan_anomalies', stdout=StringIO())
+        self.assertIsNotNone(self.trust().dirty_since)
+        call_command('recompute_trust_scores', '--all', '--once', stdout=StringIO())
+        trust = self.trust()
+        self.assertIsNone(trust.dirty_since)
+        self.assertEqual(trust.score, 0.5)
+
+@override_settings(AUDIT_LOG_ASYNC=False)
+class VerificationQueueTest(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='sme', password='password')
+        SMEProfile.objects.create(user=self.owner, company_name="Queue Co", sector="Retail")
+        self.reviewer = User.objects.create_user(username='reviewer', password='password', is_staff=True)
+        self.other_reviewer = User.objects.create_user(username='reviewer2', password='password', is_staff=True)
+        now = timezone.now()
+        self.old_low = VerificationTask.objects.create(task_type='DOCUMENT', user=self.owner,
+                                                       created_at=now - timedelta(days=2))
+        self.high = VerificationTask.objects.create(task_type='FINANCIAL', user=self.owner, priority=5,
+                                                    created_at=now - timedelta(minutes=5))
+        self.recent_low = VerificationTask.objects.create(task_type='DOCUMENT', user=self.owner,
+                                                          created_at=now - timedelta(minutes=10))
+        self.newer_low = VerificationTask.objects.create(task_type='DOCUMENT', user=self.owner, created_at=now)
+
+    def claim_all(self, reviewer):
+        claimed = []
+        while (task := claim_next_task(reviewer)) is not None:
+            claimed.append(task.pk)
+        return claimed
+
+    @override_settings(VERIFICATION_MAX_ACTIVE_TASKS=10)
+    def test_overdue_then_priority_then_age(self):
+        expected = [self.old_low.pk, self.high.pk, self.recent_low.pk, self.newer_low.pk]
+        self.assertEqual(self.claim_all(self.reviewer), expected)
+        task = VerificationTask.objects.get(pk=self.high.pk)
+        self.assertEqual((task.status, task.assigned_to), ('IN_PROGRESS', self.reviewer))
+        self.assertIsNotNone(task.assigned_at)
+
+    @override_settings(VERIFICATION_MAX_ACTIVE_TASKS=10)
+    def test_skip_locked_path_claims_in_same_order(self):
+        with mock.patch.object(connection.features, 'has_select_for_update_skip_locked', True):
+            claimed = self.claim_all(self.reviewer)
+        self.assertEqual(claimed, [self.old_low.pk, self.high.pk, self.recent_low.pk, self.newer_low.pk])
+
+    def test_task_type_filter_and_own_submissions(self):
+        self.assertEqual(claim_next_task(self.reviewer, task_type='FINANCIAL').pk, self.high.pk)
+        self.assertIsNone(claim_next_task(self.owner))
+
+    @override_settings(VERIFICATION_MAX_ACTIVE_TASKS=2)
+    def test_capacity_spreads_work_across_reviewers(self):
+        claim_next_task(self.reviewer)
+        claim_next_task(self.reviewer)
+        with self.assertRaises(ReviewerAtCapacity):
+            claim_next_task(self.reviewer)
+        claim_next_task(self.other_reviewer)
+        claim_next_task(self.other_reviewer)
+        self.assertEqual(VerificationTask.objects.filter(assigned_to=self.other_reviewer).count(), 2)
+        self.assertFalse(VerificationTask.objects.filter(status='PENDING').exists())
+
+    @override_settings(VERIFICATION_MAX_ACTIVE_TASKS=1)
+    def test_capacity_is_rechecked_by_the_claim_itself(self):
+        claim_next_task(self.reviewer)
+        # A concurrent claim that passed its early check before the first one landed
+        with mock.patch('core.verification.active_task_count', side_effect=[0, 1]):
+            with self.assertRaises(ReviewerAtCapacity):
+                claim_next_task(self.reviewer)
+        self.assertEqual(VerificationTask.objects.filter(assigned_to=self.reviewer).count(), 1)
+
+    @override_settings(VERIFICATION_MAX_ACTIVE_TASKS=1)
+    def test_skip_locked_path_checks_capacity_under_the_reviewer_lock(self):
+        with mock.patch.object(connection.features, 'has_select_for_update_skip_locked', True):
+            claim_next_task(self.reviewer)
+            with CaptureQueriesContext(connection) as queries, self.assertRaises(ReviewerAtCapacity):
+                claim_next_task(self.reviewer)
+        statements = [query['sql'] for query in queries]
+        lock = next(i for i, sql in enumerate(statements) if 'auth_user' in sql)
+        self.assertLess(lock, next(i for i, sql in enumerate(statements) if 'COUNT' in sql))
+
+    def test_lost_race_moves_to_next_candidate(self):
+        VerificationTask.objects.filter(pk=self.old_low.pk).update(status='IN_PROGRESS', assigned_to=self.other_reviewer)
+        stale = VerificationTask.objects.filter(pk__in=[self.old_low.pk, self.high.pk]).order_by('id')
+        with mock.patch('core.verification.claimable_tasks', return_value=(stale,)):
+            task = claim_next_task(self.reviewer)
+        self.assertEqual(task.pk, self.high.pk)
+        self.assertEqual(VerificationTask.objects.get(pk=self.old_low.pk).assigned_to, self.other_reviewer)
+
+    def test_claim_complete_and_release_api(self):
+        client = APIClient()
+        client.force_authenticate(self.owner)
+        self.assertEqual(client.post('/api/verification-tasks/claim/').status_code, 403)
+
+        client.force_authenticate(self.reviewer)
+        response = client.post('/api/verification-tasks/claim/')
+        self.assertEqual(response.status_code, 200)
+        task_id = response.json()['id']
+        self.assertEqual(task_id, self.old_low.pk)
+
+        other = APIClient()
+        other.force_authenticate(self.other_reviewer)
+        self.assertEqual(other.post(f'/api/verification-tasks/{task_id}/complete/').status_code, 409)
+
+        response = client.post(f'/api/verification-tasks/{task_id}/release/')
+        self.assertEqual(response.json()['status'], 'PENDING')
+        self.assertTrue(UsageLog.objects.filter(action__name="Released Verification Task",
+                                                detail=f"Task #{task_id}").exists())
+        self.assertEqual(client.post('/api/verification-tasks/claim/').json()['id'], task_id)
+        self.assertEqual(client.post(f'/api/verification-tasks/{task_id}/complete/', {'status': 'DONE'}).status_code,
+                         400)
+        response = client.post(f'/api/verification-tasks/{task_id}/complete/', {'status': 'COMPLETED'})
+        self.assertEqual(response.json()['status'], 'COMPLETED')
+
+        recompute_dirty_trust_scores(debounce=0)
+        self.assertEqual(DataTrustScore.objects.get(profile__user=self.owner).verification_metrics['verified_documents'], 1)
+        mine = client.get('/api/verification-tasks/?mine=1&status=COMPLETED').json()['results']
+        self.assertEqual([t['id'] for t in mine], [task_id])
+
+    def test_empty_queue_returns_no_content(self):
+        VerificationTask.objects.all().delete()
+        client = APIClient()
+        client.force_authenticate(self.reviewer)
+        self.assertEqual(client.post('/api/verification-tasks/claim/').status_code, 204)
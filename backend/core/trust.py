@@ -0,0 +1,123 @@
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Count, F, Q, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from .models import AnomalyAlert, DataTrustScore, DocumentJob, SMEProfile, VerificationTask
+from .validation import calculate_trust_score
+
+logger = logging.getLogger(__name__)
+
+# VerificationTask statuses that count as a reviewer sign-off
+VERIFIED_STATUSES = ('COMPLETED',)
+
+def mark_trust_scores_dirty(user_ids):
+    """
+    Flags the trust scores of these users' profiles for recomputation. dirty_since
+    keeps the first unprocessed change; pending_changes counts every change so the
+    worker can tell whether a row moved while it was being recomputed.
+    """
+    if isinstance(user_ids, int):
+        user_ids = [user_ids]
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    now = timezone.now()
+    DataTrustScore.objects.filter(profile__user_id__in=user_ids).update(
+        dirty_since=Coalesce('dirty_since', Value(now)), pending_changes=F('pending_changes') + 1)
+    missing = SMEProfile.objects.filter(user_id__in=user_ids, datatrustscore__isnull=True).values_list('id', flat=True)
+    DataTrustScore.objects.bulk_create(
+        [DataTrustScore(profile_id=pk, dirty_since=now, pending_changes=1) for pk in missing],
+        ignore_conflicts=True)
+
+def _count_by_user(queryset, user_ids, **counts):
+    rows = queryset.filter(user_id__in=user_ids).values('user_id').annotate(**counts)
+    return {row.pop('user_id'): row for row in rows}
+
+def trust_inputs(user_ids):
+    """Per-user verification metrics for a batch of users, in three grouped queries."""
+    tasks = _count_by_user(
+        VerificationTask.objects, user_ids,
+        verified_documents=Count('id', filter=Q(task_type='DOCUMENT', status__in=VERIFIED_STATUSES)),
+        verified_financials=Count('id', filter=Q(task_type='FINANCIAL', status__in=VERIFIED_STATUSES)),
+        pending_tasks=Count('id', filter=Q(status='PENDING')))
+    alerts = _count_by_user(AnomalyAlert.objects.filter(is_resolved=False), user_ids, open_anomalies=Count('id'))
+    documents = _count_by_user(DocumentJob.objects.filter(status='DONE'), user_ids, processed_documents=Count('id'))
+
+    metrics = {}
+    for user_id in user_ids:
+        row = {'verified_documents': 0, 'verified_financials': 0, 'pending_tasks': 0,
+               'open_anomalies': 0, 'processed_documents': 0}
+        for source in (tasks, alerts, documents):
+            row.update(source.get(user_id, {}))
+        metrics[user_id] = row
+    return metrics
+
+def score_from_metrics(metrics):
+    return calculate_trust_score(metrics, {
+        'documents_verified': metrics['verified_documents'] > 0,
+        'consistent_history': metrics['open_anomalies'] == 0,
+    })
+
+def recompute_dirty_trust_scores(debounce=None, batch_size=None):
+    """
+    Recomputes the trust scores that have been dirty for at least `debounce`
+    seconds, batch_size rows at a time. A row is only marked clean if no change
+    arrived while it was being recomputed; otherwise it stays dirty for the next
+    pass. Returns the number of scores written.
+    """
+    debounce = settings.TRUST_SCORE_DEBOUNCE if debounce is None else debounce
+    batch_size = batch_size or settings.TRUST_SCORE_BATCH_SIZE
+    cutoff = timezone.now() - timedelta(seconds=debounce)
+    metrics_field = DataTrustScore._meta.get_field('verification_metrics')
+    calculated_field = DataTrustScore._meta.get_field('last_calculated')
+    table = connection.ops.quote_name(DataTrustScore._meta.db_table)
+    update_sql = (f"UPDATE {table} SET score = %s, verification_metrics = %s, last_calculated = %s, "
+                  f"dirty_since = CASE WHEN pending_changes = %s THEN NULL ELSE dirty_since END WHERE id = %s")
+    ready = (DataTrustScore.objects.filter(dirty_since__lte=cutoff).order_by('id')
+             .values_list('id', 'profile__user_id', 'pending_changes'))
+    updated = 0
+    last_id = 0
+    while True:
+        # Walk by id so rows re-dirtied mid-pass wait for the next pass instead of looping
+        batch = list(ready.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            return updated
+        last_id = batch[-1][0]
+        metrics = trust_inputs([user_id for _, user_id, _ in batch])
+        now = calculated_field.get_db_prep_value(timezone.now(), connection)
+        params = [(score_from_metrics(metrics[user_id]),
+                   metrics_field.get_db_prep_value(metrics[user_id], connection), now, seen, pk)
+                  for pk, user_id, seen in batch]
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(update_sql, params)
+        updated += len(batch)
+
+class TrustScoreWorker:
+    """Polls for dirty trust scores and recomputes them in batches."""
+    def __init__(self, debounce=None, batch_size=None, poll_interval=5.0):
+        self.debounce = debounce
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+
+    def run(self, once=False):
+        """
+        Recomputes ready scores until interrupted, or after a single pass when
+        once=True. Returns the number of scores written.
+        """
+        finished = 0
+        while True:
+            try:
+                finished += recompute_dirty_trust_scores(self.debounce, self.batch_size)
+            except Exception:
+                if once:
+                    raise
+                logger.exception("Trust score recompute pass failed")
+            if once:
+                return finished
+            close_old_connections()
+            time.sleep(self.poll_interval)
@@ -2,7 +2,7 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (SMEProfileViewSet, AssessmentViewSet, BusinessPlanViewSet,
                     FinancialProjectionViewSet, FundingSourceViewSet, UsageLogViewSet,
-                    QuestionViewSet)
+                    QuestionViewSet, ExportViewSet, DocumentJobViewSet, VerificationTaskViewSet)
 
 router = DefaultRouter()
 router.register(r'profiles', SMEProfileViewSet)
@@ -12,6 +12,9 @@ router.register(r'business-plans', BusinessPlanViewSet)
 router.register(r'financial-projections', FinancialProjectionViewSet)
 router.register(r'funding-sources', FundingSourceViewSet)
 router.register(r'usage-logs', UsageLogViewSet)
+router.register(r'exports', ExportViewSet, basename='export')
+router.register(r'documents', DocumentJobViewSet)
+router.register(r'verification-tasks', VerificationTaskViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -1,24 +1,57 @@
 import numpy as np
+from django.db import transaction
+from django.utils import timezone
+from django.contrib.auth.models import User
+from .models import FinancialProjection, SectorBenchmark, SMEProfile
+
+# Prior benchmarks used until a sector has enough real projections
+FALLBACK_BENCHMARKS = {
+    'Agriculture': {'revenue': 500000, 'std': 200000},
+    'Mining': {'revenue': 5000000, 'std': 1000000},
+}
+
+# Minimum observations before a sector's running statistics replace the prior
+MIN_BENCHMARK_SAMPLES = 30
+
+# Benchmark field name -> FinancialProjection attribute
+BENCHMARK_FIELDS = {
+    'revenue': 'revenue_year1',
+    'expenses': 'expenses_year1',
+}
+
+NEGATIVE_REVENUE_MESSAGE = "Revenue cannot be negative."
+HIGH_EXPENSE_MESSAGE = "Expenses are unusually high relative to revenue (over 10x)."
 
 class DataAnomalyDetector:
     def __init__(self, sector_data=None):
         self.sector_data = sector_data or {}
 
-    def detect_outlier(self, field_name, value, sector):
-        # Placeholder for sector-based Z-score detection
-        # In a real app, this would query historical data for the sector
-        benchmarks = {
-            'Agriculture': {'revenue': 500000, 'std': 200000},
-            'Mining': {'revenue': 5000000, 'std': 1000000},
-        }
+    def get_benchmark(self, field_name, sector):
+        """
+        Returns (mean, std) for a sector field, or None when no benchmark exists.
+        Explicit sector_data wins, then running SectorBenchmark statistics, then the priors.
+        """
+        if sector in self.sector_data and field_name in self.sector_data[sector]:
+            stats = self.sector_data[sector]
+            return stats[field_name], stats['std']
+
+        benchmark = SectorBenchmark.objects.filter(sector=sector, field_name=field_name).first()
+        if benchmark is not None and benchmark.count >= MIN_BENCHMARK_SAMPLES and benchmark.std > 0:
+            return benchmark.mean, benchmark.std
 
-        if sector in benchmarks and field_name in benchmarks[sector]:
-            stats = benchmarks[sector]
-            mean = stats[field_name]
-            std = stats['std']
-            z_score = abs((float(value) - mean) / std)
-            return z_score > 3 # Flag if > 3 standard deviations
-        return False
+        if sector in FALLBACK_BENCHMARKS and field_name in FALLBACK_BENCHMARKS[sector]:
+            stats = FALLBACK_BENCHMARKS[sector]
+            return stats[field_name], stats['std']
+        return None
+
+    def detect_outlier(self, field_name, value, sector):
+        # Sector-based Z-score detection against an O(1) benchmark lookup
+        benchmark = self.get_benchmark(field_name, sector)
+        if benchmark is None:
+            return False
+        mean, std = benchmark
+        z_score = abs((float(value) - mean) / std)
+        return z_score > 3 # Flag if > 3 standard deviations
 
     def check_consistency(self, data):
         issues = []
@@ -26,12 +59,35 @@ class DataAnomalyDetector:
         expenses = float(data.get('expenses', 0))
 
         if revenue < 0:
-            issues.append("Revenue cannot be negative.")
+            issues.append(NEGATIVE_REVENUE_MESSAGE)
         if revenue > 0 and expenses > revenue * 10:
-            issues.append("Expenses are unusually high relative to revenue (over 10x).")
+            issues.append(HIGH_EXPENSE_MESSAGE)
 
         return issues
 
+    def check_consistency_batch(self, revenue, expenses):
+        """
+        Vectorized check_consistency over NumPy arrays.
+        Returns a dict of rule message -> boolean mask of violating rows.
+        """
+        revenue = np.asarray(revenue, dtype=np.float64)
+        expenses = np.asarray(expenses, dtype=np.float64)
+        return {
+            NEGATIVE_REVENUE_MESSAGE: revenue < 0,
+            HIGH_EXPENSE_MESSAGE: (revenue > 0) & (expenses > revenue * 10),
+        }
+
+    def zscore_batch(self, values, means, stds):
+        """
+        Absolute z-scores for arrays of values against per-row benchmark means/stds.
+        Rows without a benchmark (NaN mean or non-positive std) score 0.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        valid = ~np.isnan(means) & (stds > 0)
+        z_scores = np.zeros_like(values)
+        z_scores[valid] = np.abs((values[valid] - means[valid]) / stds[valid])
+        return z_scores
+
 def calculate_trust_score(data, verification_status):
     """
     Calculates a trust score from 0.0 to 1.0
@@ -42,3 +98,41 @@ def calculate_trust_score(data, verification_status):
     if verification_status.get('consistent_history'):
         base_score += 0.2
     return min(base_score, 1.0)
+
+def sector_for_user(user_id):
+    sector = SMEProfile.objects.filter(user_id=user_id).values_list('sector', flat=True).first()
+    return sector or 'General'
+
+def sector_for_projection(projection):
+    """
+    Resolves a projection's sector, reusing the request user's cached profile when present.
+    """
+    profile_cache = User.smeprofile.related
+    if FinancialProjection.user.is_cached(projection) and profile_cache.is_cached(projection.user):
+        profile = profile_cache.get_cached_value(projection.user)
+        return profile.sector if profile else 'General'
+    return sector_for_user(projection.user_id)
+
+def update_sector_benchmarks(sector, added=None, removed=None):
+    """
+    Applies one projection's values to the running sector statistics.
+    added/removed map benchmark field names to values (removed is used on edit and delete).
+    """
+    with transaction.atomic():
+        locked = SectorBenchmark.objects.select_for_update().filter(
+            sector=sector, field_name__in=BENCHMARK_FIELDS)
+        benchmarks = {b.field_name: b for b in locked}
+        if len(benchmarks) < len(BENCHMARK_FIELDS):
+            SectorBenchmark.objects.bulk_create(
+                [SectorBenchmark(sector=sector, field_name=f) for f in BENCHMARK_FIELDS if f not in benchmarks],
+                ignore_conflicts=True)
+            benchmarks = {b.field_name: b for b in locked.all()}
+
+        now = timezone.now()
+        for field_name, benchmark in benchmarks.items():
+            if removed is not None:
+                benchmark.remove_value(float(removed[field_name]))
+            if added is not None:
+                benchmark.add_value(float(added[field_name]))
+            benchmark.updated_at = now
+        SectorBenchmark.objects.bulk_update(benchmarks.values(), ['count', 'mean', 'm2', 'updated_at'])
@@ -0,0 +1,102 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import Count, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.db.models.lookups import LessThan
+from django.utils import timezone
+from .models import VerificationTask
+from .trust import mark_trust_scores_dirty
+
+# Pending tasks tried per claim on databases without SKIP LOCKED
+CLAIM_CANDIDATES = 10
+
+class ReviewerAtCapacity(Exception):
+    """The reviewer already holds VERIFICATION_MAX_ACTIVE_TASKS in-progress tasks."""
+
+def active_task_count(reviewer):
+    return VerificationTask.objects.filter(assigned_to=reviewer, status='IN_PROGRESS').count()
+
+def claimable_tasks(reviewer, task_type=None):
+    """
+    Pending tasks in claim order, as two index-ordered tiers: tasks waiting longer
+    than VERIFICATION_TASK_MAX_WAIT, oldest first (so low priorities cannot starve),
+    then everything by priority and age. Reviewers never get their own submissions.
+    """
+    pending = VerificationTask.objects.filter(status='PENDING').exclude(user=reviewer)
+    if task_type:
+        pending = pending.filter(task_type=task_type)
+    overdue = timezone.now() - timedelta(seconds=settings.VERIFICATION_TASK_MAX_WAIT)
+    return (pending.filter(created_at__lte=overdue).order_by('created_at', 'id'),
+            pending.order_by('-priority', 'created_at', 'id'))
+
+def _claim_skip_locked(reviewer, tiers, assignment, capacity):
+    with transaction.atomic():
+        # Locking the reviewer's row serialises their claims, so the count below cannot go stale
+        User.objects.select_for_update().filter(pk=reviewer.pk).values_list('pk', flat=True).first()
+        if active_task_count(reviewer) >= capacity:
+            raise ReviewerAtCapacity()
+        for tier in tiers:
+            task_id = tier.select_for_update(skip_locked=True).values_list('id', flat=True).first()
+            if task_id is not None:
+                VerificationTask.objects.filter(id=task_id).update(**assignment)
+                return task_id
+    return None
+
+def _claim_conditional_update(reviewer, tiers, assignment, capacity):
+    if active_task_count(reviewer) >= capacity:
+        raise ReviewerAtCapacity()
+    # Re-checked by the UPDATE itself, so concurrent claims by one reviewer cannot overshoot
+    active = (VerificationTask.objects.filter(assigned_to=reviewer, status='IN_PROGRESS')
+              .order_by().values('assigned_to').annotate(n=Count('id')).values('n'))
+    under_capacity = LessThan(Coalesce(Subquery(active), Value(0)), capacity)
+    while True:
+        contended = False
+        for tier in tiers:
+            for candidate in tier.values_list('id', flat=True)[:CLAIM_CANDIDATES]:
+                if VerificationTask.objects.filter(under_capacity, id=candidate, status='PENDING').update(**assignment):
+                    return candidate
+                if active_task_count(reviewer) >= capacity:
+                    raise ReviewerAtCapacity()
+                contended = True
+        # Every candidate went to another reviewer meanwhile; look again
+        if not contended:
+            return None
+
+def claim_next_task(reviewer, task_type=None):
+    """
+    Assigns the next pending task to reviewer and returns it, or None when the
+    queue is empty. Raises ReviewerAtCapacity when the reviewer already holds
+    VERIFICATION_MAX_ACTIVE_TASKS tasks, which spreads the queue across reviewers.
+
+    On databases with SKIP LOCKED (Postgres, MySQL 8) concurrent claimers lock
+    different rows instead of queueing on the same one, and the capacity check runs
+    under a lock on the reviewer. Elsewhere (SQLite) a conditional UPDATE on
+    status='PENDING' and the reviewer's in-progress count is the lock, as in core.jobs.
+    """
+    tiers = claimable_tasks(reviewer, task_type)
+    assignment = {'status': 'IN_PROGRESS', 'assigned_to': reviewer, 'assigned_at': timezone.now()}
+    capacity = settings.VERIFICATION_MAX_ACTIVE_TASKS
+    if connection.features.has_select_for_update_skip_locked:
+        task_id = _claim_skip_locked(reviewer, tiers, assignment, capacity)
+    else:
+        task_id = _claim_conditional_update(reviewer, tiers, assignment, capacity)
+
+    if task_id is None:
+        return None
+    task = VerificationTask.objects.get(id=task_id)
+    # update() skips the post_save signal that marks the trust score dirty
+    mark_trust_scores_dirty(task.user_id)
+    return task
+
+def finish_task(task, status):
+    """Closes an in-progress task as COMPLETED or REJECTED."""
+    task.status = status
+    task.save(update_fields=['status'])
+
+def release_task(task):
+    """Hands an in-progress task back to the queue, keeping its place by age and priority."""
+    task.status, task.assigned_to, task.assigned_at = 'PENDING', None, None
+    task.save(update_fields=['status', 'assigned_to', 'assigned_at'])
@@ -0,0 +1,69 @@
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from .models import CacheVersion
+
+def read_version(name):
+    return CacheVersion.objects.filter(name=name).values_list('version', flat=True).first() or 0
+
+def bump_version(name):
+    if not CacheVersion.objects.filter(name=name).update(version=F('version') + 1):
+        CacheVersion.objects.get_or_create(name=name)
+        CacheVersion.objects.filter(name=name).update(version=F('version') + 1)
+
+class VersionedResource:
+    """
+    A value built once per process (an index, a weights table) and rebuilt when
+    its CacheVersion row changes. The version is re-read at most every
+    check_interval seconds, so changes committed by other processes show up
+    within that interval; invalidate() in this process takes effect immediately.
+    """
+
+    def __init__(self, name, build, check_interval=None):
+        self.name = name
+        self._build = build
+        self._check_interval = check_interval
+        self._value = None
+        self._version = None
+        self._last_check = 0.0
+        self._stale = False
+        self._lock = threading.Lock()
+
+    @property
+    def check_interval(self):
+        if self._check_interval is not None:
+            return self._check_interval
+        return settings.CACHE_VERSION_CHECK_INTERVAL
+
+    def get(self):
+        if self._value is None or self._stale or time.monotonic() - self._last_check >= self.check_interval:
+            with self._lock:
+                self._refresh()
+        return self._value
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self._value is not None and not self._stale and now - self._last_check < self.check_interval:
+            return
+        version = read_version(self.name)
+        if self._value is None or self._stale or version != self._version:
+            self._stale = False
+            self._value = self._build()
+            self._version = version
+        self._last_check = now
+
+    def invalidate(self):
+        """
+        Rebuilds on the next get() in this process, and bumps the shared version
+        once the current transaction commits, so other processes never rebuild
+        from uncommitted rows.
+        """
+        self._stale = True
+        transaction.on_commit(self._bump)
+
+    def _bump(self):
+        bump_version(self.name)
+        self._stale = True
@@ -1,111 +1,443 @@
-from rest_framework import viewsets, permissions, status
+import math
+from datetime import date
+
+import numpy as np
+from django.http import StreamingHttpResponse
+from rest_framework import mixins, viewsets, permissions, status
 from rest_framework.decorators import action
+from rest_framework.parsers import FormParser, MultiPartParser
 from rest_framework.response import Response
 from .models import (SMEProfile, Assessment, FundingSource, BusinessPlan,
-                         FinancialProjection, UsageLog, VerificationTask, Question)
+                         FinancialProjection, UsageLog, UsageDailyRollup, VerificationTask, Question, DocumentJob)
 from .serializers import (SMEProfileSerializer, AssessmentSerializer, FundingSourceSerializer,
                          BusinessPlanSerializer, FinancialProjectionSerializer, UsageLogSerializer,
-                         QuestionSerializer)
-from .analytics import PredictiveEngine
+                         QuestionSerializer, UsageDailyRollupSerializer, DocumentJobSerializer,
+                         VerificationTaskSerializer)
+from .analytics import get_engine, get_cached_prediction
+from .audit import audit_log
+from .jobs import enqueue_document
+from .export import EXPORT_DATASETS, EXPORT_FORMATS, export_filename, iter_export
+from .logic import (DEFAULT_EXPENSE_GROWTH, DEFAULT_REVENUE_GROWTH, project_scenarios,
+                    simulate_cash_flows)
+from .matching import get_funding_index
+from .scoring import gap_analysis, score_answers
+from .verification import ReviewerAtCapacity, claim_next_task, finish_task, release_task
+from .pagination import (IdCursorPagination, CreatedAtCursorPagination, TimestampCursorPagination,
+                         DayCursorPagination, ProjectionBatchPagination)
+
+# Upper bound on the projection horizon accepted by the API
+MAX_PROJECTION_YEARS = 30
+
+# Upper bound on Monte Carlo paths per simulation request
+MAX_SIMULATION_PATHS = 100000
+
+# Bounds on the annual growth distributions accepted by the simulation API
+# (mean from -100% to +100% a year, std up to 100 points)
+GROWTH_MEAN_RANGE = (-1.0, 1.0)
+MAX_GROWTH_STD = 1.0
+
+# Upper bound on funders returned by a single match request
+MAX_MATCH_LIMIT = 100
 
 class QuestionViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Question.objects.all()
     serializer_class = QuestionSerializer
     permission_classes = [permissions.AllowAny]
+    pagination_class = IdCursorPagination
 
 class SMEProfileViewSet(viewsets.ModelViewSet):
     queryset = SMEProfile.objects.all()
     serializer_class = SMEProfileSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = IdCursorPagination
 
     def get_queryset(self):
         return self.queryset.filter(user=self.request.user)
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
-        UsageLog.objects.create(
-            user=self.request.user,
-            action="Created SME Profile",
-            ip_address=self.request.META.get('REMOTE_ADDR'),
-            user_agent=self.request.META.get('HTTP_USER_AGENT')
-        )
+        audit_log.log_request(self.request, "Created SME Profile")
 
 class AssessmentViewSet(viewsets.ModelViewSet):
-    queryset = Assessment.objects.all()
+    queryset = Assessment.objects.prefetch_related('answers')
     serializer_class = AssessmentSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CreatedAtCursorPagination
 
     def get_queryset(self):
         return self.queryset.filter(user=self.request.user)
 
-    def perform_create(self, serializer):
-        user = self.request.user
-        profile = None
-        try:
-            profile = user.smeprofile
-        except SMEProfile.DoesNotExist:
-            pass
-
-        engine = PredictiveEngine()
-        profile_data = {
-            'years_in_operation': profile.years_in_operation if profile else 0,
-            'registration_number': profile.registration_number if profile else ''
+    def _scored_fields(self, answers):
+        """
+        Score fields for a submitted answer set, shared by create and update. Answers give the
+        weighted questionnaire score; with none the ML prediction stands in for it.
+        """
+        # Loaded together with the session user by core.auth.ProfileModelBackend
+        profile = getattr(self.request.user, 'smeprofile', None)
+
+        engine = get_engine()
+        prediction = get_cached_prediction(profile, engine)
+        sector = profile.sector if profile else 'General'
+
+        if answers:
+            # Weighted questionnaire score; the ML prediction is kept alongside it
+            score, category_scores, weak_categories = score_answers(
+                [(a['question_id'], a['response_value']) for a in answers])
+        else:
+            score, category_scores, weak_categories = int(prediction * 100), {}, []
+        return {
+            'score': score,
+            'category_scores': category_scores,
+            'ml_predicted_success': prediction,
+            'gap_analysis': gap_analysis(weak_categories, sector, engine),
         }
-        prediction = engine.predict_readiness_probability(profile_data)
 
-        serializer.save(
-            user=user,
-            score=int(prediction * 100),
-            ml_predicted_success=prediction,
-            gap_analysis=", ".join(engine.identify_gap_clusters(profile.sector if profile else 'General'))
-        )
-        UsageLog.objects.create(user=user, action="Completed Assessment")
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user, **self._scored_fields(serializer.validated_data.get('answers')))
+        audit_log.log_request(self.request, "Completed Assessment")
+
+    def perform_update(self, serializer):
+        answers = serializer.validated_data.get('answers')
+        if answers is None:
+            serializer.save()
+        else:
+            serializer.save(**self._scored_fields(answers))
 
     @action(detail=False, methods=['get'])
     def predictions(self, request):
         user = request.user
         profile = getattr(user, 'smeprofile', None)
-        engine = PredictiveEngine()
-        prediction = engine.predict_readiness_probability({
-            'years_in_operation': profile.years_in_operation if profile else 0,
-            'registration_number': profile.registration_number if profile else ''
-        })
+        engine = get_engine()
+        prediction = get_cached_prediction(profile, engine)
         explanation = engine.get_shap_explanation(prediction)
         return Response({
             'ml_predicted_success': prediction,
             'explanation': explanation
         })
 
+    @action(detail=False, methods=['post'], url_path='predict-batch')
+    def predict_batch(self, request):
+        profiles = request.data.get('profiles')
+        if not isinstance(profiles, list) or not all(isinstance(p, dict) for p in profiles):
+            return Response({'error': "'profiles' must be a list of profile objects."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        engine = get_engine()
+        try:
+            features = engine.build_feature_matrix(profiles)
+        except (TypeError, ValueError):
+            return Response({'error': 'Profile features must be numeric.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        predictions = engine.predict_batch(features)
+        audit_log.log_request(request, "Batch Prediction", detail=f"{len(profiles)} profiles")
+        return Response({
+            'count': len(profiles),
+            'predictions': predictions.round(4).tolist()
+        })
+
 class BusinessPlanViewSet(viewsets.ModelViewSet):
     queryset = BusinessPlan.objects.all()
     serializer_class = BusinessPlanSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = IdCursorPagination
 
     def get_queryset(self):
         return self.queryset.filter(user=self.request.user)
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
-        UsageLog.objects.create(user=self.request.user, action="Updated Business Plan")
+        audit_log.log_request(self.request, "Updated Business Plan")
 
 class FinancialProjectionViewSet(viewsets.ModelViewSet):
     queryset = FinancialProjection.objects.all()
     serializer_class = FinancialProjectionSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CreatedAtCursorPagination
 
     def get_queryset(self):
         return self.queryset.filter(user=self.request.user)
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
-        UsageLog.objects.create(user=self.request.user, action="Updated Financial Projections")
+        audit_log.log_request(self.request, "Updated Financial Projections")
+
+    def _run_projections(self, request, base_revenue, base_expenses):
+        years = request.query_params.get('years', '3')
+        if not years.isdigit() or not 1 <= int(years) <= MAX_PROJECTION_YEARS:
+            return None, Response({'error': f"'years' must be between 1 and {MAX_PROJECTION_YEARS}."},
+                                  status=status.HTTP_400_BAD_REQUEST)
+        try:
+            return project_scenarios(base_revenue, base_expenses,
+                                     request.query_params.getlist('scenario') or None, years=int(years)), None
+        except ValueError as exc:
+            return None, Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+    @action(detail=True, methods=['get'])
+    def scenarios(self, request, pk=None):
+        projection = self.get_object()
+        df, error = self._run_projections(request, projection.revenue_year1, projection.expenses_year1)
+        if error:
+            return error
+        return Response(df.drop(columns='sme').round(2).to_dict('list'))
+
+    @action(detail=True, methods=['get'])
+    def simulate(self, request, pk=None):
+        """
+        Monte Carlo cash-flow bands for one projection. Growth is drawn from normal
+        distributions set by revenue_growth_mean/std and expense_growth_mean/std;
+        means must lie in GROWTH_MEAN_RANGE and stds in 0-MAX_GROWTH_STD.
+        """
+        projection = self.get_object()
+        params = request.query_params
+        try:
+            years = int(params.get('years', 3))
+            paths = int(params.get('paths', 10000))
+            seed = int(params['seed']) if params.get('seed') else None
+            revenue_growth = {'distribution': 'normal',
+                              'mean': float(params.get('revenue_growth_mean', DEFAULT_REVENUE_GROWTH['mean'])),
+                              'std': float(params.get('revenue_growth_std', DEFAULT_REVENUE_GROWTH['std']))}
+            expense_growth = {'distribution': 'normal',
+                              'mean': float(params.get('expense_growth_mean', DEFAULT_EXPENSE_GROWTH['mean'])),
+                              'std': float(params.get('expense_growth_std', DEFAULT_EXPENSE_GROWTH['std']))}
+        except ValueError:
+            return Response({'error': 'Simulation parameters must be numeric.'}, status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= years <= MAX_PROJECTION_YEARS or not 1 <= paths <= MAX_SIMULATION_PATHS:
+            return Response({'error': f"'years' must be 1-{MAX_PROJECTION_YEARS} and 'paths' 1-{MAX_SIMULATION_PATHS}."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        low, high = GROWTH_MEAN_RANGE
+        for growth in (revenue_growth, expense_growth):
+            # float() accepts 'nan', 'inf' and values that overflow once compounded
+            if not (math.isfinite(growth['mean']) and low <= growth['mean'] <= high):
+                return Response({'error': f"Growth means must be between {low} and {high}."},
+                                status=status.HTTP_400_BAD_REQUEST)
+            if not (math.isfinite(growth['std']) and 0 <= growth['std'] <= MAX_GROWTH_STD):
+                return Response({'error': f"Growth standard deviations must be between 0 and {MAX_GROWTH_STD}."},
+                                status=status.HTTP_400_BAD_REQUEST)
+        if seed is not None and seed < 0:
+            return Response({'error': "'seed' cannot be negative."}, status=status.HTTP_400_BAD_REQUEST)
+
+        result = simulate_cash_flows(projection.revenue_year1, projection.expenses_year1, years=years,
+                                     paths=paths, revenue_growth=revenue_growth,
+                                     expense_growth=expense_growth, seed=seed)
+        return Response(result)
+
+    @action(detail=False, methods=['get'], url_path='stress-test')
+    def stress_test(self, request):
+        """
+        Runs every scenario over the user's projections (the whole book for staff) as one
+        array operation per page and returns columnar results. Pages hold up to
+        ?page_size= projections; follow 'next' to walk the rest of the book.
+        """
+        projections = FinancialProjection.objects.all() if request.user.is_staff else self.get_queryset()
+        paginator = ProjectionBatchPagination()
+        page = paginator.paginate_queryset(
+            projections.only('id', 'revenue_year1', 'expenses_year1'), request, view=self)
+        ids = [projection.pk for projection in page]
+        revenue = [float(projection.revenue_year1) for projection in page]
+        expenses = [float(projection.expenses_year1) for projection in page]
+
+        df, error = self._run_projections(request, revenue, expenses)
+        if error:
+            return error
+        df['sme'] = np.asarray(ids, dtype=np.int64)[df['sme'].to_numpy()]
+        df = df.rename(columns={'sme': 'projection'}).round(2)
+        return Response({'next': paginator.get_next_link(), 'previous': paginator.get_previous_link(),
+                         'count': len(ids), 'results': df.to_dict('list')})
 
 class FundingSourceViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = FundingSource.objects.all()
     serializer_class = FundingSourceSerializer
     permission_classes = [permissions.AllowAny]
+    pagination_class = IdCursorPagination
+
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    def match(self, request):
+        profile = getattr(request.user, 'smeprofile', None)
+        if profile is None:
+            return Response({'error': 'Create an SME profile before matching funders.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        amount = request.query_params.get('amount')
+        try:
+            amount = float(amount) if amount not in (None, '') else None
+            limit = int(request.query_params.get('limit', 10))
+        except ValueError:
+            return Response({'error': "'amount' and 'limit' must be numeric."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if amount is not None and not (math.isfinite(amount) and amount >= 0):
+            return Response({'error': "'amount' must be a finite, non-negative number."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= limit <= MAX_MATCH_LIMIT:
+            return Response({'error': f"'limit' must be between 1 and {MAX_MATCH_LIMIT}."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        readiness = get_cached_prediction(profile)
+        matches = get_funding_index().match(profile.sector, amount=amount, readiness=readiness, limit=limit)
+        return Response({
+            'sector': profile.sector,
+            'ml_predicted_success': readiness,
+            'matches': matches
+        })
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        query = request.query_params.get('q', '')
+        keywords = request.query_params.getlist('keyword')
+        if not query.strip() and not keywords:
+            return Response({'error': "Provide a 'q' query or one or more 'keyword' parameters."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        results = get_funding_index().search([query] + keywords)
+        return Response({'count': len(results), 'results': results})
 
 class UsageLogViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = UsageLog.objects.all()
+    queryset = UsageLog.objects.select_related('action', 'user_agent')
     serializer_class = UsageLogSerializer
     permission_classes = [permissions.IsAdminUser]
+    pagination_class = TimestampCursorPagination
+
+    @action(detail=False, methods=['get'])
+    def daily(self, request):
+        """
+        Actions per user per day from the precomputed rollups (never scans the raw log).
+        """
+        rollups = UsageDailyRollup.objects.select_related('action')
+        try:
+            if request.query_params.get('since'):
+                rollups = rollups.filter(day__gte=date.fromisoformat(request.query_params['since']))
+            if request.query_params.get('until'):
+                rollups = rollups.filter(day__lte=date.fromisoformat(request.query_params['until']))
+            if request.query_params.get('user'):
+                rollups = rollups.filter(user_id=int(request.query_params['user']))
+        except ValueError:
+            return Response({'error': "'since'/'until' must be YYYY-MM-DD dates and 'user' an id."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        paginator = DayCursorPagination()
+        page = paginator.paginate_queryset(rollups, request, view=self)
+        return paginator.get_paginated_response(UsageDailyRollupSerializer(page, many=True).data)
+
+class ExportViewSet(viewsets.ViewSet):
+    """
+    Streaming bulk exports for admins: /exports/ lists datasets and
+    /exports/<dataset>/?output=csv|parquet&since=YYYY-MM-DD&until=YYYY-MM-DD streams one.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def list(self, request):
+        return Response({'datasets': list(EXPORT_DATASETS), 'formats': list(EXPORT_FORMATS)})
+
+    def retrieve(self, request, pk=None):
+        output = request.query_params.get('output', 'csv')
+        try:
+            since = request.query_params.get('since')
+            until = request.query_params.get('until')
+            since = date.fromisoformat(since) if since else None
+            until = date.fromisoformat(until) if until else None
+        except ValueError:
+            return Response({'error': "'since'/'until' must be YYYY-MM-DD dates."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            content = iter_export(pk, output=output, since=since, until=until)
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        audit_log.log_request(request, "Exported Dataset", detail=f"{pk} ({output})")
+        response = StreamingHttpResponse(content, content_type=EXPORT_FORMATS[output])
+        response['Content-Disposition'] = f'attachment; filename="{export_filename(pk, output)}"'
+        return response
+
+class DocumentJobViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin, mixins.ListModelMixin,
+                         viewsets.GenericViewSet):
+    """
+    Upload a document for background extraction (POST returns 202 with the queued job),
+    poll /documents/<id>/ for its status and fetch /documents/<id>/result/ once DONE.
+    """
+    queryset = DocumentJob.objects.all()
+    serializer_class = DocumentJobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [MultiPartParser, FormParser]
+    pagination_class = CreatedAtCursorPagination
+
+    def get_queryset(self):
+        queryset = self.queryset.filter(user=self.request.user)
+        # Extraction results can be large; only the result action returns them
+        return queryset if self.action == 'result' else queryset.defer('result')
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job = enqueue_document(request.user, serializer.validated_data['file'])
+        audit_log.log_request(request, "Queued Document", detail=job.original_name)
+        return Response(self.get_serializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=['get'])
+    def result(self, request, pk=None):
+        job = self.get_object()
+        if job.status == 'DONE':
+            return Response({'id': job.pk, 'status': job.status, 'result': job.result})
+        if job.status == 'FAILED':
+            return Response({'id': job.pk, 'status': job.status, 'error': job.error},
+                            status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+        return Response({'id': job.pk, 'status': job.status}, status=status.HTTP_202_ACCEPTED)
+
+class VerificationTaskViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin, mixins.ListModelMixin,
+                              viewsets.GenericViewSet):
+    """
+    Reviewer work queue. POST /verification-tasks/claim/ hands out the next pending
+    task (?task_type= to narrow it), then /<id>/complete/ or /<id>/release/ closes it.
+    ?mine=1 lists the caller's assigned tasks and ?status= filters the queue.
+    """
+    queryset = VerificationTask.objects.all()
+    serializer_class = VerificationTaskSerializer
+    permission_classes = [permissions.IsAdminUser]
+    pagination_class = IdCursorPagination
+
+    def get_queryset(self):
+        queryset = self.queryset
+        if self.request.query_params.get('mine'):
+            queryset = queryset.filter(assigned_to=self.request.user)
+        task_status = self.request.query_params.get('status')
+        return queryset.filter(status=task_status) if task_status else queryset
+
+    @action(detail=False, methods=['post'])
+    def claim(self, request):
+        try:
+            task = claim_next_task(request.user, task_type=request.query_params.get('task_type'))
+        except ReviewerAtCapacity:
+            return Response({'error': 'Finish or release an in-progress task before claiming another.'},
+                            status=status.HTTP_409_CONFLICT)
+        if task is None:
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        audit_log.log_request(request, "Claimed Verification Task", detail=f"Task #{task.pk}")
+        return Response(self.get_serializer(task).data)
+
+    def _assigned_task(self, request):
+        task = self.get_object()
+        if task.status != 'IN_PROGRESS' or task.assigned_to_id != request.user.pk:
+            return None
+        return task
+
+    @action(detail=True, methods=['post'])
+    def complete(self, request, pk=None):
+        task = self._assigned_task(request)
+        if task is None:
+            return Response({'error': 'Only the assigned reviewer can close an in-progress task.'},
+                            status=status.HTTP_409_CONFLICT)
+        outcome = request.data.get('status', 'COMPLETED')
+        if outcome not in ('COMPLETED', 'REJECTED'):
+            return Response({'error': "'status' must be COMPLETED or REJECTED."}, status=status.HTTP_400_BAD_REQUEST)
+        finish_task(task, outcome)
+        audit_log.log_request(request, "Closed Verification Task", detail=f"Task #{task.pk} as {outcome}")
+        return Response(self.get_serializer(task).data)
+
+    @action(detail=True, methods=['post'])
+    def release(self, request, pk=None):
+        task = self._assigned_task(request)
+        if task is None:
+            return Response({'error': 'Only the assigned reviewer can release an in-progress task.'},
+                            status=status.HTTP_409_CONFLICT)
+        release_task(task)
+        audit_log.log_request(request, "Released Verification Task", detail=f"Task #{task.pk}")
+        return Response(self.get_serializer(task).data)
@@ -0,0 +1,54 @@
+import os
+
+# PRAGMAs applied to every new SQLite connection by core.db.configure_sqlite_connection
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",          # readers no longer block the writer
+    "synchronous": "NORMAL",        # fsync at checkpoints only; safe with WAL
+    "mmap_size": 256 * 1024 * 1024,
+    "busy_timeout": 5000,           # wait up to 5s for the write lock instead of failing
+    "temp_store": "MEMORY",
+}
+
+def database_config(base_dir, environ=None):
+    """
+    Builds DATABASES['default'] from FUNDREADY_DB_* environment variables.
+    FUNDREADY_DB_ENGINE=sqlite (default) or postgres; Postgres needs psycopg
+    (and psycopg-pool when FUNDREADY_DB_POOL=True).
+    """
+    env = os.environ if environ is None else environ
+    engine = env.get("FUNDREADY_DB_ENGINE", "sqlite").lower()
+
+    if engine == "sqlite":
+        return {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": env.get("FUNDREADY_SQLITE_PATH", base_dir / "db.sqlite3"),
+            "OPTIONS": {
+                # Take the write lock at BEGIN so concurrent writers queue instead of deadlocking
+                "transaction_mode": "IMMEDIATE",
+            },
+        }
+
+    if engine not in ("postgres", "postgresql"):
+        raise ValueError(f"Unsupported FUNDREADY_DB_ENGINE: {engine}")
+
+    config = {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": env.get("FUNDREADY_DB_NAME", "fundready"),
+        "USER": env.get("FUNDREADY_DB_USER", "fundready"),
+        "PASSWORD": env.get("FUNDREADY_DB_PASSWORD", ""),
+        "HOST": env.get("FUNDREADY_DB_HOST", "localhost"),
+        "PORT": env.get("FUNDREADY_DB_PORT", "5432"),
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {},
+    }
+    if env.get("FUNDREADY_DB_POOL", "False") == "True":
+        # Django's psycopg pool replaces persistent connections, so CONN_MAX_AGE must stay 0
+        config["CONN_MAX_AGE"] = 0
+        config["OPTIONS"]["pool"] = {
+            "min_size": int(env.get("FUNDREADY_DB_POOL_MIN", "2")),
+            "max_size": int(env.get("FUNDREADY_DB_POOL_MAX", "10")),
+            "timeout": 10,
+        }
+    else:
+        config["CONN_MAX_AGE"] = int(env.get("FUNDREADY_DB_CONN_MAX_AGE", "60"))
+    return config
@@ -1,6 +1,8 @@
 import os
 from pathlib import Path
 
+from .database import SQLITE_PRAGMAS as DEFAULT_SQLITE_PRAGMAS, database_config
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 # SECURITY WARNING: keep the secret key used in production secret!
@@ -36,6 +38,13 @@ MIDDLEWARE = [
 
 CORS_ALLOW_ALL_ORIGINS = True
 
+# Session users come with their SME profile attached (see core.auth)
+AUTHENTICATION_BACKENDS = ["core.auth.ProfileModelBackend"]
+
+REST_FRAMEWORK = {
+    "DEFAULT_PAGINATION_CLASS": "core.pagination.IdCursorPagination",
+}
+
 ROOT_URLCONF = "fundready_backend.urls"
 
 TEMPLATES = [
@@ -55,12 +64,51 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "fundready_backend.wsgi.application"
 
+# Configured from FUNDREADY_DB_* environment variables (see fundready_backend/database.py)
 DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
-    }
+    "default": database_config(BASE_DIR),
 }
+SQLITE_PRAGMAS = DEFAULT_SQLITE_PRAGMAS
+
+# Versioned ML artifacts (readiness-v<N>.npy / .pkl) loaded by core.model_registry
+MODEL_ARTIFACT_DIR = Path(os.environ.get("FUNDREADY_MODEL_DIR", BASE_DIR / "ml_models"))
+MODEL_RELOAD_INTERVAL = int(os.environ.get("FUNDREADY_MODEL_RELOAD_INTERVAL", "30"))
+
+# Seconds between checks of the CacheVersion table by in-process caches (funding index,
+# question weights); changes made by another process show up within this interval
+CACHE_VERSION_CHECK_INTERVAL = float(os.environ.get("FUNDREADY_CACHE_VERSION_CHECK_INTERVAL", "2"))
+
+# Buffer UsageLog writes and flush them from a background thread
+AUDIT_LOG_ASYNC = os.environ.get("FUNDREADY_AUDIT_LOG_ASYNC", "True") == "True"
+
+# Uploaded documents and the background extraction queue (python manage.py process_documents)
+MEDIA_ROOT = Path(os.environ.get("FUNDREADY_MEDIA_ROOT", BASE_DIR / "media"))
+MEDIA_URL = "media/"
+# Small uploads stay in memory; larger ones are spooled to disk and hashed chunk by chunk.
+# Keep FILE_UPLOAD_TEMP_DIR on the MEDIA_ROOT filesystem so storing an upload is a rename, not a copy.
+FILE_UPLOAD_HANDLERS = [
+    "django.core.files.uploadhandler.MemoryFileUploadHandler",
+    "core.uploads.HashingTemporaryFileUploadHandler",
+]
+FILE_UPLOAD_MAX_MEMORY_SIZE = 2 * 1024 * 1024
+FILE_UPLOAD_TEMP_DIR = os.environ.get("FUNDREADY_UPLOAD_TEMP_DIR") or None
+DOCUMENT_MAX_UPLOAD_BYTES = int(os.environ.get("FUNDREADY_DOCUMENT_MAX_UPLOAD_BYTES", 20 * 1024 * 1024))
+DOCUMENT_WORKERS = int(os.environ.get("FUNDREADY_DOCUMENT_WORKERS", "0")) or os.cpu_count() or 1
+DOCUMENT_JOB_TIMEOUT = int(os.environ.get("FUNDREADY_DOCUMENT_JOB_TIMEOUT", "600"))
+DOCUMENT_JOB_MAX_ATTEMPTS = 3
+# Extraction results keyed by SHA-256 of the file, evicted least-recently-used past the size limit
+DOCUMENT_CACHE_DIR = Path(os.environ.get("FUNDREADY_DOCUMENT_CACHE_DIR", BASE_DIR / "document_cache"))
+DOCUMENT_CACHE_MAX_BYTES = int(os.environ.get("FUNDREADY_DOCUMENT_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+# Changed DataTrustScores are recomputed by python manage.py recompute_trust_scores once they
+# have been dirty for TRUST_SCORE_DEBOUNCE seconds, so a burst of changes costs one recompute
+TRUST_SCORE_DEBOUNCE = int(os.environ.get("FUNDREADY_TRUST_SCORE_DEBOUNCE", "30"))
+TRUST_SCORE_BATCH_SIZE = 500
+
+# Reviewer work queue (core.verification): in-progress tasks a reviewer may hold at once, and the
+# wait in seconds after which a pending task jumps ahead of higher priorities
+VERIFICATION_MAX_ACTIVE_TASKS = int(os.environ.get("FUNDREADY_VERIFICATION_MAX_ACTIVE_TASKS", "5"))
+VERIFICATION_TASK_MAX_WAIT = int(os.environ.get("FUNDREADY_VERIFICATION_TASK_MAX_WAIT", 24 * 60 * 60))
 
 AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},
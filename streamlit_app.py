@@ -4,6 +4,11 @@ import numpy as np
 import time
 import random
 import datetime
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "backend"))
+from core.logic import projection_cache, scenario_projection
 
 # =========================================================
 # 1. PAGE CONFIG & INITIALIZATION (MUST BE AT THE VERY TOP)
@@ -59,23 +64,25 @@ class PredictiveEngine:
         return min(max(base_prob + random.uniform(-0.05, 0.05), 0.0), 1.0)
 
 class DocumentDecipherer:
+    DETECTED_TYPES = {'.pdf': 'Financial Document', '.csv': 'Bank Statement (CSV)'}
+
     def decipher(self, file_name):
         return {
             'keywords': ['Revenue', 'Compliance', 'Namibia', 'BIPA'],
-            'detected_type': 'Financial Document' if file_name.lower().endswith('.pdf') else 'Image Scan',
+            'detected_type': self.DETECTED_TYPES.get(Path(file_name).suffix.lower(), 'Image Scan'),
             'summary': 'AI processing complete.'
         }
 
-def generate_projections(base_revenue, base_expenses, scenario='Realistic'):
-    multipliers = {'Conservative': (1.05, 1.02), 'Realistic': (1.15, 1.05), 'Optimistic': (1.30, 1.10)}
-    rev_mult, exp_mult = multipliers[scenario]
-    data = []
-    r, e = float(base_revenue), float(base_expenses)
-    for year in range(1, 4):
-        data.append({"Year": f"Year {year}", "Revenue": round(r, 2), "Expenses": round(e, 2), "Profit": round(r - e, 2)})
-        r *= rev_mult
-        e *= exp_mult
-    return pd.DataFrame(data)
+def generate_projections(base_revenue, base_expenses, scenario='Realistic', years=3):
+    # Shared vectorized engine from the Django backend (core.logic has no Django dependency),
+    # memoized so widget reruns with unchanged inputs skip the computation
+    df = scenario_projection(base_revenue, base_expenses, scenario, years)
+    return pd.DataFrame({
+        "Year": [f"Year {y}" for y in df['year']],
+        "Revenue": df['revenue'],
+        "Expenses": df['operating_expenses'],
+        "Profit": df['net_income'],
+    })
 
 # ==========================================
 # 3. STREAMLIT UI LAYOUT
@@ -158,15 +165,17 @@ elif page == "Funding Matchmaker":
 # --- AI DOCUMENT DECIPHERER ---
 elif page == "AI Document Decipherer":
     st.title("🤖 AI Document Decipherer")
-    up = st.file_uploader("Upload document", type=['pdf', 'png', 'jpg'])
+    up = st.file_uploader("Upload document", type=['pdf', 'png', 'jpg', 'csv'])
     if up and st.button("Run AI Analysis"):
         add_log(f"AI Scan: {up.name}")
-        with st.spinner("Processing..."):
-            time.sleep(3)
-            res = decipherer.decipher(up.name)
-            st.success("Extraction Successful")
-            st.write(f"**Keywords:** {', '.join(res['keywords'])}")
-            st.session_state['trust_score'] = min(st.session_state['trust_score'] + 0.12, 1.0)
+        # The demo decipherer is an instant stub; real uploads go through the backend's core.jobs queue
+        st.session_state['doc_result'] = decipherer.decipher(up.name)
+        st.session_state['trust_score'] = min(st.session_state['trust_score'] + 0.12, 1.0)
+
+    res = st.session_state.get('doc_result')
+    if res:
+        st.success("Extraction Successful")
+        st.write(f"**Keywords:** {', '.join(res['keywords'])}")
 
 # --- FINANCIAL PROJECTIONS ---
 elif page == "Financial Projections":
@@ -174,9 +183,12 @@ elif page == "Financial Projections":
     rev = st.number_input("Base Revenue (NAD)", value=100000)
     exp = st.number_input("Base Expenses (NAD)", value=80000)
     scen = st.selectbox("Scenario", ["Conservative", "Realistic", "Optimistic"])
-    df_p = generate_projections(rev, exp, scen)
+    horizon = st.slider("Projection Horizon (Years)", 1, 10, 3)
+    df_p = generate_projections(rev, exp, scen, horizon)
     st.table(df_p)
     st.line_chart(df_p.set_index("Year")[["Revenue", "Profit"]])
+    cache_stats = projection_cache.stats()
+    st.caption(f"Projection cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses")
 
 # --- CREDITWORTHINESS SIMULATOR ---
 elif page == "Creditworthiness Simulator":